@@ -0,0 +1,185 @@
+# anomalies.py
+#
+# Unusual spending: flags a charge that is far above what the wallet
+# usually spends on that category, and the charge that takes a category's
+# month well above its usual monthly total (a spike of ordinary charges).
+#
+# Each wallet gets a SpendingAnomalies in session_state
+# (ss.anomaly_detectors[wallet_id]); it is derived data and never stored.
+# Per category it keeps three numbers, updated in O(1) by every outflow:
+# - a count,
+# - an exponentially weighted typical amount (EWMA),
+# - an exponentially weighted mean absolute deviation (the spread).
+# The weight is 1/n for the first 1/ALPHA charges (a plain average while
+# there is little history) and ALPHA after that, so old spending fades
+# out. Updates are clipped to CLIP spreads around the typical amount, so a
+# single huge charge barely moves the baseline (a robust z-score).
+#
+# A charge scores (amount - typical) / spread, with the spread turned into
+# a standard deviation and floored at MIN_SPREAD of the typical amount
+# (a fixed subscription has no spread at all). It is flagged above
+# THRESHOLD once the category has MIN_HISTORY charges.
+#
+# Months work the same way, one level up: per category a running total
+# for its latest month, and the same typical / spread over its earlier
+# monthly totals (weight 1/n, then MONTH_ALPHA), folded in when a charge
+# opens a new month. Months without any charge in the category are not
+# counted (an annual bill is not a spike), and a backdated charge for a
+# month already folded in is left out of the monthly numbers. Once there
+# are MIN_MONTHS months, the charge that takes the running total above
+# THRESHOLD is flagged, once per month.
+#
+# Memory is O(categories), capped at MAX_CATEGORIES, whatever the history
+# length.
+#
+# A charge is scored once, when it is added (wealthflow.add_transactions
+# keeps the note in txn["flag"]), so the table shows what was unusual at
+# the time rather than rescoring old rows against a newer baseline.
+
+import math
+from typing import Dict, List, Optional
+
+import storage
+from session_memory import HISTORY_NAMESPACE
+
+ALPHA = 0.05  # ~ the last 20 charges of a category
+CLIP = 3.0
+THRESHOLD = 3.5
+MIN_HISTORY = 8
+MIN_SPREAD = 0.1
+MONTH_ALPHA = 0.2  # ~ the last 5 months with spending in a category
+MIN_MONTHS = 3
+MAX_CATEGORIES = 256
+_MAD_TO_STD = math.sqrt(math.pi / 2)
+
+
+def _category_key(category: str) -> str:
+    return (category or "").strip().lower()
+
+
+def _month_key(day) -> int:
+    return day.year * 12 + day.month - 1
+
+
+class SpendingAnomalies:
+    """Per-category typical charge, typical month and their spreads for one wallet."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.stats: Dict[str, List[float]] = {}  # category -> [n, typical, spread]
+        # category -> [month key, running total, n, typical, spread] (of closed months)
+        self.months: Dict[str, List[float]] = {}
+
+    def observe(self, txn: dict) -> None:
+        self.count += 1
+        amount = -float(txn["amount"])
+        if amount <= 0:
+            return
+        key = _category_key(txn.get("category"))
+        entry = self.stats.get(key)
+        if entry is None:
+            if len(self.stats) >= MAX_CATEGORIES:
+                return
+            self.stats[key] = [1, amount, 0.0]
+            self.months[key] = [_month_key(txn["date"]), amount, 0, 0.0, 0.0]
+            return
+        entry[:] = self._update(entry[0] + 1, entry[1], entry[2], amount, ALPHA)
+
+        month_entry = self.months[key]
+        month = _month_key(txn["date"])
+        if month > month_entry[0]:
+            n, typical, spread = self._update(month_entry[2] + 1, month_entry[3], month_entry[4], month_entry[1], MONTH_ALPHA)
+            month_entry[:] = (month, 0.0, n, typical, spread)
+        if month == month_entry[0]:
+            month_entry[1] += amount
+
+    @classmethod
+    def _update(cls, n: int, typical: float, spread: float, amount: float, alpha: float) -> tuple:
+        """(n, typical, spread) after one more (clipped) amount."""
+        if n == 1:
+            return 1, amount, 0.0
+        weight = max(alpha, 1.0 / n)
+        limit = CLIP * cls._std(typical, spread)
+        deviation = max(-limit, min(amount - typical, limit))
+        typical += weight * deviation
+        spread += weight * (abs(deviation) - spread)
+        return n, typical, spread
+
+    @staticmethod
+    def _std(typical: float, spread: float) -> float:
+        return max(spread * _MAD_TO_STD, MIN_SPREAD * typical, 1.0)
+
+    def score(self, txn: dict) -> Optional[float]:
+        """Robust z-score of a charge, or None if its category has too little history."""
+        amount = -float(txn["amount"])
+        entry = self.stats.get(_category_key(txn.get("category")))
+        if amount <= 0 or entry is None or entry[0] < MIN_HISTORY:
+            return None
+        return (amount - entry[1]) / self._std(entry[1], entry[2])
+
+    def month_total(self, txn: dict) -> Optional[float]:
+        """The category's running total for the charge's month: 0.0 for a new month, None if it is closed."""
+        entry = self.months.get(_category_key(txn.get("category")))
+        month = _month_key(txn["date"])
+        if entry is None or month > entry[0]:
+            return 0.0
+        return entry[1] if month == entry[0] else None
+
+    def month_score(self, total: float, category: str) -> Optional[float]:
+        """Robust z-score of a monthly total, or None if the category has too few months."""
+        entry = self.months.get(_category_key(category))
+        if entry is None or entry[2] < MIN_MONTHS:
+            return None
+        return (total - entry[3]) / self._std(entry[3], entry[4])
+
+    def typical(self, category: str) -> Optional[float]:
+        entry = self.stats.get(_category_key(category))
+        return entry[1] if entry else None
+
+    def typical_month(self, category: str) -> Optional[float]:
+        entry = self.months.get(_category_key(category))
+        return entry[3] if entry and entry[2] else None
+
+    def flag(self, txn: dict) -> str:
+        """Short note for an unusual charge or the charge that makes a spike ("" if neither)."""
+        score = self.score(txn)
+        if score is not None and score >= THRESHOLD:
+            ratio = -float(txn["amount"]) / self.typical(txn.get("category"))
+            return f"⚠ {ratio:.1f}× usual"
+
+        amount = -float(txn["amount"])
+        before = self.month_total(txn)
+        if amount <= 0 or before is None:
+            return ""
+        category = txn.get("category")
+        after = self.month_score(before + amount, category)
+        if after is None or after < THRESHOLD or self.month_score(before, category) >= THRESHOLD:
+            return ""
+        typical = self.typical_month(category)
+        if typical <= 0:
+            return "⚠ unusual month"
+        return f"⚠ month {(before + amount) / typical:.1f}× usual"
+
+
+def wallet_anomalies(ss, wallet: dict) -> SpendingAnomalies:
+    """The wallet's detector, rebuilt only if it no longer matches the wallet."""
+    detectors = ss.setdefault("anomaly_detectors", {})
+    detector = detectors.get(wallet["id"])
+    expected = len(wallet["transactions"]) + wallet.get("archived_count", 0)
+    if detector is None or detector.count != expected:
+        detector = SpendingAnomalies()
+        if wallet.get("archived_count"):
+            for txn in storage.get(HISTORY_NAMESPACE, wallet["archive_key"], default=[]):
+                detector.observe(txn)
+        for txn in wallet["transactions"]:
+            detector.observe(txn)
+        detectors[wallet["id"]] = detector
+    return detector
+
+
+def observe_anomaly(ss, wallet: dict, txn: dict) -> None:
+    """Call after appending `txn` to the wallet."""
+    detector = ss.get("anomaly_detectors", {}).get(wallet["id"])
+    if detector is not None and detector.count == len(wallet["transactions"]) + wallet.get("archived_count", 0) - 1:
+        detector.observe(txn)
+    # otherwise wallet_anomalies() rebuilds it on next use
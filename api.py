@@ -0,0 +1,586 @@
+# api.py
+#
+# JSON API over the planning and wallet engines (for the mobile app).
+#
+# A plain ASGI application – no framework – so a request costs one
+# function call instead of a Streamlit websocket session and script rerun.
+# Run it with any ASGI server, e.g.:
+#   uvicorn api:app --port 8600
+#
+# It uses the same session store (session_store.py), blob storage
+# (storage.py) and plan cache (plan_engine.py) as the Streamlit app, so a
+# user sees the same wallets and goals in both.
+#
+# Endpoints (all POST, JSON body, JSON response):
+#   /v1/cashflow          {income, expenses, country?}
+#   /v1/plan/allocation   {income, expenses, country, debt, high_interest_debt?, forecast_cashflow?}
+#   /v1/plan/next-step    {next_step?, profile?}          (stored values if omitted)
+#   /v1/wallet/stats      {wallet_id?, from, to} or {wallet: {...}, from, to}
+#                         (an inline wallet may carry "recurring" rules)
+#   /v1/goals/projections {monthly?: {goal_id: amount}} or {goals: [...]}
+#   /v1/batch             {requests: [{path, body}, ...]} (max BATCH_LIMIT)
+# plus GET /v1/health.
+#
+# A profile with emergency_basis "wallets" gets its emergency target from
+# the caller's stored wallets (emergency.py), like the web plan.
+#
+# It imports no Streamlit code: the wallet maths lives in logic.py.
+#
+# Stored data needs "Authorization: Bearer <token>", the same session
+# token the web app keeps in its session cookie (session_store.TOKEN_COOKIE).
+#
+# Local throughput benchmark (in-process, throwaway data directory):
+#   python api.py --bench [--requests 2000] [--transactions 10000]
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import plan_engine
+import session_store
+import storage
+from emergency import build_monthly_spend, spending_target
+from goals import GoalRegistry, project_goal
+from logic import (
+    allocate_monthly_plan,
+    calculate_cashflow,
+    calculate_savings_rate,
+    compute_wallet_stats,
+    emergency_fund_target,
+    savings_rate_target,
+)
+from recurring import SCHEDULES
+from session_memory import HISTORY_NAMESPACE
+
+MAX_BODY_BYTES = 1024 * 1024
+BATCH_LIMIT = 100
+STORED_CACHE_SIZE = 256
+HEALTH_PATH = "/v1/health"
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---------- INPUT ----------
+
+def _finite(value: Any) -> float:
+    """float(value), but ValueError for nan / inf (they are not valid JSON back out)."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+def _number(body: dict, key: str, default: Optional[float] = None) -> float:
+    value = body.get(key, default)
+    if value is None:
+        raise ApiError(400, f"'{key}' is required")
+    try:
+        return _finite(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"'{key}' must be a finite number")
+
+
+def _reject_constant(name: str) -> float:
+    # json.loads accepts NaN / Infinity / -Infinity literals by default
+    raise ValueError(f"{name} is not allowed")
+
+
+def _date(body: dict, key: str) -> date:
+    raw = body.get(key)
+    try:
+        return date.fromisoformat(raw)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"'{key}' must be a date (YYYY-MM-DD)")
+
+
+def _owner(owner: Optional[str]) -> str:
+    if owner is None:
+        raise ApiError(401, "this endpoint needs 'Authorization: Bearer <token>'")
+    return owner
+
+
+# ---------- STORED STATE ----------
+
+# (owner, key) -> (version, value). Reads check the version numbers first
+# (one small query) and only fetch a value another writer has changed.
+_stored_cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+_stored_lock = threading.Lock()
+
+
+def _stored(owner: str, key: str) -> Any:
+    """A stored session value. Shared with other requests – do not mutate."""
+    version = session_store.versions(owner).get(key)
+    if version is None:
+        raise ApiError(404, f"nothing stored for '{key}'")
+    with _stored_lock:
+        hit = _stored_cache.get((owner, key))
+        if hit is not None and hit[0] == version:
+            _stored_cache.move_to_end((owner, key))
+            return hit[1]
+
+    version, value = session_store.read(owner, [key])[key]
+    with _stored_lock:
+        _stored_cache[(owner, key)] = (version, value)
+        while len(_stored_cache) > STORED_CACHE_SIZE:
+            _stored_cache.popitem(last=False)
+    return value
+
+
+def _wallet_transactions(wallet: dict, start: date) -> list:
+    """Wallet transactions, plus spilled history if `start` reaches into it."""
+    archived_before = wallet.get("archived_before")
+    if archived_before and start < archived_before:
+        # read-only: the web session still owns (and may restore) the archive
+        return storage.get(HISTORY_NAMESPACE, wallet["archive_key"], default=[]) + wallet["transactions"]
+    return wallet["transactions"]
+
+
+def _inline_wallet(raw: Any) -> dict:
+    if not isinstance(raw, dict) or not isinstance(raw.get("transactions"), list):
+        raise ApiError(400, "'wallet' must be an object with a 'transactions' list")
+    try:
+        txns = [
+            {**t, "date": date.fromisoformat(t["date"]), "amount": _finite(t["amount"])}
+            for t in raw["transactions"]
+        ]
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(400, "each transaction needs 'date' (YYYY-MM-DD) and 'amount'")
+    try:
+        rules = [
+            {
+                "id": r.get("id", f"r{i + 1}"),
+                "schedule": r["schedule"],
+                "start": date.fromisoformat(r["start"]),
+                "end": date.fromisoformat(r["end"]) if r.get("end") else None,
+                "amount": _finite(r["amount"]),
+                "category": r.get("category", "General"),
+                "note": r.get("note", ""),
+            }
+            for i, r in enumerate(raw.get("recurring") or [])
+            if r.get("schedule") in SCHEDULES
+        ]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        raise ApiError(400, "each recurring rule needs 'schedule', 'start' (YYYY-MM-DD) and 'amount'")
+    return {**raw, "transactions": txns, "recurring": rules}
+
+
+def _inline_goals(raw: Any) -> GoalRegistry:
+    if not isinstance(raw, list) or not all(isinstance(g, dict) for g in raw):
+        raise ApiError(400, "'goals' must be a list of objects")
+    goals = []
+    for goal in raw:
+        for key in ("id", "name", "kind"):
+            if goal.get(key) is not None and not isinstance(goal[key], str):
+                raise ApiError(400, f"goal '{key}' must be a string")
+        try:
+            numbers = {
+                key: _finite(goal[key]) for key in ("target", "saved", "monthly_target") if goal.get(key) is not None
+            }
+        except (TypeError, ValueError):
+            raise ApiError(400, "goal 'target', 'saved' and 'monthly_target' must be finite numbers")
+        goals.append({**goal, **numbers})
+    return GoalRegistry(goals)
+
+
+# ---------- ENDPOINTS ----------
+
+def cashflow(body: dict, owner: Optional[str]) -> dict:
+    income = _number(body, "income")
+    expenses = _number(body, "expenses")
+    country = body.get("country", "CA")
+    flow = calculate_cashflow(income, expenses)
+    low, high = savings_rate_target(country, income)
+    return {
+        "cashflow": flow,
+        "savings_rate": calculate_savings_rate(income, flow),
+        "savings_rate_target": [low, high],
+        "emergency_target": emergency_fund_target(expenses, _number(body, "debt", 0.0)),
+    }
+
+
+def allocation(body: dict, owner: Optional[str]) -> dict:
+    return allocate_monthly_plan(
+        income=_number(body, "income"),
+        expenses=_number(body, "expenses"),
+        country=body.get("country", "CA"),
+        debt=_number(body, "debt", 0.0),
+        high_interest_debt=bool(body.get("high_interest_debt", False)),
+        forecast_cashflow=_number(body, "forecast_cashflow") if body.get("forecast_cashflow") is not None else None,
+    )
+
+
+def _emergency_target(profile: dict, owner: Optional[str]) -> Optional[float]:
+    """The adaptive target from the owner's stored wallets, as the web plan uses it."""
+    if profile.get("emergency_basis") != "wallets" or owner is None:
+        return None
+    if "wallets" not in session_store.versions(owner):
+        return None
+    wallets = _stored(owner, "wallets")
+    return spending_target(
+        profile, wallets, build_monthly_spend(wallets), float(profile["expenses"]), float(profile["debt"])
+    )
+
+
+def next_step_plan(body: dict, owner: Optional[str]) -> dict:
+    profile = body.get("profile")
+    if profile is None:
+        profile = _stored(_owner(owner), "profile")
+    next_step = body.get("next_step")
+    if next_step is None:
+        next_step = _stored(_owner(owner), "next_step")
+    if not isinstance(profile, dict) or not isinstance(next_step, dict):
+        raise ApiError(400, "'profile' and 'next_step' must be objects")
+    if not isinstance(next_step.get("primary_goal") or "", str):
+        raise ApiError(400, "'primary_goal' must be a string")
+
+    try:
+        inputs = plan_engine.plan_inputs(
+            profile,
+            next_step,
+            plan_engine.get_currency(profile.get("country")),
+            _emergency_target(profile, owner),
+        )
+        if not all(math.isfinite(value) for value in inputs if isinstance(value, float)):
+            raise ApiError(400, "profile and next_step numbers must be finite")
+        plan = plan_engine.build_plan(inputs)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        raise ApiError(400, "profile needs numeric income, expenses, savings and debt")
+    return {
+        "focus": plan.focus,
+        "headline": plan.headline,
+        "lines": list(plan.lines),
+        "monthly": plan.monthly,
+        "target": plan.target,
+        "emergency_target": plan.emergency_target,
+        "months_to_buffer": plan.months_to_buffer,
+    }
+
+
+def wallet_stats(body: dict, owner: Optional[str]) -> dict:
+    start, end = _date(body, "from"), _date(body, "to")
+    if start > end:
+        raise ApiError(400, "'from' is after 'to'")
+
+    if "wallet" in body:
+        wallet = _inline_wallet(body["wallet"])
+    else:
+        wallets = _stored(_owner(owner), "wallets")
+        wallet_id = body.get("wallet_id")
+        if wallet_id:
+            wallet = next((w for w in wallets if w["id"] == wallet_id), None)
+            if wallet is None:
+                raise ApiError(404, f"no wallet '{wallet_id}'")
+        elif wallets:
+            wallet = wallets[0]
+        else:
+            raise ApiError(404, "no wallets stored")
+        wallet = {**wallet, "transactions": _wallet_transactions(wallet, start)}
+
+    stats = compute_wallet_stats(wallet, start, end)
+    return {
+        "wallet_id": wallet.get("id"),
+        "from": start,
+        "to": end,
+        "balance": stats["balance"],
+        "income": stats["income"],
+        "expenses": stats["expenses"],
+        "change": stats["change"],
+        "count": len(stats["transactions"]),
+    }
+
+
+def goal_projections(body: dict, owner: Optional[str]) -> dict:
+    if "goals" in body:
+        goals = _inline_goals(body["goals"])
+    else:
+        goals = _stored(_owner(owner), "goal_plans")
+        if not isinstance(goals, GoalRegistry):
+            goals = GoalRegistry(goals)
+
+    monthly = body.get("monthly") or {}
+    if not isinstance(monthly, dict):
+        raise ApiError(400, "'monthly' must map goal ids to amounts")
+    try:
+        projections = [
+            project_goal(goal, monthly=_number(monthly, goal["id"]) if goal["id"] in monthly else None)
+            for goal in goals
+        ]
+    except (TypeError, ValueError):
+        raise ApiError(400, "goal 'target', 'saved' and 'monthly_target' must be numbers")
+    if not all(math.isfinite(p["remaining"]) for p in projections):
+        raise ApiError(400, "goal 'target' - 'saved' must be a finite number")
+    return {"goals": projections}
+
+
+def batch(body: dict, owner: Optional[str]) -> dict:
+    requests = body.get("requests")
+    if not isinstance(requests, list):
+        raise ApiError(400, "'requests' must be a list")
+    if len(requests) > BATCH_LIMIT:
+        raise ApiError(413, f"at most {BATCH_LIMIT} requests per batch")
+
+    responses = []
+    for item in requests:
+        path = item.get("path") if isinstance(item, dict) else None
+        if path == "/v1/batch":
+            responses.append({"status": 400, "body": {"error": "batches cannot be nested"}})
+            continue
+        status, result = dispatch(path, item.get("body") if isinstance(item, dict) else None, owner)
+        responses.append({"status": status, "body": result})
+    return {"responses": responses}
+
+
+ROUTES: Dict[str, Callable[[dict, Optional[str]], dict]] = {
+    "/v1/cashflow": cashflow,
+    "/v1/plan/allocation": allocation,
+    "/v1/plan/next-step": next_step_plan,
+    "/v1/wallet/stats": wallet_stats,
+    "/v1/goals/projections": goal_projections,
+    "/v1/batch": batch,
+}
+
+
+def dispatch(path: Optional[str], body: Any, owner: Optional[str]) -> Tuple[int, dict]:
+    handler = ROUTES.get(path)
+    if handler is None:
+        return 404, {"error": f"unknown path {path!r}"}
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        return 400, {"error": "body must be a JSON object"}
+    try:
+        return 200, handler(body, owner)
+    except ApiError as e:
+        return e.status, {"error": e.message}
+
+
+# ---------- ASGI ----------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def _send_json(send, status: int, payload: dict) -> None:
+    try:
+        data = json.dumps(payload, default=_json_default, ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        status, data = 500, json.dumps({"error": "result is not a finite number"})
+    data = data.encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(data)).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": data})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ApiError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _bearer_owner(headers) -> Optional[str]:
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                owner = session_store.owner_for_token(token.strip())
+                if owner is None:
+                    raise ApiError(401, "unknown or expired token")
+                return owner
+    return None
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if path == HEALTH_PATH:
+        if method == "GET":
+            await _send_json(send, 200, {"ok": True})
+        else:
+            await _send_json(send, 405, {"error": "use GET"})
+        return
+    if path not in ROUTES:
+        await _send_json(send, 404, {"error": f"unknown path {path!r}"})
+        return
+    if method != "POST":
+        await _send_json(send, 405, {"error": "use POST"})
+        return
+
+    # SQLite reads and wallet maths block: they run on the default thread
+    # pool so one slow request does not stall every other connection
+    loop = asyncio.get_running_loop()
+    try:
+        owner = await loop.run_in_executor(None, _bearer_owner, scope.get("headers", ()))
+        raw = await _read_body(receive)
+        body = json.loads(raw, parse_constant=_reject_constant) if raw else {}
+    except ApiError as e:
+        await _send_json(send, e.status, {"error": e.message})
+        return
+    except ValueError:
+        await _send_json(send, 400, {"error": "body is not valid JSON"})
+        return
+
+    status, payload = await loop.run_in_executor(None, dispatch, path, body, owner)
+    await _send_json(send, status, payload)
+
+
+# ---------- BENCHMARK ----------
+
+async def _call(path: str, body: dict, token: Optional[str] = None, method: str = "POST") -> Tuple[int, dict]:
+    """One request through the ASGI app, in-process."""
+    data = json.dumps(body).encode("utf-8")
+    headers = [(b"content-type", b"application/json")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode("latin-1")))
+    scope = {"type": "http", "method": method, "path": path, "headers": headers}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": data, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def _seed_bench_user(transactions: int) -> str:
+    """Store a user with one big wallet and a few goals. Returns its token."""
+    owner = "bench@tesorin.local"
+    rng = random.Random(7)
+    today = date.today()
+    wallet = {
+        "id": "main",
+        "name": "Main wallet",
+        "transactions": sorted(
+            (
+                {
+                    "date": today - timedelta(days=rng.randrange(365)),
+                    "category": "General",
+                    "note": f"txn {i}",
+                    "amount": round(rng.uniform(-2000, 3000), 2),
+                }
+                for i in range(transactions)
+            ),
+            key=lambda t: t["date"],
+        ),
+    }
+    goals = GoalRegistry(
+        {"name": f"Goal {i}", "kind": "Save for a specific purchase", "target": 50000.0,
+         "saved": 1000.0 * i, "monthly_target": 2500.0}
+        for i in range(1, 6)
+    )
+    profile = {"country": "IN", "income": 90000.0, "expenses": 55000.0, "savings": 40000.0, "debt": 0.0}
+    next_step = {"primary_goal": "Build or top up my emergency fund", "monthly_amount": 0.0, "target_amount": 0.0}
+    for key, value in (("profile", profile), ("next_step", next_step), ("wallets", [wallet]), ("goal_plans", goals)):
+        session_store.write(owner, key, value, 0)
+    return session_store.new_token(owner)
+
+
+def run_bench(requests: int, transactions: int) -> None:
+    data_dir = tempfile.mkdtemp(prefix="tesorin-api-bench-")
+    # nothing has connected yet in this process, so this redirects both
+    storage.DATA_DIR = data_dir
+    session_store.DB_PATH = os.path.join(data_dir, "sessions.sqlite3")
+    token = _seed_bench_user(transactions)
+
+    today = date.today()
+    month = {"from": today.replace(day=1).isoformat(), "to": today.isoformat()}
+    cases = [
+        ("/v1/cashflow", {"income": 90000, "expenses": 55000, "country": "IN"}, None),
+        ("/v1/plan/allocation", {"income": 90000, "expenses": 55000, "country": "IN", "debt": 2000}, None),
+        ("/v1/plan/next-step", {}, token),
+        ("/v1/wallet/stats", month, token),
+        ("/v1/goals/projections", {}, token),
+        (
+            "/v1/batch",
+            {"requests": [
+                {"path": "/v1/cashflow", "body": {"income": 90000, "expenses": 55000}},
+                {"path": "/v1/plan/next-step"},
+                {"path": "/v1/wallet/stats", "body": month},
+                {"path": "/v1/goals/projections"},
+            ]},
+            token,
+        ),
+    ]
+
+    async def run() -> None:
+        print(f"{'endpoint':<24} {'req/s':>10} {'mean':>10}")
+        for path, body, auth in cases:
+            status, payload = await _call(path, body, auth)  # warm caches
+            if status != 200:
+                raise SystemExit(f"{path} -> {status}: {payload}")
+            n = max(1, requests // 10) if path == "/v1/wallet/stats" else requests
+            start = time.perf_counter()
+            for _ in range(n):
+                await _call(path, body, auth)
+            elapsed = time.perf_counter() - start
+            print(f"{path:<24} {n / elapsed:>10,.0f} {elapsed / n * 1000:>8.3f}ms")
+
+    asyncio.run(run())
+    print(f"(wallet: {transactions:,} transactions; data in {data_dir})")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tesorin JSON API")
+    parser.add_argument("--bench", action="store_true", help="run the in-process throughput benchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    parser.add_argument("--transactions", type=int, default=10000, help="bench wallet size")
+    args = parser.parse_args(argv)
+
+    if not args.bench:
+        parser.print_help()
+        print("\nServe with an ASGI server, e.g.: uvicorn api:app --port 8600")
+        return 0
+    run_bench(args.requests, args.transactions)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,40 @@
 import streamlit as st
 from datetime import date
 
-from profile import render_profile_page  # <-- now actually used
+from profile import apply_profile_diff, profile_metrics, render_profile_page
+from export import render_account_export
 
 from logic import (
-    calculate_cashflow,
     calculate_net_worth,
-    calculate_savings_rate,
-    emergency_fund_target,
-    savings_rate_target,
     allocate_monthly_plan,
 )
 
 from supabase_client import (
+    is_admin,
     is_configured,
     save_profile,
     sign_up,
     sign_in,
     sign_out,
+    verified_user_id,
 )
 
 from wealthflow import render_wealthflow_tab
 from nextstep import render_next_step_tab
+from goals import GoalRegistry, goal_progress, goal_registry
 from navigation import render_top_navbar
+import jobs
+import metrics
+from metrics import timed
+from session_memory import render_memory_panel, track_session
+from compaction import keep_session_warm
+from session_store import synced_session
+from routing import publish_route, route_from_url
+from forecast import forecast_cashflow
+from networth import current_snapshot, record_snapshot, render_networth_chart
+from emergency import emergency_target
+from cohorts import COHORT_FIELDS, peer_percentile, record_profile
+from plan_engine import warm_cache as warm_plan_cache
 
 # ---------- PAGE CONFIG ----------
 
@@ -324,6 +336,9 @@ def init_state() -> None:
             "debt": 0.0,
             "high_interest_debt": False,
             "goals": [],
+            "budgets": {},
+            "emergency_basis": "expenses",
+            "emergency_percentile": 90,
             # profile / KYC extras
             "has_completed_profile": False,
             "goal_focus": "Getting stable month to month",
@@ -365,18 +380,10 @@ def init_state() -> None:
         }
 
     if "goal_plans" not in ss:
-        ss.goal_plans = []
+        ss.goal_plans = GoalRegistry()
 
-
-def sync_screen_from_query_params() -> None:
-    params = st.experimental_get_query_params()
-    raw = params.get("screen")
-    if not raw:
-        return
-    screen_from_url = raw[0]
-    valid = {"landing", "signup", "login", "country_profile", "main"}
-    if screen_from_url in valid:
-        st.session_state.screen = screen_from_url
+    if "category_overrides" not in ss:
+        ss.category_overrides = {}
 
 
 # ---------- SCREENS ----------
@@ -482,6 +489,10 @@ def page_login() -> None:
                 return
 
             st.session_state.user = user_or_error
+            # plan pre-generated by plan_engine.py → instant Next step tab
+            owner = verified_user_id(user_or_error)
+            if owner is not None:
+                warm_plan_cache(owner)
             # IMPORTANT: after login, go straight to main (no profile page)
             st.session_state.screen = "main"
             st.session_state.main_tab = "home"
@@ -508,44 +519,57 @@ def page_country_profile() -> None:
     # First-time mode controls the button label + redirect behaviour
     first_time = not profile.get("has_completed_profile", False)
 
-    updated_profile, completed = render_profile_page(profile, first_time=first_time)
-    ss.profile = updated_profile
-
-    if completed:
+    diff, submitted = render_profile_page(profile, first_time=first_time)
+    if not first_time:
+        render_account_export(profile, goal_registry(ss))
+
+    if submitted:
+        if diff:
+            apply_profile_diff(ss, diff)
+            # persist only what changed
+            save_profile(diff)
+        # only verified users, once each (the same owners cohorts.rebuild() reads)
+        owner = verified_user_id(ss.get("user"))
+        if owner is not None and (first_time or any(name in diff for name in COHORT_FIELDS)):
+            record_profile(owner, ss.profile)
         ss.profile["has_completed_profile"] = True
         ss.screen = "main"
         ss.main_tab = "home"
         st.rerun()
 
 
+@timed()
 def render_home_tab() -> None:
     ss = st.session_state
     profile = ss.profile
     country = profile["country"]
     currency = get_currency(country)
 
-    income = float(profile["income"])
-    expenses = float(profile["expenses"])
-    savings = float(profile["savings"])
-    debt = float(profile["debt"])
-
-    cashflow = calculate_cashflow(income, expenses)
-    savings_rate = calculate_savings_rate(income, cashflow)
-    low_target, high_target = savings_rate_target(country, income)
-    e_target = emergency_fund_target(expenses, debt)
+    derived = profile_metrics(ss)
+    savings = derived["savings"]
+    e_target, e_from_spending = emergency_target(ss, derived)
+
+    # what the wallets actually show, once there is enough history
+    projected = forecast_cashflow(ss)
+    plan = allocate_monthly_plan(
+        income=derived["income"],
+        expenses=derived["expenses"],
+        country=country,
+        debt=derived["debt"],
+        high_interest_debt=bool(profile.get("high_interest_debt", False)),
+        forecast_cashflow=projected,
+    )
+    cashflow = plan["cashflow"]
+    cashflow_pill = "projected from your wallets" if projected is not None else "to work with"
 
-    emergency_goal = None
-    for g in ss.goal_plans:
-        name = g.get("name", "").lower()
-        kind = g.get("kind", "").lower()
-        if "emergency" in name or "emergency" in kind:
-            emergency_goal = g
-            break
+    goals = goal_registry(ss)
+    emergency_goal = goals.emergency()
 
     if emergency_goal and emergency_goal.get("target", 0) > 0:
         em_target = float(emergency_goal["target"])
         em_saved = float(emergency_goal.get("saved", 0.0))
         em_ratio = max(0.0, min(1.0, em_saved / em_target))
+        em_basis = ""
     else:
         if e_target > 0:
             em_ratio = max(0.0, min(1.0, savings / e_target))
@@ -553,18 +577,19 @@ def render_home_tab() -> None:
             em_ratio = 0.0
         em_target = float(e_target)
         em_saved = float(savings)
+        em_basis = " · sized from your real spending" if e_from_spending else ""
 
     em_percent = em_ratio * 100
     cashflow_display = cashflow if cashflow > 0 else 0.0
 
     goals_html = ""
-    if ss.goal_plans:
+    if goals:
         rows = ""
-        for goal in ss.goal_plans[:3]:
+        for goal in goals.top(3):
             target = float(goal.get("target", 0.0) or 0.0)
             saved = float(goal.get("saved", 0.0) or 0.0)
             if target > 0:
-                pct = int(min(100, max(0, saved / target * 100)))
+                pct = int(goal_progress(goal) * 100)
                 amounts_text = f"{currency}{saved:,.0f} / {currency}{target:,.0f}"
             else:
                 pct = 0
@@ -597,7 +622,7 @@ def render_home_tab() -> None:
       <div class="tesorin-home-title">Monthly cash flow after expenses</div>
       <div>
         <span class="tesorin-home-amount">{currency}{cashflow_display:,.0f}</span>
-        <span class="tesorin-home-pill">to work with</span>
+        <span class="tesorin-home-pill">{cashflow_pill}</span>
       </div>
       <div class="tesorin-home-subcopy">
         Tesorin suggests how much to save, invest, and keep aside so you’re not guessing every month.
@@ -614,7 +639,7 @@ def render_home_tab() -> None:
         <div class="tesorin-home-em-copy">
           Track key goals — safety buffer, debt payoff, and long-term investing — in one calm view.
           <br />
-          Current buffer: {currency}{em_saved:,.0f} / {currency}{em_target:,.0f}
+          Current buffer: {currency}{em_saved:,.0f} / {currency}{em_target:,.0f}{em_basis}
         </div>
       </div>
 
@@ -629,9 +654,21 @@ def render_home_tab() -> None:
     """
     st.markdown(home_html, unsafe_allow_html=True)
 
+    peers = peer_percentile(profile)
+    if peers is not None:
+        percentile, cohort, size = peers
+        st.caption(
+            f"Your savings rate of {derived['savings_rate']:.0f}% is higher than {percentile:.0f}% of "
+            f"{cohort} on Tesorin ({size:,} people)."
+        )
+
+    history = record_snapshot(ss, current_snapshot(ss, savings, derived["debt"], goals))
+    render_networth_chart(history, currency)
+
 
 # ---------- MAIN APP SHELL ----------
 
+@timed()
 def page_main() -> None:
     ss = st.session_state
 
@@ -668,27 +705,52 @@ def page_main() -> None:
             ss.main_tab = "next"
             st.rerun()
 
+    # Hidden diagnostics panels: TESORIN_METRICS on, an admin signed in, and ?admin=...
+    if metrics.ENABLED and is_admin(ss.get("user")):
+        admin = st.query_params.get("admin")
+        if admin == "metrics":
+            metrics.render_metrics_panel()
+        elif admin == "memory":
+            render_memory_panel(ss)
+
 
 # ---------- MAIN ROUTER ----------
 
 def main() -> None:
+    ss = st.session_state
+
+    # URL first: anything it restores is not re-initialised below
+    route_from_url(ss)
     init_state()
-    sync_screen_from_query_params()
-    screen = st.session_state.screen
-
-    if screen == "landing":
-        page_landing()
-    elif screen == "signup":
-        page_signup()
-    elif screen == "login":
-        page_login()
-    elif screen == "country_profile":
-        page_country_profile()
-    elif screen == "main":
-        page_main()
-    else:
-        st.session_state.screen = "landing"
-        page_landing()
+
+    # Restore the session if it was compacted while idle, then sync it
+    # with the shared store (load at the start, save at the end).
+    with keep_session_warm(ss), synced_session(ss):
+        track_session(ss)
+        screen = ss.screen
+        metrics.count_rerun(f"main/{ss.main_tab}" if screen == "main" else screen)
+
+        try:
+            if screen == "landing":
+                page_landing()
+            elif screen == "signup":
+                page_signup()
+            elif screen == "login":
+                page_login()
+            elif screen == "country_profile":
+                page_country_profile()
+            elif screen == "main":
+                page_main()
+            else:
+                ss.screen = "landing"
+                page_landing()
+        finally:
+            # also runs when st.rerun() cut the script short
+            publish_route(ss)
+            # stop background jobs for tabs the user has left
+            jobs.release_session(keep_tag=ss.main_tab if ss.screen == "main" else ss.screen)
+            # here too, or runs ending in st.rerun() (most clicks) never export
+            metrics.maybe_export()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,244 @@
+# bench.py
+#
+# Micro-benchmarks for the core compute paths, with stored baselines.
+#
+# Usage:
+#   python bench.py                       # run and compare to bench_baseline.json
+#   python bench.py --save                # run and overwrite the baseline
+#   python bench.py --threshold 0.10      # fail on >10% slowdown (default 25%)
+#   python bench.py --sizes 1e3,1e4,1e7   # wallet sizes for the wallet benchmarks
+#   python bench.py --only wallet         # run benchmarks whose name contains "wallet"
+#
+# Each benchmark reports the best-of-N time for one call, which is the most
+# stable number on a shared machine. Exit code is 1 when any benchmark is
+# slower than baseline × (1 + threshold), so this can run in CI.
+#
+# Baselines are machine-specific: re-save them when moving to new hardware.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+# Benchmarks always measure the uninstrumented code.
+os.environ.pop("TESORIN_METRICS", None)
+
+import logic  # noqa: E402
+from logic import compute_wallet_stats  # noqa: E402
+from goals import GoalRegistry  # noqa: E402
+from search import TransactionIndex  # noqa: E402
+from wealthflow import format_transaction_rows  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_SIZES = "1e3,1e4,1e5,1e6"
+TABLE_SIZES = (100, 1000, 10000)
+MIN_REPEATS = 3
+TARGET_SECONDS = 1.0  # time budget per benchmark (more repeats for fast ones)
+
+
+# ---------- DATA ----------
+
+def make_wallet(n: int, seed: int = 7) -> dict:
+    """Wallet with n transactions spread over the last 365 days."""
+    rng = random.Random(seed)
+    today = date.today()
+    categories = ["General", "Groceries", "Rent", "Salary", "Transport", "Eating out"]
+    return {
+        "id": "bench",
+        "name": "Bench wallet",
+        "transactions": [
+            {
+                "date": today - timedelta(days=rng.randrange(365)),
+                "category": rng.choice(categories),
+                "note": f"txn {i}",
+                "amount": round(rng.uniform(-2000, 3000), 2),
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def make_goals(n: int) -> GoalRegistry:
+    goals = [
+        {
+            "id": f"g{i + 1}",
+            "name": f"Goal {i + 1}",
+            "kind": "Save for a specific purchase",
+            "target": 100000.0,
+            "saved": 0.0,
+            "monthly_target": 5000.0,
+            "timeframe": "Next 2–3 years",
+            "why": "",
+        }
+        for i in range(n)
+    ]
+    # worst case for a linear scan: the emergency goal is last
+    goals[-1]["name"] = "Emergency fund"
+    goals[-1]["kind"] = "Build or top up my emergency fund"
+    return GoalRegistry(goals)
+
+
+# ---------- BENCHMARKS ----------
+
+def bench_logic_plan() -> None:
+    for income in range(0, 100000, 100):
+        logic.allocate_monthly_plan(
+            income=float(income),
+            expenses=income * 0.6,
+            country="IN" if income % 200 else "CA",
+            debt=1000.0 if income % 300 else 0.0,
+            high_interest_debt=bool(income % 500),
+        )
+
+
+def bench_logic_targets() -> None:
+    for income in range(0, 100000, 100):
+        cashflow = logic.calculate_cashflow(income, income * 0.6)
+        logic.calculate_savings_rate(income, cashflow)
+        logic.savings_rate_target("IN", income)
+        logic.emergency_fund_target(income * 0.6, 0.0)
+        logic.calculate_net_worth(income * 3.0, 5000.0)
+
+
+def goal_updates(goals: GoalRegistry, updates: int) -> Callable[[], None]:
+    names = [g["name"] for g in goals]
+
+    def run() -> None:
+        for i in range(updates):
+            goal = goals.by_name(names[i % len(names)])
+            goals.contribute(goal["id"], 100.0)
+            goals.emergency()
+
+    return run
+
+
+def build_benchmarks(sizes: List[int]) -> Dict[str, Callable[[], None]]:
+    benches: Dict[str, Callable[[], None]] = {
+        "logic.allocate_monthly_plan[x1000]": bench_logic_plan,
+        "logic.targets[x1000]": bench_logic_targets,
+    }
+
+    today = date.today()
+    month_start = today.replace(day=1)
+    year_start = today - timedelta(days=365)
+    for n in sizes:
+        wallet = make_wallet(n)
+        benches[f"wallet.compute_wallet_stats[month,n={n}]"] = (
+            lambda w=wallet: compute_wallet_stats(w, month_start, today)
+        )
+        benches[f"wallet.compute_wallet_stats[year,n={n}]"] = (
+            lambda w=wallet: compute_wallet_stats(w, year_start, today)
+        )
+        index = TransactionIndex(wallet["transactions"])
+        benches[f"search.text+category[n={n}]"] = (
+            lambda i=index: i.search("txn 1", "Groceries")
+        )
+        benches[f"search.amount+period[n={n}]"] = (
+            lambda i=index: i.search("", None, (-500.0, 0.0), (month_start, today))
+        )
+
+    for n in TABLE_SIZES:
+        txns = make_wallet(n)["transactions"]
+        benches[f"table.format_transaction_rows[n={n}]"] = (
+            lambda t=txns: format_transaction_rows(t, "₹")
+        )
+
+    for n in (10, 100, 1000):
+        benches[f"goals.update[goals={n},updates=1000]"] = goal_updates(make_goals(n), 1000)
+
+    return benches
+
+
+# ---------- RUNNER ----------
+
+def measure(func: Callable[[], None]) -> float:
+    """Best-of-N wall time for one call."""
+    best = float("inf")
+    spent = 0.0
+    runs = 0
+    while runs < MIN_REPEATS or spent < TARGET_SECONDS:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+        if elapsed > TARGET_SECONDS and runs >= 1:
+            break
+    return best
+
+
+def parse_sizes(raw: str) -> List[int]:
+    return [int(float(s)) for s in raw.split(",") if s.strip()]
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, float]) -> None:
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "saved": date.today().isoformat(),
+        },
+        "results": {name: round(seconds, 9) for name, seconds in sorted(results.items())},
+    }
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tesorin compute benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="wallet sizes, e.g. 1e3,1e5,1e7")
+    parser.add_argument("--only", default="", help="substring filter on benchmark names")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--save", action="store_true", help="overwrite the stored baseline")
+    args = parser.parse_args(argv)
+
+    benches = build_benchmarks(parse_sizes(args.sizes))
+    if args.only:
+        benches = {k: v for k, v in benches.items() if args.only in k}
+
+    baseline = load_baseline().get("results", {})
+    results: Dict[str, float] = {}
+    regressions = []
+
+    print(f"{'benchmark':<48} {'time':>12} {'baseline':>12} {'change':>8}")
+    for name, func in benches.items():
+        seconds = measure(func)
+        results[name] = seconds
+        base = baseline.get(name)
+        if base:
+            change = seconds / base - 1
+            flag = "  REGRESSION" if change > args.threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<48} {seconds * 1000:>10.3f}ms {base * 1000:>10.3f}ms {change:>+7.1%}{flag}")
+        else:
+            print(f"{name:<48} {seconds * 1000:>10.3f}ms {'-':>12} {'new':>8}")
+
+    if args.save:
+        merged = {**baseline, **results}
+        save_baseline(merged)
+        print(f"Baseline saved to {os.path.basename(BASELINE_PATH)} ({len(merged)} benchmarks).")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
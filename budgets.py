@@ -0,0 +1,170 @@
+# budgets.py
+#
+# Per-category monthly budgets.
+#
+# Budgets live on the profile: ss.profile["budgets"] = {"Groceries": 6000.0}.
+# Spending is kept per wallet in a SpendTotals in session_state
+# (ss.spend_totals[wallet_id]): net outflow per (month, category), so a
+# refund brings the category back down. `observe()` folds in one new
+# transaction in O(1); the totals are only rebuilt when their transaction
+# count no longer matches the wallet (same rule as forecast.py).
+#
+# Progress for a month is then one dict lookup per budget and wallet, plus
+# the recurring rules of that month in closed form (recurring.py), so the
+# bars cost the same however long the history is.
+
+import calendar
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+import storage
+from recurring import count_occurrences
+from session_memory import HISTORY_NAMESPACE
+from supabase_client import save_profile
+
+# offered (at zero) in the editor until the first budget is saved
+SUGGESTED_CATEGORIES = ("Groceries", "Eating out", "Transport", "Shopping", "Utilities")
+
+
+def _month_key(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def _category_key(category: str) -> str:
+    return (category or "").strip().lower()
+
+
+class SpendTotals:
+    """Net spending per (month key, category) for one wallet."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.spent: Dict[Tuple[int, str], float] = {}
+
+    def observe(self, txn: dict) -> None:
+        self.count += 1
+        key = (_month_key(txn["date"]), _category_key(txn.get("category")))
+        self.spent[key] = self.spent.get(key, 0.0) - float(txn["amount"])
+
+    def month(self, month: date, category: str) -> float:
+        return self.spent.get((_month_key(month), _category_key(category)), 0.0)
+
+
+def wallet_spend(ss, wallet: dict) -> SpendTotals:
+    """The wallet's totals, rebuilt only if they no longer match the wallet."""
+    totals_by_wallet = ss.setdefault("spend_totals", {})
+    totals = totals_by_wallet.get(wallet["id"])
+    expected = len(wallet["transactions"]) + wallet.get("archived_count", 0)
+    if totals is None or totals.count != expected:
+        totals = SpendTotals()
+        if wallet.get("archived_count"):
+            for txn in storage.get(HISTORY_NAMESPACE, wallet["archive_key"], default=[]):
+                totals.observe(txn)
+        for txn in wallet["transactions"]:
+            totals.observe(txn)
+        totals_by_wallet[wallet["id"]] = totals
+    return totals
+
+
+def observe_spend(ss, wallet: dict, txn: dict) -> None:
+    """Call after appending `txn` to the wallet."""
+    totals = ss.get("spend_totals", {}).get(wallet["id"])
+    if totals is not None and totals.count == len(wallet["transactions"]) + wallet.get("archived_count", 0) - 1:
+        totals.observe(txn)
+    # otherwise wallet_spend() rebuilds them on next use
+
+
+def budget_progress(ss, month: date, today: Optional[date] = None) -> List[dict]:
+    """
+    One row per budget for the month containing `month`: budget, spent so
+    far (all wallets, recurring rules up to today) and the share used.
+    """
+    budgets = ss.profile.get("budgets") or {}
+    if not budgets:
+        return []
+    today = today or date.today()
+    first = month.replace(day=1)
+    last = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+    rules_until = min(last, today)
+
+    wallets = ss.get("wallets", [])
+    totals = [wallet_spend(ss, w) for w in wallets]
+    # rules only count for days already past
+    rules = [r for w in wallets for r in w.get("recurring", ())] if first <= rules_until else []
+
+    rows = []
+    for category, budget in budgets.items():
+        spent = sum(t.month(first, category) for t in totals)
+        key = _category_key(category)
+        for rule in rules:
+            if _category_key(rule["category"]) == key:
+                spent -= rule["amount"] * count_occurrences(rule, first, rules_until)
+        spent = max(spent, 0.0)
+        rows.append(
+            {
+                "category": category,
+                "budget": budget,
+                "spent": spent,
+                "share": spent / budget if budget > 0 else 0.0,
+                "over": spent > budget,
+            }
+        )
+    rows.sort(key=lambda r: r["share"], reverse=True)
+    return rows
+
+
+# ---------- UI ----------
+
+def render_budgets(ss, currency: str, month: date) -> None:
+    st.markdown(f"##### Budgets · {month:%b %Y}")
+    rows = budget_progress(ss, month)
+    if not rows:
+        st.caption("No monthly budgets yet – add some below to track spending per category.")
+    for row in rows:
+        label = f"{row['category']}: {currency}{row['spent']:,.0f} of {currency}{row['budget']:,.0f}"
+        if row["over"]:
+            label += f" · over by {currency}{row['spent'] - row['budget']:,.0f}"
+        st.progress(min(row["share"], 1.0), text=label)
+
+    render_budget_editor(ss, currency)
+
+
+def render_budget_editor(ss, currency: str) -> None:
+    budgets = ss.profile.get("budgets") or {}
+    # a new key after each save starts the editor from the saved budgets
+    editor_key = f"budgets_editor_{ss.get('budgets_round', 0)}"
+    with st.expander("Edit monthly budgets"):
+        with st.form("budgets_form"):
+            rows = [{"Category": c, "Budget": b} for c, b in budgets.items()]
+            if not rows:
+                rows = [{"Category": c, "Budget": 0.0} for c in SUGGESTED_CATEGORIES]
+            edited = st.data_editor(
+                rows,
+                key=editor_key,
+                num_rows="dynamic",
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "Category": st.column_config.TextColumn("Category", required=True),
+                    "Budget": st.column_config.NumberColumn(
+                        f"Monthly budget ({currency})", min_value=0.0, step=500.0, format="%.0f"
+                    ),
+                },
+            )
+            st.caption("Rows left at 0 are not saved.")
+            submitted = st.form_submit_button("Save budgets")
+
+    if submitted:
+        updated = {}
+        for row in edited:
+            category = (row.get("Category") or "").strip()
+            amount = float(row.get("Budget") or 0.0)
+            if category and amount > 0:
+                updated[category] = amount
+        if updated != budgets:
+            ss.profile["budgets"] = updated
+            save_profile({"budgets": updated})
+            ss.budgets_round = ss.get("budgets_round", 0) + 1
+            st.rerun()
@@ -0,0 +1,187 @@
+# categorize.py
+#
+# Rule-based transaction categories.
+#
+# Keywords (merchants, common note words) map to categories. They are
+# compiled once, at import, into an Aho-Corasick automaton: one pass over
+# a note finds every keyword in it, however many rules there are. Keywords
+# only match at the start of a word ("rent" does not match "current"); a
+# keyword ending in a space must be a whole word. The longest keyword
+# found wins, so "uber eats" beats "uber".
+#
+# Notes are normalized first (lowercase, digits and punctuation dropped),
+# so "UBER *TRIP 8842" and "Uber trip 1177" are the same note. Matches are
+# memoized per normalized note: statements repeat the same merchants, so a
+# bulk import mostly costs one regex substitution and a dict lookup per row.
+#
+# User overrides (ss.category_overrides: normalized note -> category) are
+# learned when someone picks a category by hand and win over the rules.
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CATEGORY = "General"
+
+RULES: Dict[str, Tuple[str, ...]] = {
+    "Salary": ("salary", "payroll", "wages", "stipend", "direct deposit"),
+    "Rent": ("rent ", "landlord", "lease ", "maintenance charges"),
+    "Groceries": (
+        "grocery", "groceries", "supermarket", "bigbasket", "blinkit", "zepto",
+        "dmart", "reliance fresh", "more supermarket", "loblaws", "sobeys",
+        "no frills", "freshco", "superstore", "food basics", "costco", "walmart",
+    ),
+    "Eating out": (
+        "restaurant", "cafe", "coffee", "starbucks", "tim hortons", "swiggy",
+        "zomato", "mcdonald", "domino", "pizza", "uber eats", "doordash",
+        "skipthedishes", "lunch", "dinner",
+    ),
+    "Transport": (
+        "uber", "ola ", "rapido", "lyft", "taxi", "metro card", "presto",
+        "transit", "petrol", "fuel", "gas station", "esso", "shell ",
+        "petro canada", "parking", "fastag", "irctc", "railway",
+    ),
+    "Utilities": (
+        "electricity", "hydro", "water bill", "gas bill", "utility", "bescom",
+        "tata power", "enbridge", "internet", "broadband", "jio", "airtel",
+        "vodafone", "rogers", "bell ", "telus", "fido", "mobile bill",
+    ),
+    "Subscriptions": (
+        "netflix", "spotify", "prime video", "amazon prime", "hotstar",
+        "disney", "youtube premium", "apple com bill", "icloud", "subscription",
+    ),
+    "Shopping": (
+        "amazon", "flipkart", "myntra", "ajio", "meesho", "canadian tire",
+        "best buy", "ikea", "decathlon",
+    ),
+    "Health": (
+        "pharmacy", "apollo", "medplus", "shoppers drug mart", "rexall",
+        "hospital", "clinic", "doctor", "dental", "dentist",
+    ),
+    "Insurance": ("insurance", "lic ", "premium"),
+    "Fees": ("bank charge", "service charge", "atm fee", "late fee", "interest charge", "annual fee"),
+    "Transfers": ("transfer", "upi", "neft", "imps", "e transfer", "interac"),
+    "Investments": ("mutual fund", "sip ", "zerodha", "groww", "wealthsimple", "questrade", "ppf", "rrsp", "tfsa"),
+    "Travel": ("airline", "air india", "indigo", "air canada", "westjet", "hotel", "airbnb", "booking com", "makemytrip"),
+    "Education": ("tuition", "school", "college", "university", "course", "udemy", "coursera"),
+}
+
+_NOT_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def normalize_note(note: str) -> str:
+    """'UBER *TRIP 8842' -> 'uber trip'."""
+    return _NOT_LETTERS.sub(" ", note.lower()).strip()
+
+
+class Categorizer:
+    """Aho-Corasick automaton over rule keywords (a DFA: one dict lookup per character)."""
+
+    def __init__(self, rules: Dict[str, Iterable[str]]) -> None:
+        self.categories: List[str] = []
+        self.lengths: List[int] = []
+        goto: List[Dict[str, int]] = [{}]
+        output: List[int] = [-1]
+
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                # leading space = start of a word (notes are matched as " note ")
+                pattern = " " + normalize_note(keyword) + (" " if keyword.endswith(" ") else "")
+                state = 0
+                for ch in pattern:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = goto[state][ch] = len(goto)
+                        goto.append({})
+                        output.append(-1)
+                    state = nxt
+                output[state] = len(self.categories)
+                self.categories.append(category)
+                self.lengths.append(len(pattern))
+
+        # breadth-first: fail links, and fill in every transition so that
+        # matching never follows a fail link at run time
+        fail = [0] * len(goto)
+        best = list(output)  # longest keyword ending at each state
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f][ch] if ch in goto[f] and goto[f][ch] != nxt else 0
+                inherited = best[fail[nxt]]
+                if inherited >= 0 and (best[nxt] < 0 or self.lengths[inherited] > self.lengths[best[nxt]]):
+                    best[nxt] = inherited
+        for state in queue:
+            for ch, nxt in goto[fail[state]].items():
+                goto[state].setdefault(ch, nxt)
+
+        self._goto = goto
+        self._best = best
+
+    def match(self, normalized: str) -> Optional[str]:
+        """Category of the longest keyword in a normalized note, or None."""
+        goto, best, lengths = self._goto, self._best, self.lengths
+        state = 0
+        found = -1
+        for ch in " " + normalized + " ":
+            state = goto[state].get(ch, 0)
+            hit = best[state]
+            if hit >= 0 and (found < 0 or lengths[hit] > lengths[found]):
+                found = hit
+        return self.categories[found] if found >= 0 else None
+
+
+DEFAULT_CATEGORIZER = Categorizer(RULES)
+
+
+_match = lru_cache(maxsize=65536)(DEFAULT_CATEGORIZER.match)
+
+
+def _classify(note: str) -> Tuple[str, Optional[str]]:
+    normalized = normalize_note(note)
+    return normalized, _match(normalized)
+
+
+def categorize(note: str, overrides: Optional[Dict[str, str]] = None) -> str:
+    normalized, category = _classify(note or "")
+    if overrides:
+        category = overrides.get(normalized, category)
+    return category or DEFAULT_CATEGORY
+
+
+def categorize_batch(transactions: Iterable[dict], overrides: Optional[Dict[str, str]] = None) -> int:
+    """
+    Fill in the category of every transaction without one (missing, blank
+    or "General"), in place. Returns how many got a category.
+    """
+    overrides = overrides or {}
+    filled = 0
+    for txn in transactions:
+        if (txn.get("category") or DEFAULT_CATEGORY) != DEFAULT_CATEGORY:
+            continue
+        normalized, category = _classify(txn.get("note") or "")
+        category = overrides.get(normalized, category)
+        txn["category"] = category or DEFAULT_CATEGORY
+        filled += category is not None
+    return filled
+
+
+def learn_override(overrides: Dict[str, str], note: str, category: str) -> bool:
+    """
+    Remember a category picked by hand for this note. Returns True if
+    that changed anything (the caller marks it dirty).
+    """
+    normalized = normalize_note(note or "")
+    category = (category or "").strip()
+    if not normalized or not category:
+        return False
+    if category == (_match(normalized) or DEFAULT_CATEGORY):
+        # the rules already say so
+        return overrides.pop(normalized, None) is not None
+    if overrides.get(normalized) == category:
+        return False
+    overrides[normalized] = category
+    return True
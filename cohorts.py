@@ -0,0 +1,396 @@
+# cohorts.py
+#
+# Savings-rate benchmarks: how a user's savings rate compares with people
+# like them (same country, income bracket, age band and household size).
+#
+# Each cohort has a KLL quantile sketch of the savings rates in it: a few
+# hundred numbers however many users there are, with ranks accurate to
+# about 1%. Sketches merge, so they can be built in pieces and combined:
+#
+# - `python cohorts.py` rebuilds every cohort from the profiles in the
+#   session store, a chunk of users per worker process, and merges the
+#   partial sketches.
+# - Between rebuilds, a saved profile is added to this process's own
+#   sketch of its cohort, and that sketch is written to its own row
+#   (cohort, source = this process). Processes never write the same row,
+#   so there are no conflicts.
+# - Every rebuild starts a new epoch (cohort_epoch) and, in one
+#   transaction with writing its sketches, deletes every row of an older
+#   epoch. Rows are tagged with the epoch they were built in, and a
+#   process that sees a new epoch starts fresh sketches, so nothing added
+#   before a rebuild is counted again after it. (A save made while the
+#   rebuild runs may be missing until the next one.)
+#   Sketches cannot forget a value, so a process only adds a user's first
+#   save of an epoch: one user saving over and over cannot skew a cohort
+#   (until the next rebuild a changed profile counts once in the batch
+#   and once in each process the user saved it in).
+#
+# Reading a cohort merges its rows once and keeps the result as a sorted
+# CDF in this process for REFRESH_SECONDS, so the home tab's percentile is
+# a binary search over a few hundred numbers, not a scan over users.
+# Cohorts with fewer than MIN_COHORT users fall back to a broader one
+# (country + income bracket, then country).
+#
+# Usage:
+#   python cohorts.py                   # rebuild all cohorts
+#   python cohorts.py --workers 4
+#
+# Settings (env):
+#   TESORIN_COHORT_DB   path of the SQLite file (default <data dir>/cohorts.sqlite3)
+
+import argparse
+import bisect
+import os
+import pickle
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import session_store
+import storage
+from logic import calculate_cashflow, calculate_savings_rate
+
+DB_PATH = os.getenv("TESORIN_COHORT_DB", os.path.join(storage.DATA_DIR, "cohorts.sqlite3"))
+SKETCH_K = 200
+MIN_COHORT = 30
+REFRESH_SECONDS = 60
+BATCH_SOURCE = "batch"
+# fields that decide the cohort or the savings rate
+COHORT_FIELDS = ("country", "age", "household_size", "income", "expenses")
+
+# upper bounds of the monthly income brackets (same as logic.savings_rate_target)
+INCOME_BRACKETS = {"IN": (30000, 60000), "CA": (3000, 6000)}
+BRACKET_LABELS = ("lower", "middle", "higher")
+# (exclusive upper bound, label)
+AGE_BANDS = ((25, "under 25"), (35, "aged 25–34"), (45, "aged 35–44"), (55, "aged 45–54"), (200, "aged 55+"))
+HOUSEHOLD_BANDS = (
+    (2, "living alone"),
+    (3, "in 2-person households"),
+    (5, "in 3–4 person households"),
+    (100, "in households of 5+"),
+)
+
+_random = random.Random()
+
+
+# ---------- SKETCH ----------
+
+class KLLSketch:
+    """
+    KLL quantile sketch. Level h holds items that stand for 2**h values;
+    a full level is sorted and every other item (random offset) moves up.
+    """
+
+    def __init__(self, k: int = SKETCH_K) -> None:
+        self.k = k
+        self.n = 0
+        self.levels: List[List[float]] = [[]]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(self.k * (2 / 3) ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def add(self, value: float) -> None:
+        self.levels[0].append(float(value))
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for h, items in enumerate(self.levels):
+                if len(items) >= self._capacity(h):
+                    if h + 1 == len(self.levels):
+                        self.levels.append([])
+                    items.sort()
+                    keep = [items.pop()] if len(items) % 2 else []
+                    self.levels[h + 1].extend(items[_random.getrandbits(1)::2])
+                    self.levels[h] = keep
+                    break
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self._compress()
+
+    def cdf(self) -> "CohortCDF":
+        weighted = sorted((v, 1 << h) for h, items in enumerate(self.levels) for v in items)
+        values, cumulative, total = [], [], 0
+        for value, weight in weighted:
+            total += weight
+            values.append(value)
+            cumulative.append(total)
+        return CohortCDF(values, cumulative, self.n)
+
+
+class CohortCDF:
+    """Sorted sketch items with cumulative weights, for rank lookups."""
+
+    __slots__ = ("values", "cumulative", "n")
+
+    def __init__(self, values: List[float], cumulative: List[int], n: int) -> None:
+        self.values = values
+        self.cumulative = cumulative
+        self.n = n
+
+    def percentile(self, value: float) -> float:
+        """Share of the cohort (0–100) with a lower savings rate."""
+        if not self.values:
+            return 0.0
+        i = bisect.bisect_left(self.values, value)
+        below = self.cumulative[i - 1] if i else 0
+        return 100.0 * below / self.cumulative[-1]
+
+
+# ---------- COHORTS ----------
+
+def _band(value: float, bands) -> str:
+    for upper, label in bands:
+        if value < upper:
+            return label
+    return bands[-1][1]
+
+
+def cohort_keys(profile: dict) -> Tuple[str, ...]:
+    """Finest to broadest cohort of a profile: full, country + income, country."""
+    country = profile.get("country") or "IN"
+    income = float(profile.get("income") or 0.0)
+    low, high = INCOME_BRACKETS.get(country, INCOME_BRACKETS["CA"])
+    bracket = BRACKET_LABELS[0 if income < low else 1 if income < high else 2]
+    age = _band(int(profile.get("age") or 0), AGE_BANDS)
+    household = _band(int(profile.get("household_size") or 1), HOUSEHOLD_BANDS)
+    return (
+        f"{country}|{bracket}|{age}|{household}",
+        f"{country}|{bracket}",
+        country,
+    )
+
+
+def cohort_label(key: str) -> str:
+    parts = key.split("|")
+    country = {"IN": "India", "CA": "Canada"}.get(parts[0], parts[0])
+    if len(parts) == 1:
+        return f"people in {country}"
+    if len(parts) == 2:
+        return f"{parts[1]}-income people in {country}"
+    return f"{parts[1]}-income people {parts[2]} {parts[3]} in {country}"
+
+
+def savings_rate(profile: dict) -> Optional[float]:
+    """The profile's savings rate in %, or None without an income."""
+    income = float(profile.get("income") or 0.0)
+    if income <= 0:
+        return None
+    return calculate_savings_rate(income, calculate_cashflow(income, float(profile.get("expenses") or 0.0)))
+
+
+def add_profile(sketches: Dict[str, KLLSketch], profile: dict) -> bool:
+    rate = savings_rate(profile)
+    if rate is None:
+        return False
+    for key in cohort_keys(profile):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = KLLSketch()
+        sketch.add(rate)
+    return True
+
+
+# ---------- DATABASE ----------
+
+_local = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cohort_sketches (
+                cohort  TEXT NOT NULL,
+                source  TEXT NOT NULL,
+                sketch  BLOB NOT NULL,
+                updated REAL NOT NULL,
+                epoch   INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (cohort, source)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cohort_epoch (id INTEGER PRIMARY KEY CHECK (id = 0), epoch INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO cohort_epoch (id, epoch) VALUES (0, 0)")
+        _local.conn = conn
+    return conn
+
+
+def _dumps(value) -> bytes:
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+
+def write_sketch(cohort: str, source: str, sketch: KLLSketch, epoch: int, updated: Optional[float] = None) -> None:
+    _conn().execute(
+        "INSERT OR REPLACE INTO cohort_sketches (cohort, source, sketch, updated, epoch) VALUES (?, ?, ?, ?, ?)",
+        (cohort, source, _dumps(sketch), updated or time.time(), epoch),
+    )
+
+
+def current_epoch() -> int:
+    return _conn().execute("SELECT epoch FROM cohort_epoch WHERE id = 0").fetchone()[0]
+
+
+def read_cohort(cohort: str) -> KLLSketch:
+    """All rows of a cohort, merged."""
+    merged = KLLSketch()
+    rows = _conn().execute("SELECT sketch FROM cohort_sketches WHERE cohort = ?", (cohort,))
+    for (blob,) in rows.fetchall():
+        merged.merge(pickle.loads(zlib.decompress(blob)))
+    return merged
+
+
+# ---------- THIS PROCESS ----------
+
+_SOURCE = f"{socket.gethostname()}:{os.getpid()}:{int(time.time())}"
+_lock = threading.Lock()
+_sketches: Dict[str, KLLSketch] = {}  # profiles saved in this process
+_recorded: Set[str] = set()  # owners already in _sketches
+_epoch: Optional[int] = None  # epoch of _sketches
+_cdfs: Dict[str, Tuple[float, CohortCDF]] = {}  # cohort -> (loaded at, cdf)
+
+
+def record_profile(owner: str, profile: dict) -> None:
+    """Add a verified user's saved profile to this process's cohort sketches and store them."""
+    global _epoch
+    rate = savings_rate(profile)
+    if rate is None:
+        return
+    with _lock:
+        conn = _conn()
+        # same lock as rebuild(): rows are never written for an epoch it has just ended
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            epoch = current_epoch()
+            if epoch != _epoch:
+                # a rebuild has folded our sketches in (or this is the first save)
+                _sketches.clear()
+                _recorded.clear()
+                _epoch = epoch
+            if owner not in _recorded:
+                _recorded.add(owner)
+                for key in cohort_keys(profile):
+                    sketch = _sketches.get(key)
+                    if sketch is None:
+                        sketch = _sketches[key] = KLLSketch()
+                    sketch.add(rate)
+                    write_sketch(key, _SOURCE, sketch, epoch)
+                    _cdfs.pop(key, None)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _cohort_cdf(cohort: str) -> CohortCDF:
+    now = time.time()
+    with _lock:
+        cached = _cdfs.get(cohort)
+    if cached is not None and now - cached[0] < REFRESH_SECONDS:
+        return cached[1]
+    cdf = read_cohort(cohort).cdf()
+    with _lock:
+        _cdfs[cohort] = (now, cdf)
+    return cdf
+
+
+def peer_percentile(profile: dict) -> Optional[Tuple[float, str, int]]:
+    """
+    (percentile, cohort description, cohort size) of the profile's savings
+    rate, from the finest cohort with at least MIN_COHORT users, or None.
+    """
+    rate = savings_rate(profile)
+    if rate is None:
+        return None
+    for key in cohort_keys(profile):
+        cdf = _cohort_cdf(key)
+        if cdf.n >= MIN_COHORT:
+            return cdf.percentile(rate), cohort_label(key), cdf.n
+    return None
+
+
+# ---------- BATCH ----------
+
+def _build_chunk(owners: List[str]) -> Dict[str, KLLSketch]:
+    sketches: Dict[str, KLLSketch] = {}
+    for owner in owners:
+        profile = session_store.read(owner, ["profile"]).get("profile", (0, None))[1]
+        if profile and profile.get("has_completed_profile"):
+            add_profile(sketches, profile)
+    return sketches
+
+
+def rebuild(owners: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> int:
+    """
+    Rebuild every cohort from the stored profiles (chunks of users in a
+    process pool, partial sketches merged here). Returns how many cohorts
+    were written.
+    """
+    owners = list(session_store.owners() if owners is None else owners)
+    size = max(1, len(owners) // ((workers or os.cpu_count() or 4) * 4))
+    chunks = [owners[i:i + size] for i in range(0, len(owners), size)]
+
+    merged: Dict[str, KLLSketch] = {}
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for partial in pool.map(_build_chunk, chunks):
+                for key, sketch in partial.items():
+                    if key in merged:
+                        merged[key].merge(sketch)
+                    else:
+                        merged[key] = sketch
+
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        epoch = current_epoch() + 1
+        conn.execute("UPDATE cohort_epoch SET epoch = ? WHERE id = 0", (epoch,))
+        # per-process rows are part of the rebuild now (or lost, if saved while it ran)
+        conn.execute("DELETE FROM cohort_sketches WHERE epoch < ?", (epoch,))
+        for key, sketch in merged.items():
+            write_sketch(key, BATCH_SOURCE, sketch, epoch)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return len(merged)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild savings-rate cohort sketches from stored profiles")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    written = rebuild(workers=args.workers)
+    print(f"Wrote {written} cohort sketch(es) to {DB_PATH}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# compaction.py
+#
+# Idle-session compaction.
+#
+# Users leave tabs open for days and every open session keeps its wallets,
+# goals and next-step answers in server RAM. After TESORIN_IDLE_TIMEOUT
+# minutes without a rerun, a background sweeper writes those values to a
+# compressed blob (storage.py) and empties them in place. The next rerun of
+# that session fills them back before any page code runs, so the user never
+# notices.
+#
+# The derived per-wallet structures (search indexes, forecast models...)
+# are not saved at all: compaction just empties them, and each one is
+# rebuilt from the refilled wallets on first use because its transaction
+# count no longer matches.
+#
+# We keep references to the session's own containers (the wallets list,
+# the next_step dict...) rather than to Streamlit's session object, so this
+# needs no private Streamlit API: emptying a container empties it inside
+# the session too.
+#
+# Settings (env):
+#   TESORIN_IDLE_TIMEOUT      minutes before an idle session is compacted
+#                             (default 30, 0 = off)
+#   TESORIN_COMPACTED_TTL     hours to keep a compacted session that never
+#                             comes back (default 72)
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import storage
+from session_memory import current_session_id
+
+IDLE_TIMEOUT_SECONDS = float(os.getenv("TESORIN_IDLE_TIMEOUT", "30")) * 60
+COMPACTED_TTL_SECONDS = float(os.getenv("TESORIN_COMPACTED_TTL", "72")) * 3600
+COMPACT_KEYS = ("wallets", "goal_plans", "next_step")
+DERIVED_KEYS = (
+    "search_indexes",
+    "forecast_models",
+    "dedupe_indexes",
+    "spend_totals",
+    "monthly_spend",
+    "anomaly_detectors",
+)
+NAMESPACE = "idle_sessions"
+
+log = logging.getLogger(__name__)
+
+_registry_lock = threading.Lock()
+_sessions: Dict[str, dict] = {}
+_sweeper: Optional[threading.Thread] = None
+
+
+# ---------- HOLLOW / REFILL ----------
+
+def _hollow(value: Any) -> None:
+    """Empty a container in place."""
+    if isinstance(value, (list, dict)):
+        value.clear()
+    else:
+        value.__dict__.clear()
+
+
+def _refill(value: Any, saved: Any) -> None:
+    if isinstance(value, list):
+        value.extend(saved)
+    elif isinstance(value, dict):
+        value.update(saved)
+    else:
+        value.__dict__.update(saved)
+
+
+def _drop(value: Any) -> None:
+    """Empty derived data in place; it rebuilds itself on next use."""
+    if isinstance(value, dict):
+        value.clear()
+    else:
+        # e.g. MonthlySpend: back to a fresh one, whose count matches nothing
+        value.__init__()
+
+
+def _snapshot(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return value
+    return vars(value)
+
+
+# ---------- SESSION HOOK ----------
+
+@contextmanager
+def keep_session_warm(ss):
+    """
+    Wrap one script run. Restores the session if it was compacted, marks
+    it busy (never compacted mid-run) and records the activity time.
+    """
+    if IDLE_TIMEOUT_SECONDS <= 0:
+        yield
+        return
+
+    _ensure_sweeper()
+    session_id = current_session_id()
+    with _registry_lock:
+        entry = _sessions.get(session_id)
+        if entry is None:
+            entry = _sessions[session_id] = {
+                "lock": threading.Lock(),
+                "refs": {},
+                "derived": {},
+                "compacted_at": None,
+                "busy": 0,
+                "seen": time.time(),
+            }
+
+    with entry["lock"]:
+        if entry["compacted_at"] is not None:
+            _restore(session_id, entry)
+        entry["busy"] += 1
+
+    try:
+        yield
+    finally:
+        with entry["lock"]:
+            # taken at the end: the run may have swapped in new objects
+            entry["refs"] = {key: ss[key] for key in COMPACT_KEYS if key in ss}
+            entry["derived"] = {key: ss[key] for key in DERIVED_KEYS if key in ss}
+            entry["busy"] -= 1
+            entry["seen"] = time.time()
+
+
+def _restore(session_id: str, entry: dict) -> None:
+    saved = storage.get(NAMESPACE, session_id, default={})
+    for key, value in entry["refs"].items():
+        if key in saved:
+            _refill(value, saved[key])
+    storage.delete(NAMESPACE, session_id)
+    entry["compacted_at"] = None
+
+
+def _compact(session_id: str, entry: dict) -> int:
+    payload = {key: _snapshot(value) for key, value in entry["refs"].items()}
+    size = storage.put(NAMESPACE, session_id, payload)
+    for value in entry["refs"].values():
+        _hollow(value)
+    entry["compacted_at"] = time.time()
+    for value in entry["derived"].values():
+        _drop(value)
+    return size
+
+
+# ---------- SWEEPER ----------
+
+def sweep(now: Optional[float] = None) -> int:
+    """Compact every idle session. Returns how many were compacted."""
+    now = time.time() if now is None else now
+    with _registry_lock:
+        items = list(_sessions.items())
+
+    compacted = 0
+    for session_id, entry in items:
+        with entry["lock"]:
+            if entry["busy"]:
+                continue
+            if entry["compacted_at"] is None:
+                if now - entry["seen"] >= IDLE_TIMEOUT_SECONDS:
+                    try:
+                        _compact(session_id, entry)
+                    except Exception:
+                        # a failed save empties nothing: the session stays in RAM
+                        log.exception("could not compact idle session %s", session_id)
+                        continue
+                    compacted += 1
+            elif now - entry["compacted_at"] >= COMPACTED_TTL_SECONDS:
+                # the tab never came back – forget it entirely
+                storage.delete(NAMESPACE, session_id)
+                with _registry_lock:
+                    _sessions.pop(session_id, None)
+    return compacted
+
+
+def _sweep_forever() -> None:
+    interval = max(5.0, min(IDLE_TIMEOUT_SECONDS / 4, 60.0))
+    while True:
+        time.sleep(interval)
+        try:
+            sweep()
+        except Exception:  # never let the sweeper die
+            log.exception("idle-session sweep failed")
+
+
+def _ensure_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None:
+        return
+    with _registry_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, name="tesorin-compactor", daemon=True)
+            _sweeper.start()
+
+
+def stats() -> dict:
+    with _registry_lock:
+        entries = list(_sessions.values())
+    return {
+        "sessions": len(entries),
+        "compacted": sum(1 for e in entries if e["compacted_at"] is not None),
+    }
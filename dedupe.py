@@ -0,0 +1,123 @@
+# dedupe.py
+#
+# Duplicate detection for new transactions (statement imports and the
+# add-transaction form).
+#
+# Each wallet gets a DuplicateIndex in session_state
+# (ss.dedupe_indexes[wallet_id]); it is derived data and never stored.
+# It holds two maps of fingerprints (Python hashes of tuples):
+# - exact: (amount in cents, normalized note, day) -> how many rows,
+# - near:  (amount in cents, normalized note, day // DATE_WINDOW) -> days.
+# A row is a duplicate if an existing row has the same fingerprint, and a
+# near duplicate if one with the same amount and note sits within
+# DATE_WINDOW days (banks post the same payment on different dates). Both
+# checks are a few dict lookups, so a whole statement is checked in O(rows)
+# without comparing rows pairwise.
+#
+# Every existing row can only match once: importing a statement twice
+# skips everything, but two identical coffees on the same day in a new
+# statement are both kept if the wallet had one.
+#
+# Only exact duplicates are skipped on import without asking. A near
+# duplicate is often a real new row (a daily transit fare or coffee at
+# the start of the next statement), so it is listed for the user to
+# confirm, like a duplicate typed into the add form.
+
+from array import array
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import storage
+from categorize import normalize_note
+from session_memory import HISTORY_NAMESPACE
+
+DATE_WINDOW = 3  # days
+
+
+def _key(txn: dict) -> Tuple[int, str, int]:
+    return round(float(txn["amount"]) * 100), normalize_note(txn.get("note") or ""), txn["date"].toordinal()
+
+
+class DuplicateIndex:
+    def __init__(self) -> None:
+        self.count = 0
+        self.exact: Dict[int, int] = {}
+        self.near: Dict[int, array] = {}
+
+    def add(self, txn: dict) -> None:
+        cents, note, day = _key(txn)
+        self.count += 1
+        fp = hash((cents, note, day))
+        self.exact[fp] = self.exact.get(fp, 0) + 1
+        near_fp = hash((cents, note, day // DATE_WINDOW))
+        days = self.near.get(near_fp)
+        if days is None:
+            self.near[near_fp] = array("i", [day])
+        elif day not in days:
+            days.append(day)
+
+    def find(self, txn: dict, used: Optional[Counter] = None) -> Optional[Tuple[str, date]]:
+        """
+        ("exact" | "near", date of the matching row) or None. Rows counted
+        in `used` are already taken by earlier rows of the same batch.
+        """
+        used = used if used is not None else Counter()
+        cents, note, day = _key(txn)
+        fp = hash((cents, note, day))
+        if self.exact.get(fp, 0) > used[fp]:
+            used[fp] += 1
+            return "exact", txn["date"]
+
+        bucket = day // DATE_WINDOW
+        for b in (bucket, bucket - 1, bucket + 1):
+            for other in self.near.get(hash((cents, note, b)), ()):
+                if other == day or abs(other - day) > DATE_WINDOW:
+                    continue
+                other_fp = hash((cents, note, other))
+                if self.exact.get(other_fp, 0) > used[other_fp]:
+                    used[other_fp] += 1
+                    return "near", date.fromordinal(other)
+        return None
+
+    def split_batch(self, txns: List[dict]) -> Tuple[List[dict], List[dict], List[Tuple[dict, date]]]:
+        """
+        (new rows, exact duplicates, near duplicates) of an incoming batch.
+        Near duplicates come with the date of the row they match.
+        """
+        used: Counter = Counter()
+        fresh, exact, near = [], [], []
+        for txn in txns:
+            match = self.find(txn, used)
+            if match is None:
+                fresh.append(txn)
+            elif match[0] == "exact":
+                exact.append(txn)
+            else:
+                near.append((txn, match[1]))
+        return fresh, exact, near
+
+
+def wallet_duplicates(ss, wallet: dict) -> DuplicateIndex:
+    """The wallet's index, rebuilt only if it no longer matches the wallet."""
+    indexes = ss.setdefault("dedupe_indexes", {})
+    index = indexes.get(wallet["id"])
+    expected = len(wallet["transactions"]) + wallet.get("archived_count", 0)
+    if index is None or index.count != expected:
+        index = DuplicateIndex()
+        if wallet.get("archived_count"):
+            # spilled history still counts: re-importing an old statement
+            for txn in storage.get(HISTORY_NAMESPACE, wallet["archive_key"], default=[]):
+                index.add(txn)
+        for txn in wallet["transactions"]:
+            index.add(txn)
+        indexes[wallet["id"]] = index
+    return index
+
+
+def record_transaction(ss, wallet: dict, txn: dict) -> None:
+    """Call after appending `txn` to the wallet."""
+    index = ss.get("dedupe_indexes", {}).get(wallet["id"])
+    if index is not None and index.count == len(wallet["transactions"]) + wallet.get("archived_count", 0) - 1:
+        index.add(txn)
+    # otherwise wallet_duplicates() rebuilds it on next use
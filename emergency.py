@@ -0,0 +1,204 @@
+# emergency.py
+#
+# Emergency-fund target from real spending.
+#
+# The profile's "monthly essentials" is a guess. Once the wallets hold a
+# few months of transactions, the target can instead come from what was
+# actually spent: a month as expensive as the profile's percentile
+# (emergency_percentile, e.g. 90 → all but the 1 in 10 worst months) of
+# the user's monthly outflows, using their mean and standard deviation.
+#
+# One MonthlySpend per user in session_state (ss.monthly_spend), derived
+# and never stored. It keeps the outflow of every month across all wallets
+# and a running mean / variance (Welford) of the closed months, i.e. every
+# month from the first complete one up to last month (the current month is
+# still open). The month of the earliest transaction only counts if that
+# transaction is on the 1st: history usually starts mid-month, and a
+# partial month would pull the mean down and the spread up. For the same
+# reason months without any transaction are left out (a gap in the
+# imports, not a month of zero spending); a month with only income counts
+# as 0. Each transaction updates it in O(1): an outflow in a closed month
+# swaps that month's old total for the new one in the running stats, and
+# months are closed as the calendar moves on. Like the other per-wallet
+# indexes it is only rebuilt when its transaction count no longer matches
+# the wallets.
+#
+# Recurring rules are not rows, so their expected monthly outflow is added
+# to the mean (a fixed cost moves the level, not the spread).
+
+import math
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import storage
+from logic import emergency_fund_target
+from session_memory import HISTORY_NAMESPACE
+
+MIN_MONTHS = 3  # closed months needed before spending replaces the profile number
+RULES_PER_MONTH = {"weekly": 52 / 12, "biweekly": 26 / 12, "monthly": 1.0, "yearly": 1 / 12}
+
+
+def _month_key(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+class MonthlySpend:
+    """Outflow per month and Welford stats over the closed months."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.spent: Dict[int, float] = {}  # only months with a transaction
+        self.earliest: Optional[date] = None
+        self.start: Optional[int] = None  # first complete month
+        self.closed: Optional[int] = None  # months [start, closed) in spent are in the stats
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    # running stats
+    def _add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self, x: float) -> None:
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.mean = (self.n * old_mean - x) / (self.n - 1)
+        self.m2 = max(self.m2 - (x - old_mean) * (x - self.mean), 0.0)
+        self.n -= 1
+
+    def _start_month(self) -> int:
+        month = _month_key(self.earliest)
+        return month if self.earliest.day == 1 else month + 1
+
+    def observe(self, txn: dict) -> None:
+        self.count += 1
+        day = txn["date"]
+        key = _month_key(day)
+        outflow = max(-float(txn["amount"]), 0.0)
+        seen = key in self.spent
+        old = self.spent.get(key, 0.0)
+        self.spent[key] = old + outflow
+
+        if self.earliest is None:
+            self.earliest = day
+            self.start = self.closed = self._start_month()
+        elif day < self.earliest:
+            # an earlier transaction only ever moves the first complete month back
+            self.earliest = day
+            start = self._start_month()
+            if start < self.start:
+                if self.closed > self.start:
+                    # the months before the old start become closed months
+                    for month in range(start, self.start):
+                        if month in self.spent:
+                            self._add(self.spent[month])
+                else:
+                    self.closed = start
+                self.start = start
+        elif self.start <= key < self.closed:
+            if not seen:
+                self._add(outflow)
+            elif outflow:
+                self._remove(old)
+                self._add(old + outflow)
+
+    def close(self, today: date) -> None:
+        """Fold every month before `today`'s into the stats."""
+        if self.earliest is None:
+            return
+        current = _month_key(today)
+        while self.closed < current:
+            if self.closed in self.spent:
+                self._add(self.spent[self.closed])
+            self.closed += 1
+
+    def stats(self, today: Optional[date] = None) -> Tuple[int, float, float]:
+        """(closed months, mean, standard deviation) of monthly outflow."""
+        self.close(today or date.today())
+        std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+        return self.n, self.mean, std
+
+
+def _transaction_count(ss) -> int:
+    return sum(len(w["transactions"]) + w.get("archived_count", 0) for w in ss.get("wallets", []))
+
+
+def build_monthly_spend(wallets: List[dict]) -> MonthlySpend:
+    """MonthlySpend of these wallets, archived history included."""
+    spend = MonthlySpend()
+    for wallet in wallets:
+        if wallet.get("archived_count"):
+            for txn in storage.get(HISTORY_NAMESPACE, wallet["archive_key"], default=[]):
+                spend.observe(txn)
+        for txn in wallet["transactions"]:
+            spend.observe(txn)
+    return spend
+
+
+def monthly_spend(ss) -> MonthlySpend:
+    """The user's monthly spending, rebuilt only if it no longer matches the wallets."""
+    spend = ss.get("monthly_spend")
+    if spend is None or spend.count != _transaction_count(ss):
+        spend = build_monthly_spend(ss.get("wallets", []))
+        ss.monthly_spend = spend
+    return spend
+
+
+def observe_spending(ss, txn: dict) -> None:
+    """Call after appending `txn` to one of the wallets."""
+    spend = ss.get("monthly_spend")
+    if spend is not None and spend.count == _transaction_count(ss) - 1:
+        spend.observe(txn)
+    # otherwise monthly_spend() rebuilds it on next use
+
+
+def recurring_outflow(wallets: List[dict], today: Optional[date] = None) -> float:
+    """Expected monthly outflow of the recurring rules still running."""
+    today = today or date.today()
+    total = 0.0
+    for wallet in wallets:
+        for rule in wallet.get("recurring", ()):
+            end = rule.get("end")
+            if rule["amount"] < 0 and (end is None or end >= today):
+                total -= rule["amount"] * RULES_PER_MONTH.get(rule["schedule"], 0.0)
+    return total
+
+
+def spending_target(
+    profile: dict, wallets: List[dict], spend: MonthlySpend, expenses: float, debt: float
+) -> Optional[float]:
+    """
+    Target from real spending, or None if the profile does not ask for it
+    or there are fewer than MIN_MONTHS closed months.
+    """
+    if profile.get("emergency_basis") != "wallets" or not wallets:
+        return None
+    months, mean, std = spend.stats()
+    if months < MIN_MONTHS:
+        return None
+    percentile = float(profile.get("emergency_percentile", 90)) / 100
+    return emergency_fund_target(
+        expenses,
+        debt,
+        monthly_spend=(mean + recurring_outflow(wallets), std),
+        percentile=percentile,
+    )
+
+
+def emergency_target(ss, derived: dict) -> Tuple[float, bool]:
+    """
+    (target, from spending?) for the user: spending_target() if there is
+    one, otherwise the profile's rule (derived = profile.profile_metrics()).
+    """
+    profile = ss.profile
+    if profile.get("emergency_basis") != "wallets" or not ss.get("wallets"):
+        return derived["emergency_target"], False
+    target = spending_target(profile, ss.wallets, monthly_spend(ss), derived["expenses"], derived["debt"])
+    if target is None:
+        return derived["emergency_target"], False
+    return target, True
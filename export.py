@@ -0,0 +1,194 @@
+# export.py
+#
+# Downloads: a wallet's transactions for a period, tracked goals and the
+# profile, as CSV or Parquet.
+#
+# Files are encoded CHUNK_ROWS rows at a time straight into one bytes
+# buffer, so rows are never collected into one list, DataFrame or string
+# (pyarrow writes one row group per chunk). The finished file itself is
+# in memory: st.download_button only serves bytes it holds (a file object
+# is read whole), so peak memory is one copy of the file, not constant.
+# Files are only built when the button is clicked: download_button runs
+# the callable on its own thread, so the callables only see plain data
+# captured while rendering (never session_state).
+#
+# Nested profile values (the budgets dict) are written as JSON text.
+
+import csv
+import io
+import json
+from datetime import date
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import streamlit as st
+
+CHUNK_ROWS = 50_000
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# (column, parquet type name)
+TRANSACTION_COLUMNS = (("date", "date32"), ("category", "string"), ("note", "string"), ("amount", "float64"))
+GOAL_COLUMNS = (
+    ("id", "string"),
+    ("name", "string"),
+    ("kind", "string"),
+    ("target", "float64"),
+    ("saved", "float64"),
+    ("monthly_target", "float64"),
+    ("timeframe", "string"),
+    ("why", "string"),
+)
+
+
+# ---------- WRITERS ----------
+
+def _write_csv(file: IO[bytes], columns: Tuple[str, ...], chunks: Iterable[List[tuple]]) -> None:
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(chunk)
+    text.flush()
+    text.detach()  # keep `file` open
+
+
+def _write_parquet(file: IO[bytes], schema: tuple, chunks: Iterable[List[tuple]]) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in schema])
+    with pq.ParquetWriter(file, arrow_schema) as writer:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), arrow_schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=arrow_schema))
+
+
+def export_file(fmt: str, schema: tuple, chunks: Iterable[List[tuple]]) -> bytes:
+    """The finished file, encoded chunk by chunk into one buffer."""
+    with io.BytesIO() as file:
+        if fmt == "Parquet":
+            _write_parquet(file, schema, chunks)
+        else:
+            _write_csv(file, tuple(name for name, _ in schema), chunks)
+        return file.getvalue()
+
+
+# ---------- TABLES ----------
+
+def transaction_chunks(rows: list, period: Optional[Tuple[date, date]] = None) -> Iterator[List[tuple]]:
+    """
+    Rows in `period`, CHUNK_ROWS at a time. Only looks at the rows that
+    existed when called, so transactions added meanwhile are left out.
+    """
+    count = len(rows)
+    start, end = period or (date.min, date.max)
+    for lo in range(0, count, CHUNK_ROWS):
+        yield [
+            (t["date"], t["category"], t["note"], float(t["amount"]))
+            for t in rows[lo:min(lo + CHUNK_ROWS, count)]
+            if start <= t["date"] <= end
+        ]
+
+
+def goal_chunks(goals: list) -> Iterator[List[tuple]]:
+    yield [
+        (
+            str(g.get("id", "")),
+            g.get("name", ""),
+            g.get("kind", ""),
+            float(g.get("target", 0.0) or 0.0),
+            float(g.get("saved", 0.0) or 0.0),
+            float(g.get("monthly_target", 0.0) or 0.0),
+            g.get("timeframe") or "",
+            g.get("why") or "",
+        )
+        for g in goals
+    ]
+
+
+def profile_schema(profile: dict) -> tuple:
+    """One column per stored profile field (the goal list is exported separately)."""
+    kinds = {bool: "bool_", int: "int64", float: "float64"}
+    return tuple(
+        (name, kinds.get(type(value), "string"))
+        for name, value in profile.items()
+        if name != "goals"
+    )
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def profile_chunks(profile: dict, schema: tuple) -> Iterator[List[tuple]]:
+    yield [tuple(profile[name] if kind != "string" else _text(profile[name]) for name, kind in schema)]
+
+
+# ---------- UI ----------
+
+def render_download(
+    label: str,
+    file_name: str,
+    make_chunks: Callable[[], Iterable[List[tuple]]],
+    schema: tuple,
+    key: str,
+) -> None:
+    """Format picker plus a download button that builds the file on click."""
+    col_fmt, col_button = st.columns([1, 2])
+    with col_fmt:
+        fmt = st.radio("Format", tuple(FORMATS), horizontal=True, key=f"{key}_format", label_visibility="collapsed")
+    extension, mime = FORMATS[fmt]
+    with col_button:
+        st.download_button(
+            label,
+            data=lambda: export_file(fmt, schema, make_chunks()),
+            file_name=f"{file_name}.{extension}",
+            mime=mime,
+            on_click="ignore",
+            key=f"{key}_download",
+            use_container_width=True,
+        )
+
+
+def render_wallet_export(wallet: dict, period: Tuple[date, date]) -> None:
+    rows = wallet["transactions"]
+    start, end = period
+    with st.expander("Export transactions"):
+        st.caption(f"Transactions in {wallet['name']} from {start:%b %d, %Y} to {end:%b %d, %Y}.")
+        render_download(
+            "Download transactions",
+            f"tesorin-{wallet['id']}-{start:%Y%m%d}-{end:%Y%m%d}",
+            lambda: transaction_chunks(rows, period),
+            TRANSACTION_COLUMNS,
+            key="export_transactions",
+        )
+
+
+def render_account_export(profile: dict, goals: list) -> None:
+    """Profile and tracked goals, for the profile page."""
+    profile = dict(profile)
+    goals = [dict(g) for g in goals]
+    schema = profile_schema(profile)
+    with st.expander("Download your data"):
+        render_download(
+            "Download profile",
+            "tesorin-profile",
+            lambda: profile_chunks(profile, schema),
+            schema,
+            key="export_profile",
+        )
+        render_download(
+            "Download goals",
+            "tesorin-goals",
+            lambda: goal_chunks(goals),
+            GOAL_COLUMNS,
+            key="export_goals",
+        )
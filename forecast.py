@@ -0,0 +1,196 @@
+# forecast.py
+#
+# Cashflow forecast from wallet history.
+#
+# For each wallet we keep a small ForecastModel in session_state
+# (ss.forecast_models[wallet_id]) with running aggregates:
+# - net amount per day,
+# - candidate recurring flows: transactions with the same category and
+#   amount, keyed by month, so "rent -1200 around the 1st" is found
+#   without scanning history again.
+# `observe()` folds in one new transaction (O(1)). The model is only
+# rebuilt from scratch when its transaction count no longer matches the
+# wallet (another worker replaced the wallets, history was spilled...).
+#
+# `forecast()` projects daily balances 3-12 months ahead, with numpy:
+#   everyday spending   = average daily net of the last HISTORY_DAYS,
+#                         plus a weekday profile (weekends differ),
+#   + detected flows    = seen in >= MIN_FLOW_MONTHS of the last 6 months,
+#                         on their usual day of the month,
+#   + recurring rules   = the wallet's explicit rules (recurring.py).
+# Without MIN_HISTORY_DAYS of real transactions there is no forecast:
+# rules adjust a forecast made from history, they do not make one on their
+# own (a wallet with only a rent rule is not a cashflow of minus the rent).
+# Results are cached on the model until it changes.
+
+import calendar
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+import storage
+from recurring import occurrences, recurring_totals
+from session_memory import HISTORY_NAMESPACE
+
+HISTORY_DAYS = 180
+MIN_HISTORY_DAYS = 28
+MIN_FLOW_MONTHS = 3
+DAYS_PER_MONTH = 365.25 / 12
+HORIZONS = (3, 6, 12)  # months
+
+
+def _month_key(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+class ForecastModel:
+    """Running aggregates for one wallet."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.first_day: Optional[date] = None
+        self.daily: Dict[date, float] = {}
+        # (category, amount) -> {month key: day}
+        self.flows: Dict[tuple, Dict[int, date]] = {}
+        self.version = 0
+        self._cache: Dict[tuple, dict] = {}
+
+    def observe(self, txn: dict) -> None:
+        day = txn["date"]
+        amount = float(txn["amount"])
+        self.count += 1
+        self.total += amount
+        self.daily[day] = self.daily.get(day, 0.0) + amount
+        if self.first_day is None or day < self.first_day:
+            self.first_day = day
+        key = (str(txn.get("category", "")).strip().lower(), round(amount, 2))
+        self.flows.setdefault(key, {})[_month_key(day)] = day
+        self.version += 1
+        self._cache.clear()
+
+    def detected_flows(self, today: date) -> list:
+        """[(amount, usual day of month, months seen)] still active today."""
+        this_month = _month_key(today)
+        found = []
+        for (_, amount), months in self.flows.items():
+            recent = [d for m, d in months.items() if this_month - 6 <= m <= this_month]
+            if len(recent) < MIN_FLOW_MONTHS or (today - max(recent)).days > 45:
+                continue
+            found.append((amount, int(np.median([d.day for d in recent])), recent))
+        return found
+
+
+def wallet_model(ss, wallet: dict) -> ForecastModel:
+    """The wallet's model, rebuilt only if it no longer matches the wallet."""
+    models = ss.setdefault("forecast_models", {})
+    model = models.get(wallet["id"])
+    expected = len(wallet["transactions"]) + wallet.get("archived_count", 0)
+    if model is None or model.count != expected:
+        model = ForecastModel()
+        if wallet.get("archived_count"):
+            # history spilled out of session_state still belongs to the wallet
+            for txn in storage.get(HISTORY_NAMESPACE, wallet["archive_key"], default=[]):
+                model.observe(txn)
+        for txn in wallet["transactions"]:
+            model.observe(txn)
+        models[wallet["id"]] = model
+    return model
+
+
+def observe_transaction(ss, wallet: dict, txn: dict) -> None:
+    """Call after appending `txn` to the wallet."""
+    model = ss.get("forecast_models", {}).get(wallet["id"])
+    if model is not None and model.count == len(wallet["transactions"]) + wallet.get("archived_count", 0) - 1:
+        model.observe(txn)
+    # otherwise wallet_model() rebuilds it on next use
+
+
+def forecast(model: ForecastModel, rules: list, months: int = 6, today: Optional[date] = None) -> Optional[dict]:
+    """
+    Daily balance forecast for the next `months` months, or None if the
+    wallet has less than MIN_HISTORY_DAYS of transactions.
+    """
+    today = today or date.today()
+    rules = rules or []
+    history_days = (today - model.first_day).days + 1 if model.first_day else 0
+    if history_days < MIN_HISTORY_DAYS:
+        return None
+
+    rules_key = tuple((r["id"], r["schedule"], r["start"], r.get("end"), r["amount"]) for r in rules)
+    cache_key = (today, months, rules_key)
+    cached = model._cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # ---- history window (days before today) ----
+    window = max(1, min(HISTORY_DAYS, history_days))
+    start = today - timedelta(days=window)
+    hist = np.zeros(window)
+    for day, amount in model.daily.items():
+        offset = (day - start).days
+        if 0 <= offset < window:
+            hist[offset] += amount
+
+    # take detected flows out of "everyday" spending – they are added back
+    # on their own dates below
+    flows = model.detected_flows(today)
+    for amount, _, days in flows:
+        for day in days:
+            offset = (day - start).days
+            if 0 <= offset < window:
+                hist[offset] -= amount
+
+    weekdays = (start.weekday() + np.arange(window)) % 7
+    per_weekday = np.bincount(weekdays, weights=hist, minlength=7)
+    seen = np.bincount(weekdays, minlength=7)
+    base = hist.mean()
+    weekday_effect = np.where(seen > 0, per_weekday / np.maximum(seen, 1) - base, 0.0)
+
+    # ---- future days ----
+    horizon = int(round(months * DAYS_PER_MONTH))
+    first = today + timedelta(days=1)
+    last = today + timedelta(days=horizon)
+    future_weekdays = (first.weekday() + np.arange(horizon)) % 7
+    daily = base + weekday_effect[future_weekdays]
+
+    for amount, day_of_month, _ in flows:
+        index = _month_key(first)
+        while True:
+            year, month = divmod(index, 12)
+            day = date(year, month + 1, min(day_of_month, calendar.monthrange(year, month + 1)[1]))
+            if day > last:
+                break
+            if day >= first:
+                daily[(day - first).days] += amount
+            index += 1
+
+    for rule in rules:
+        offsets = [(d - first).days for d in occurrences(rule, first, last)]
+        np.add.at(daily, offsets, rule["amount"])
+
+    # today's balance: real transactions + rule occurrences so far
+    opening = model.total + recurring_totals(rules, date.min, today)[0]
+    balance = opening + np.cumsum(daily)
+
+    result = {
+        "dates": [first + timedelta(days=i) for i in range(horizon)],
+        "balance": balance,
+        "opening": opening,
+        "monthly_net": float(daily.sum() / (horizon / DAYS_PER_MONTH)),
+        "lowest": float(balance.min()),
+        "flows": [(amount, day_of_month) for amount, day_of_month, _ in flows],
+    }
+    model._cache = {cache_key: result}
+    return result
+
+
+def forecast_cashflow(ss, months: int = 3) -> Optional[float]:
+    """Projected monthly net across all wallets (None without enough history)."""
+    nets = []
+    for wallet in ss.get("wallets", []):
+        result = forecast(wallet_model(ss, wallet), wallet.get("recurring"), months)
+        if result is not None:
+            nets.append(result["monthly_net"])
+    return sum(nets) if nets else None
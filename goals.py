@@ -0,0 +1,401 @@
+# goals.py
+#
+# Tracked goals ("goal plans") with indexed lookups.
+#
+# Goals are still plain dicts (id, name, kind, target, saved, ...) so the
+# UI code reads them as before, but they live in a GoalRegistry that keeps:
+# - hash indexes by id, name and kind, plus the emergency-fund goal(s),
+#   so lookups are O(1) instead of scanning every goal;
+# - stable ids from a counter that never goes backwards (g1, g2, ...),
+#   even after goals are removed;
+# - a progress-sorted view, so the home "Goals snapshot" reads the top
+#   goals without sorting.
+#
+# Always change goals through the registry (add / update / contribute)
+# so the indexes stay right.
+#
+# Contributions go into an append-only GoalLedger per goal. The ledger
+# keeps the running total (O(1)) and a summary per month, updated as
+# entries arrive, so history charts and "on track?" checks read the
+# monthly summaries instead of replaying entries. Entries older than
+# LEDGER_KEEP_MONTHS are dropped once their month summary has them.
+# Entries are kept in date order (a backdated contribution is inserted
+# where it belongs), so the oldest ones are always at the front.
+# Undo appends a reversing entry, dated like the entry it reverses, for
+# the latest contribution; the opening balance cannot be undone. Nothing
+# is ever edited in place. The registry remembers the last UNDO_LIMIT
+# contribution batches for undo.
+
+import math
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import date
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from session_store import mark_dirty
+
+LEDGER_KEEP_MONTHS = 3
+UNDO_LIMIT = 20  # contribution batches that can be undone (the registry is stored)
+
+_today_cache = (0.0, date.min)  # (good until, date)
+
+
+def _today() -> date:
+    """date.today(), re-read at most once a second (it costs more than the rest of an append)."""
+    global _today_cache
+    now = time.time()
+    if now >= _today_cache[0]:
+        _today_cache = (now + 1.0, date.today())
+    return _today_cache[1]
+
+
+def goal_progress(goal: dict) -> float:
+    """Saved / target, 0-1 (0 when there is no target)."""
+    target = float(goal.get("target", 0.0) or 0.0)
+    saved = float(goal.get("saved", 0.0) or 0.0)
+    if target <= 0:
+        return 0.0
+    return max(0.0, min(1.0, saved / target))
+
+
+def project_goal(goal: dict, monthly: Optional[float] = None, today: Optional[date] = None) -> dict:
+    """
+    When the goal is reached at `monthly` a month (default: its
+    monthly_target). months / finish ("YYYY-MM") are None if never.
+    """
+    today = today or date.today()
+    target = float(goal.get("target", 0.0) or 0.0)
+    saved = float(goal.get("saved", 0.0) or 0.0)
+    if monthly is None:
+        monthly = float(goal.get("monthly_target", 0.0) or 0.0)
+    remaining = max(target - saved, 0.0)
+
+    if remaining == 0:
+        months = 0
+    elif monthly > 0 and math.isfinite(remaining / monthly):
+        months = math.ceil(remaining / monthly)
+    else:
+        months = None
+
+    finish = None
+    if months is not None:
+        index = today.year * 12 + today.month - 1 + months
+        finish = f"{index // 12}-{index % 12 + 1:02d}"
+
+    return {
+        "id": goal.get("id"),
+        "name": goal.get("name", ""),
+        "target": target,
+        "saved": saved,
+        "remaining": remaining,
+        "monthly": float(monthly),
+        "months": months,
+        "finish": finish,
+    }
+
+
+def _is_emergency(goal: dict) -> bool:
+    return "emergency" in goal.get("name", "").lower() or "emergency" in goal.get("kind", "").lower()
+
+
+def _month(day: date) -> Tuple[int, int]:
+    return (day.year, day.month)
+
+
+def _months_between(start: Tuple[int, int], end: Tuple[int, int]) -> int:
+    return (end[0] - start[0]) * 12 + (end[1] - start[1])
+
+
+class GoalLedger:
+    """Append-only contribution history for one goal."""
+
+    def __init__(self, opening: float = 0.0, day: Optional[date] = None) -> None:
+        self.entries: List[tuple] = []  # (seq, day, amount, reverses_seq), by day then seq
+        self.months: Dict[Tuple[int, int], list] = {}  # (y, m) -> [contributed, count]
+        self.total = 0.0
+        self.started = _month(day or date.today())
+        self._seq = 0
+        self._compacted_for: Optional[Tuple[int, int]] = None
+        self._opening_seq: Optional[int] = None
+        if opening:
+            self._opening_seq = self.append(opening, day)
+
+    def append(self, amount: float, day: Optional[date] = None, reverses: Optional[int] = None) -> int:
+        today = _today()
+        day = day or today
+        amount = float(amount)
+        self._seq += 1
+        entry = (self._seq, day, amount, reverses)
+        entries = self.entries
+        if not entries or day >= entries[-1][1]:
+            entries.append(entry)
+        else:
+            # backdated: in front of the later entries
+            entries.insert(bisect_right(entries, day, key=lambda e: e[1]), entry)
+        self.total += amount
+
+        month = (day.year, day.month)
+        summary = self.months.get(month)
+        if summary is None:
+            summary = self.months[month] = [0.0, 0]
+            self.started = min(self.started, month)
+        summary[0] += amount
+        summary[1] += 1
+
+        # old entries can only age out when the month turns
+        this_month = (today.year, today.month)
+        if this_month != self._compacted_for:
+            self._compact(this_month)
+            self._compacted_for = this_month
+        return self._seq
+
+    def undo_last(self) -> Optional[float]:
+        """
+        Reverse the latest contribution (by when it was made, not its day)
+        that is not already reversed. The opening balance is not a
+        contribution and is never reversed.
+        """
+        reversed_seqs = {e[3] for e in self.entries if e[3] is not None}
+        candidates = [
+            e for e in self.entries
+            if e[3] is None and e[0] not in reversed_seqs and e[0] != self._opening_seq
+        ]
+        if not candidates:
+            return None
+        seq, day, amount, _ = max(candidates)
+        self.append(-amount, day, reverses=seq)
+        return amount
+
+    def _compact(self, today_month: Tuple[int, int]) -> None:
+        # entries are kept in date order, so old ones sit at the front
+        while self.entries and _months_between(_month(self.entries[0][1]), today_month) >= LEDGER_KEEP_MONTHS:
+            self.entries.pop(0)
+
+    def history(self) -> List[Tuple[str, float]]:
+        """Month-end balance per month since the goal started (for charts)."""
+        now = _month(date.today())
+        y, m = self.started
+        balance = 0.0
+        rows = []
+        while (y, m) <= now:
+            balance += self.months.get((y, m), (0.0, 0))[0]
+            rows.append((f"{y}-{m:02d}", balance))
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        return rows
+
+    def status(self, monthly_target: float) -> str:
+        """"ahead", "on track" or "behind" versus monthly_target a month."""
+        if monthly_target <= 0:
+            return "on track"
+        months = _months_between(self.started, _month(date.today())) + 1
+        expected = monthly_target * months
+        if self.total >= expected * 1.1:
+            return "ahead"
+        if self.total >= expected * 0.9:
+            return "on track"
+        return "behind"
+
+
+class GoalRegistry:
+    """Ordered collection of goal dicts with O(1) lookups."""
+
+    def __init__(self, goals=()) -> None:
+        self._goals: Dict[str, dict] = {}
+        self._by_name: Dict[str, Dict[str, None]] = {}  # name -> goal ids, oldest first
+        self._by_kind: Dict[str, Dict[str, None]] = {}
+        self._emergency: Dict[str, None] = {}
+        self._ranked: List[tuple] = []  # (-progress, seq, id), best first
+        self._rank_key: Dict[str, tuple] = {}
+        self._seq = 0
+        self._next_id = 1
+        self._ledgers: Dict[str, GoalLedger] = {}
+        self._undo: Deque[tuple] = deque(maxlen=UNDO_LIMIT)  # goal ids per contribution batch, latest last
+        for goal in goals:
+            self._insert(dict(goal))
+
+    # ----- collection protocol (reads like the old list) -----
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(list(self._goals.values()))
+
+    def __len__(self) -> int:
+        return len(self._goals)
+
+    def __bool__(self) -> bool:
+        return bool(self._goals)
+
+    def __contains__(self, goal_id: str) -> bool:
+        return goal_id in self._goals
+
+    # ----- lookups -----
+
+    def get(self, goal_id: str) -> Optional[dict]:
+        return self._goals.get(goal_id)
+
+    def by_name(self, name: str) -> Optional[dict]:
+        """First goal with this name (names need not be unique)."""
+        for goal_id in self._by_name.get(name, ()):
+            return self._goals[goal_id]
+        return None
+
+    def by_kind(self, kind: str) -> List[dict]:
+        return [self._goals[i] for i in self._by_kind.get(kind, ())]
+
+    def emergency(self) -> Optional[dict]:
+        """First goal that looks like an emergency fund."""
+        for goal_id in self._emergency:
+            return self._goals[goal_id]
+        return None
+
+    def top(self, k: int = 3) -> List[dict]:
+        """The k goals furthest along (ties: oldest first)."""
+        return [self._goals[goal_id] for _, _, goal_id in self._ranked[:k]]
+
+    def ledger(self, goal_id: str) -> GoalLedger:
+        ledger = self._ledgers.get(goal_id)
+        if ledger is None:
+            # goal from before the ledger: start from what it had saved
+            saved = float(self._goals[goal_id].get("saved", 0.0) or 0.0)
+            ledger = self._ledgers[goal_id] = GoalLedger(opening=saved)
+        return ledger
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    # ----- changes -----
+
+    def add(self, **fields) -> dict:
+        """Add a goal. A fresh id is assigned unless one is given."""
+        goal = {"saved": 0.0, **fields}
+        goal.pop("id", None)
+        return self._insert(goal)
+
+    def update(self, goal_id: str, **fields) -> dict:
+        goal = self._goals[goal_id]
+        self._unindex(goal)
+        goal.update(fields)
+        self._index(goal)
+        return goal
+
+    def contribute(self, goal_id: str, amount: float, day: Optional[date] = None) -> dict:
+        goal = self._add_to_ledger(goal_id, amount, day)
+        self._undo.append((goal_id,))
+        return goal
+
+    def contribute_many(self, amounts: Dict[str, float], day: Optional[date] = None) -> List[dict]:
+        """
+        Apply several contributions as one batch (one undo step).
+        Zero amounts and unknown goal ids are skipped.
+        """
+        changed = [
+            self._add_to_ledger(goal_id, amount, day)
+            for goal_id, amount in amounts.items()
+            if amount and goal_id in self._goals
+        ]
+        if changed:
+            self._undo.append(tuple(g["id"] for g in changed))
+        return changed
+
+    def undo_last(self) -> List[dict]:
+        """Reverse the most recent contribution batch. Returns the goals touched."""
+        while self._undo:
+            undone = []
+            for goal_id in self._undo.pop():
+                if goal_id not in self._goals or self.ledger(goal_id).undo_last() is None:
+                    continue
+                goal = self._goals[goal_id]
+                goal["saved"] = self._ledgers[goal_id].total
+                self._rerank(goal)
+                undone.append(goal)
+            if undone:
+                return undone
+        return []
+
+    def _add_to_ledger(self, goal_id: str, amount: float, day: Optional[date]) -> dict:
+        goal = self._goals[goal_id]
+        ledger = self.ledger(goal_id)
+        ledger.append(amount, day)
+        goal["saved"] = ledger.total
+        self._rerank(goal)
+        return goal
+
+    def remove(self, goal_id: str) -> None:
+        goal = self._goals.pop(goal_id)
+        self._ledgers.pop(goal_id, None)
+        self._unindex(goal)
+
+    # ----- internals -----
+
+    def _insert(self, goal: dict) -> dict:
+        goal_id = goal.get("id")
+        if not goal_id or goal_id in self._goals:
+            goal_id = f"g{self._next_id}"
+        if goal_id[1:].isdigit():
+            self._next_id = max(self._next_id, int(goal_id[1:]) + 1)
+        goal["id"] = goal_id
+        self._goals[goal_id] = goal
+        self._index(goal)
+        return goal
+
+    def _index(self, goal: dict) -> None:
+        goal_id = goal["id"]
+        self._by_name.setdefault(goal.get("name", ""), {})[goal_id] = None
+        self._by_kind.setdefault(goal.get("kind", ""), {})[goal_id] = None
+        if _is_emergency(goal):
+            self._emergency[goal_id] = None
+
+        seq = self._rank_key[goal_id][1] if goal_id in self._rank_key else self._seq
+        if goal_id not in self._rank_key:
+            self._seq += 1
+        key = (-goal_progress(goal), seq, goal_id)
+        self._rank_key[goal_id] = key
+        insort(self._ranked, key)
+
+    def _rerank(self, goal: dict) -> None:
+        """Only progress changed: move the goal in the ranked view."""
+        goal_id = goal["id"]
+        old = self._rank_key[goal_id]
+        progress = -goal_progress(goal)
+        if progress == old[0]:
+            return
+        new = (progress, old[1], goal_id)
+        i = bisect_left(self._ranked, old)
+        del self._ranked[i]
+        insort(self._ranked, new)
+        self._rank_key[goal_id] = new
+
+    def _unindex(self, goal: dict) -> None:
+        goal_id = goal["id"]
+        name = goal.get("name", "")
+        name_ids = self._by_name.get(name, {})
+        name_ids.pop(goal_id, None)
+        if not name_ids:
+            self._by_name.pop(name, None)
+        kind = goal.get("kind", "")
+        kind_ids = self._by_kind.get(kind, {})
+        kind_ids.pop(goal_id, None)
+        if not kind_ids:
+            self._by_kind.pop(kind, None)
+        self._emergency.pop(goal_id, None)
+
+        key = self._rank_key.get(goal_id)
+        if key is not None:
+            i = bisect_left(self._ranked, key)
+            if i < len(self._ranked) and self._ranked[i] == key:
+                del self._ranked[i]
+            if goal_id not in self._goals:
+                del self._rank_key[goal_id]
+
+
+def goal_registry(ss) -> GoalRegistry:
+    """
+    The session's goals as a GoalRegistry. Older sessions (and stored
+    state) hold a plain list – convert it in place the first time.
+    """
+    goals = ss.goal_plans
+    if not isinstance(goals, GoalRegistry):
+        goals = GoalRegistry(goals)
+        ss.goal_plans = goals
+        mark_dirty(ss, "goal_plans")
+    return goals
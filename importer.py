@@ -0,0 +1,175 @@
+# importer.py
+#
+# Bank statement import (CSV) for a wallet.
+#
+# Statements differ a lot between banks, so columns are found by name:
+# a date, a description (note) and either one signed amount column or
+# separate debit / credit columns. The file is read row by row; rows that
+# cannot be parsed are skipped and reported, not fatal.
+#
+# One date format is used for the whole file, picked from the first
+# SAMPLE_ROWS dates: the one that reads the most of them (day-first and
+# month-first tie only if every day is <= 12; the user is told).
+# Formats are never switched row by row, which would read "03/04/2026" as
+# April 3 next to "12/25/2026" as December 25.
+#
+# This only parses. wealthflow.import_transactions() categorizes the rows
+# and adds them to the wallet.
+
+import csv
+import io
+import itertools
+from datetime import date, datetime
+from typing import IO, List, Tuple
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%d %b %Y", "%b %d, %Y", "%d-%b-%Y")
+
+COLUMNS = {
+    "date": ("date", "transaction date", "txn date", "value date", "posted date"),
+    "note": ("note", "description", "narration", "details", "merchant", "payee", "memo", "particulars"),
+    "amount": ("amount", "amount (inr)", "amount (cad)"),
+    "debit": ("debit", "withdrawal", "withdrawal amt", "debit amount"),
+    "credit": ("credit", "deposit", "deposit amt", "credit amount"),
+    "category": ("category",),
+}
+MAX_ERRORS = 20
+SAMPLE_ROWS = 500
+
+
+def _find_columns(header: List[str]) -> dict:
+    names = {name.strip().lower(): name for name in header}
+    found = {}
+    for field, candidates in COLUMNS.items():
+        for candidate in candidates:
+            if candidate in names:
+                found[field] = names[candidate]
+                break
+    if "date" not in found:
+        raise ValueError("no date column")
+    if "amount" not in found and "debit" not in found and "credit" not in found:
+        raise ValueError("no amount (or debit / credit) column")
+    return found
+
+
+def _cell(row: dict, columns: dict, field: str) -> str:
+    name = columns.get(field)
+    return (row.get(name) or "").strip() if name else ""
+
+
+def parse_amount(raw: str) -> float:
+    """'₹1,200.50' -> 1200.5, '(45.00)' -> -45.0, '' -> 0.0."""
+    raw = raw.strip()
+    if not raw:
+        return 0.0
+    negative = raw.startswith("(") and raw.endswith(")")
+    try:
+        value = float("".join(ch for ch in raw if ch.isdigit() or ch in ".-"))
+    except ValueError:
+        raise ValueError(f"not an amount {raw!r}")
+    return -value if negative else value
+
+
+def pick_date_format(samples: List[str]) -> Tuple[str, bool]:
+    """
+    (format, ambiguous): the format that parses the most samples, the
+    first of DATE_FORMATS on a tie; rows it cannot read fail as bad rows.
+    `ambiguous` is True if another format reads the same samples but some
+    of them as different dates (e.g. every day <= 12). Raises ValueError if no
+    format reads any sample.
+    """
+    parsed = {fmt: {} for fmt in DATE_FORMATS}
+    for raw in dict.fromkeys(samples):
+        for fmt in DATE_FORMATS:
+            try:
+                parsed[fmt][raw] = datetime.strptime(raw, fmt).date()
+            except ValueError:
+                pass
+    best = max(len(dates) for dates in parsed.values())
+    if not best:
+        raise ValueError("no dates in a known format")
+    fits = [fmt for fmt in DATE_FORMATS if len(parsed[fmt]) == best]
+    chosen = parsed[fits[0]]
+    ambiguous = any(parsed[other].keys() == chosen.keys() and parsed[other] != chosen for other in fits[1:])
+    return fits[0], ambiguous
+
+
+class _DateParser:
+    """
+    Parses with the file's one format, and remembers every date string it
+    has seen (statements have many rows per day; strptime is the slow part
+    of an import).
+    """
+
+    def __init__(self, fmt: str) -> None:
+        self.fmt = fmt
+        self.seen = {}
+
+    def __call__(self, raw: str) -> date:
+        parsed = self.seen.get(raw)
+        if parsed is None:
+            try:
+                parsed = datetime.strptime(raw, self.fmt).date()
+            except ValueError:
+                raise ValueError(f"date {raw!r} does not match the file's format") from None
+            self.seen[raw] = parsed
+        return parsed
+
+
+def read_statement(file: IO[bytes]) -> Tuple[List[dict], List[str]]:
+    """
+    Parse a CSV statement.
+
+    Returns:
+        (transactions, errors)
+
+    transactions → {"date", "category", "note", "amount"} dicts; category
+                   is "General" unless the file has a category column.
+    errors       → "line N: reason" for skipped rows (first MAX_ERRORS),
+                   after a note if the date format was a guess.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    try:
+        columns = _find_columns(reader.fieldnames or [])
+    except ValueError as e:
+        return [], [f"Could not read this file: {e}."]
+
+    # (line, row) pairs; the format is picked before any row is parsed
+    rows = ((reader.line_num, row) for row in reader)
+    sample = list(itertools.islice(rows, SAMPLE_ROWS))
+    try:
+        fmt, ambiguous = pick_date_format([_cell(row, columns, "date") for _, row in sample])
+    except ValueError as e:
+        return [], [f"Could not read this file: {e}."]
+
+    parse_date = _DateParser(fmt)
+    transactions, errors = [], []
+    skipped = 0
+    for line, row in itertools.chain(sample, rows):
+        try:
+            day = parse_date(_cell(row, columns, "date"))
+            if "amount" in columns:
+                amount = parse_amount(_cell(row, columns, "amount"))
+            else:
+                credit = parse_amount(_cell(row, columns, "credit"))
+                debit = parse_amount(_cell(row, columns, "debit"))
+                amount = abs(credit) - abs(debit)
+        except ValueError as e:
+            skipped += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append(f"line {line}: {e}")
+            continue
+        transactions.append(
+            {
+                "date": day,
+                "category": _cell(row, columns, "category") or "General",
+                "note": _cell(row, columns, "note"),
+                "amount": amount,
+            }
+        )
+    if skipped > len(errors):
+        errors.append(f"… and {skipped - len(errors)} more rows skipped")
+    if ambiguous:
+        order = "day" if fmt.index("%d") < fmt.index("%m") else "month"
+        example = date(2026, 4, 3).strftime(fmt)
+        errors.insert(0, f"Dates could be day-first or month-first; read {order}-first ({example} is Apr 03, 2026).")
+    return transactions, errors
@@ -0,0 +1,198 @@
+# jobs.py
+#
+# Background jobs for heavy computations.
+#
+# Projections, imports and optimisations would block the script thread if
+# they ran inline in a tab. Instead a tab calls `submit(func, *args)`:
+#
+# - Jobs run in a bounded process pool, shared by every session.
+# - A job is keyed by a hash of its function, inputs and today's date
+#   (results such as projected finish months are counted from today).
+#   Submitting the same inputs again joins the running job, or returns the
+#   cached result right away (least-recently-used cache of finished
+#   results; failures are kept the same way, so a retry starts afresh).
+# - The job function gets a `progress(fraction)` callback. Progress goes
+#   through a shared dict, so the UI can poll `status(key)`.
+# - Each session "holds" the jobs it submitted, tagged with the tab that
+#   asked. `release_session()` runs at the end of every script run: jobs
+#   held for a tab the user has left are dropped, and a job nobody holds
+#   any more is cancelled (a queued job never starts; a running one stops
+#   at its next progress call).
+#
+# Job functions must be importable module-level functions taking
+# `progress=` as a keyword argument.
+#
+# Settings (env):
+#   TESORIN_JOB_WORKERS   worker processes (default: CPU count, at most 4)
+#   TESORIN_JOB_CACHE     finished results (and failures) to keep (default 128)
+
+import hashlib
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+from session_memory import current_session_id
+
+MAX_WORKERS = int(os.getenv("TESORIN_JOB_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+RESULT_CACHE_SIZE = int(os.getenv("TESORIN_JOB_CACHE", "128"))
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_manager = None
+_progress = None  # key -> fraction done (shared with the workers)
+_cancelled = None  # key -> True (shared with the workers)
+
+_jobs: Dict[str, dict] = {}  # key -> {"future", "holders": {session_id: tag}}
+_results: "OrderedDict[str, Any]" = OrderedDict()
+_errors: "OrderedDict[str, str]" = OrderedDict()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ---------- WORKER SIDE ----------
+
+def _run(func: Callable, key: str, progress_map, cancelled_map, args: tuple) -> Any:
+    def progress(done: float) -> None:
+        if cancelled_map.get(key):
+            raise JobCancelled(key)
+        progress_map[key] = float(done)
+
+    return func(*args, progress=progress)
+
+
+# ---------- POOL ----------
+
+def _ensure_pool() -> ProcessPoolExecutor:
+    global _pool, _manager, _progress, _cancelled
+    if _pool is not None:
+        return _pool
+    with _lock:
+        if _pool is None:
+            # spawn, not fork: the Streamlit server is multi-threaded
+            ctx = multiprocessing.get_context("spawn")
+            _manager = ctx.Manager()
+            _progress = _manager.dict()
+            _cancelled = _manager.dict()
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx)
+    return _pool
+
+
+def job_key(func: Callable, *args) -> str:
+    payload = pickle.dumps(
+        (func.__module__, func.__qualname__, args, date.today()), protocol=pickle.HIGHEST_PROTOCOL
+    )
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _finished(key: str, future: Future) -> None:
+    with _lock:
+        _jobs.pop(key, None)
+        if future.cancelled():
+            pass
+        elif isinstance(future.exception(), JobCancelled):
+            pass
+        elif future.exception() is not None:
+            _errors[key] = f"{type(future.exception()).__name__}: {future.exception()}"
+            while len(_errors) > RESULT_CACHE_SIZE:
+                _errors.popitem(last=False)
+        else:
+            _results[key] = future.result()
+            _results.move_to_end(key)
+            while len(_results) > RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+    if _progress is not None:
+        _progress.pop(key, None)
+        _cancelled.pop(key, None)
+
+
+# ---------- API ----------
+
+def submit(func: Callable, *args, tag: str = "") -> str:
+    """
+    Start (or join) the job `func(*args, progress=...)` for this session
+    and return its key. `tag` is the tab that needs the result.
+    """
+    key = job_key(func, *args)
+    session_id = current_session_id()
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return key
+        job = _jobs.get(key)
+        if job is not None:
+            job["holders"][session_id] = tag
+            return key
+        _errors.pop(key, None)
+
+    pool = _ensure_pool()
+    with _lock:
+        if key in _jobs or key in _results:  # another thread got here first
+            if key in _jobs:
+                _jobs[key]["holders"][session_id] = tag
+            return key
+        future = pool.submit(_run, func, key, _progress, _cancelled, args)
+        _jobs[key] = {"future": future, "holders": {session_id: tag}}
+    future.add_done_callback(lambda f, key=key: _finished(key, f))
+    return key
+
+
+def status(key: str) -> dict:
+    """{"state": "done" | "running" | "queued" | "failed" | "unknown", ...}"""
+    with _lock:
+        if key in _results:
+            return {"state": "done", "progress": 1.0, "result": _results[key]}
+        if key in _errors:
+            return {"state": "failed", "progress": 0.0, "error": _errors[key]}
+        job = _jobs.get(key)
+    if job is None:
+        return {"state": "unknown", "progress": 0.0}
+    if job["future"].running():
+        return {"state": "running", "progress": _progress.get(key, 0.0)}
+    return {"state": "queued", "progress": 0.0}
+
+
+def cancel(key: str) -> None:
+    with _lock:
+        job = _jobs.get(key)
+    if job is None:
+        return
+    if not job["future"].cancel():
+        # already running: it stops at its next progress() call
+        _cancelled[key] = True
+
+
+def release_session(keep_tag: Optional[str] = None, session_id: Optional[str] = None) -> int:
+    """
+    Drop this session's hold on jobs for tabs other than `keep_tag`
+    (all jobs when None). Returns how many jobs were cancelled.
+    """
+    session_id = session_id or current_session_id()
+    orphaned = []
+    with _lock:
+        for key, job in _jobs.items():
+            holders = job["holders"]
+            if session_id in holders and (keep_tag is None or holders[session_id] != keep_tag):
+                del holders[session_id]
+                if not holders:
+                    orphaned.append(key)
+    for key in orphaned:
+        cancel(key)
+    return len(orphaned)
+
+
+def stats() -> dict:
+    with _lock:
+        futures = [job["future"] for job in _jobs.values()]
+        return {
+            "workers": MAX_WORKERS,
+            "running": sum(1 for f in futures if f.running()),
+            "queued": sum(1 for f in futures if not f.running() and not f.done()),
+            "cached": len(_results),
+        }
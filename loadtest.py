@@ -0,0 +1,215 @@
+# loadtest.py
+#
+# Offline load test for app.py, built on streamlit's AppTest.
+#
+# Each simulated session walks the same journey a new user does:
+#   landing → sign up → profile → Wealthflow → add N transactions → Next step
+# and every script rerun along the way is timed.
+#
+# Usage:
+#   python loadtest.py --sessions 200 --workers 8 --transactions 20
+#
+# Sessions are spread over worker processes; inside a process they stay open
+# together and take turns, so memory reflects that many live users.
+# Reports rerun latency percentiles (overall and per step), throughput
+# (reruns/s and journeys/s) and peak RSS. Everything runs locally in
+# worker processes – no server, no network.
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+# Simulated users must not land in (or come back from) real local data.
+os.environ.setdefault("TESORIN_DATA_DIR", tempfile.mkdtemp(prefix="tesorin-loadtest-"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+RUN_ID = uuid.uuid4().hex[:8]
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RUN_TIMEOUT_SECONDS = 60
+
+
+def _button(at: AppTest, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise LookupError(f"No button labelled {label!r} on screen {at.session_state.screen!r}")
+
+
+def _by_label(elements, label: str):
+    for e in elements:
+        if e.label.startswith(label):
+            return e
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def journey(at: AppTest, session_no: int, transactions: int) -> Iterator[str]:
+    """
+    Scripted user journey. Sets up widget input for the next rerun, then
+    yields the step name; the driver runs (and times) the script.
+    """
+    yield "landing"
+
+    at.button(key="landing_signup").click()
+    yield "open_signup"
+
+    _by_label(at.text_input, "Preferred name").input(f"user{session_no}")
+    _by_label(at.text_input, "Email").input(f"user{session_no}-{RUN_ID}@example.com")
+    _by_label(at.text_input, "Password").input("load-test")
+    at.checkbox[0].check()
+    _button(at, "Sign up").click()
+    yield "signup"
+
+    _by_label(at.number_input, "Average monthly income").set_value(60000.0)
+    _by_label(at.number_input, "Average monthly essential").set_value(35000.0)
+    _by_label(at.number_input, "Cash savings").set_value(50000.0)
+    _button(at, "Save and continue to your planner").click()
+    yield "profile"
+
+    _button(at, "💸 Wealthflow").click()
+    yield "wealthflow"
+    _button(at, "Open wallet").click()
+    yield "open_wallet"
+
+    today = date.today()
+    for i in range(transactions):
+        _by_label(at.date_input, "Date").set_value(today - timedelta(days=i % 28))
+        _by_label(at.text_input, "Category").input("Groceries" if i % 2 else "Salary")
+        _by_label(at.text_input, "Note").input(f"txn {i}")
+        # distinct amounts, so the duplicate check never stops the journey
+        _by_label(at.number_input, "Amount").set_value(-750.0 - i if i % 2 else 2500.0 + i)
+        _button(at, "Add transaction").click()
+        yield "add_transaction"
+
+    _button(at, "➡ Next step").click()
+    yield "next_step"
+    _button(at, "Save answers and see next steps").click()
+    yield "next_step_submit"
+
+
+def _run_batch(session_numbers: List[int], transactions: int) -> Dict:
+    """
+    Worker-process entry point.
+
+    AppTest is not thread-safe, so each process drives its sessions
+    round-robin: every session stays open (state in memory) and advances
+    one rerun at a time, like a crowd of users clicking in turn.
+    """
+    samples: Dict[int, List] = {n: [] for n in session_numbers}
+    errors: Dict[int, str] = {}
+    active = {}
+    for n in session_numbers:
+        at = AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT_SECONDS)
+        active[n] = (at, journey(at, n, transactions))
+
+    while active:
+        for n in list(active):
+            at, steps = active[n]
+            try:
+                step = next(steps)
+                start = time.perf_counter()
+                at.run(timeout=RUN_TIMEOUT_SECONDS)
+                samples[n].append((step, time.perf_counter() - start))
+                if at.exception:
+                    raise RuntimeError(f"{step}: {at.exception[0].message}")
+            except StopIteration:
+                del active[n]
+            except Exception as exc:  # keep going; failures are reported
+                errors[n] = f"session {n}: {exc}"
+                del active[n]
+
+    results = [{"samples": samples[n], "error": errors.get(n)} for n in session_numbers]
+    return {"results": results, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(results: List[Dict], elapsed: float, peak_rss_kb: int) -> Dict:
+    by_step: Dict[str, List[float]] = {}
+    all_samples: List[float] = []
+    errors = [r["error"] for r in results if r["error"]]
+    for r in results:
+        for step, seconds in r["samples"]:
+            by_step.setdefault(step, []).append(seconds)
+            all_samples.append(seconds)
+
+    def _pcts(values: List[float]) -> Dict:
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+
+    return {
+        "sessions": len(results),
+        "failed_sessions": len(errors),
+        "errors": errors[:10],
+        "elapsed_s": round(elapsed, 2),
+        "reruns_per_s": round(len(all_samples) / elapsed, 1) if elapsed else 0.0,
+        "journeys_per_s": round((len(results) - len(errors)) / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+        "reruns": _pcts(all_samples),
+        "steps": {step: _pcts(v) for step, v in by_step.items()},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, default=100, help="simulated users in total")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="worker processes")
+    parser.add_argument("--transactions", type=int, default=10, help="transactions each user adds")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    workers = max(1, min(args.workers, args.sessions))
+    sessions = list(range(args.sessions))
+    chunks = [sessions[i::workers] for i in range(workers)]
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batches = list(pool.map(_run_batch, chunks, [args.transactions] * workers))
+
+    results = [r for b in batches for r in b["results"]]
+    # ru_maxrss is per process; add the workers up for the box-wide peak
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + sum(
+        b["max_rss_kb"] for b in batches
+    )
+
+    report = summarize(results, time.perf_counter() - start, peak_rss_kb)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{report['sessions']} sessions ({report['failed_sessions']} failed) "
+            f"in {report['elapsed_s']}s · {report['reruns_per_s']} reruns/s · "
+            f"{report['journeys_per_s']} journeys/s · peak RSS {report['peak_rss_mb']} MB"
+        )
+        r = report["reruns"]
+        print(f"all reruns  n={r['count']:<6} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms")
+        for step, s in report["steps"].items():
+            print(f"{step:<17} n={s['count']:<6} p50={s['p50_ms']}ms p95={s['p95_ms']}ms p99={s['p99_ms']}ms")
+        for err in report["errors"]:
+            print(f"error: {err}", file=sys.stderr)
+
+    return 1 if report["failed_sessions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,10 @@
 # logic.py
 from datetime import datetime
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+from metrics import timed
+from recurring import expand_rules, recurring_totals
 
 
 def calculate_cashflow(income: float, expenses: float) -> float:
@@ -16,12 +21,24 @@ def calculate_savings_rate(income: float, cashflow: float) -> float:
     return (cashflow / income) * 100
 
 
-def emergency_fund_target(expenses: float, debt: float) -> float:
+def emergency_fund_target(
+    expenses: float,
+    debt: float,
+    monthly_spend: Optional[Tuple[float, float]] = None,
+    percentile: float = 0.9,
+) -> float:
     """
     v0.1 rule:
     - If debt > 0 → target = 1× monthly expenses
     - Else → target = 3× monthly expenses
+
+    Spending mode: pass monthly_spend = (mean, standard deviation) of real
+    monthly spending and "monthly expenses" becomes the `percentile` month
+    (normal approximation), e.g. 0.9 → a month as expensive as 9 in 10.
     """
+    if monthly_spend is not None:
+        mean, std = monthly_spend
+        expenses = mean + NormalDist().inv_cdf(percentile) * std
     if expenses <= 0:
         return 0.0
     if debt > 0:
@@ -74,12 +91,14 @@ def monthly_goal_contribution(target_amount: float, target_year: int) -> float:
     return target_amount / months
 
 
+@timed()
 def allocate_monthly_plan(
     income: float,
     expenses: float,
     country: str,
     debt: float,
     high_interest_debt: bool,
+    forecast_cashflow: Optional[float] = None,
 ) -> dict:
     """
     Returns recommended monthly savings amount + breakdown:
@@ -90,8 +109,14 @@ def allocate_monthly_plan(
       "investing": ...,
       "debt": ...
     }
+
+    forecast_cashflow: projected monthly net from the wallets (forecast.py).
+    When given, it replaces income - expenses as the monthly cashflow.
     """
-    cashflow = calculate_cashflow(income, expenses)
+    if forecast_cashflow is not None:
+        cashflow = forecast_cashflow
+    else:
+        cashflow = calculate_cashflow(income, expenses)
     if cashflow <= 0:
         return {
             "cashflow": cashflow,
@@ -132,3 +157,32 @@ def allocate_monthly_plan(
         "investing": investing_amount,
         "debt": debt_amount,
     }
+
+
+@timed()
+def compute_wallet_stats(wallet, start_date, end_date):
+    txns = [
+        t
+        for t in wallet["transactions"]
+        if start_date <= t["date"] <= end_date
+    ]
+    balance = sum(t["amount"] for t in txns)
+    income = sum(t["amount"] for t in txns if t["amount"] > 0)
+    expenses = sum(-t["amount"] for t in txns if t["amount"] < 0)
+
+    rules = wallet.get("recurring")
+    if rules:
+        # sums in closed form; rows generated for this period only
+        r_balance, r_income, r_expenses, _ = recurring_totals(rules, start_date, end_date)
+        balance += r_balance
+        income += r_income
+        expenses += r_expenses
+        txns = sorted(txns + list(expand_rules(rules, start_date, end_date)), key=lambda t: t["date"])
+    change = balance
+    return {
+        "balance": balance,
+        "income": income,
+        "expenses": expenses,
+        "change": change,
+        "transactions": txns,
+    }
@@ -0,0 +1,223 @@
+# metrics.py
+#
+# Lightweight timing for screen/tab renders and heavy compute calls.
+#
+# Off by default. Set TESORIN_METRICS=1 to turn it on:
+# - `timed()` then records each call into a fixed-bucket histogram
+#   (p50/p95/p99 are read from the buckets, so recording is O(1)).
+# - `count_rerun()` counts script reruns per trigger (screen / tab).
+# - `maybe_export()` writes everything to a Prometheus text file.
+# - `render_metrics_panel()` shows the same numbers inside the app
+#   (open the main app with ?admin=metrics in the URL, signed in as a
+#   user listed in TESORIN_ADMINS).
+#
+# When disabled, `timed()` returns the function untouched, so there is
+# no wrapper and no overhead at all.
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+ENABLED = os.getenv("TESORIN_METRICS", "").lower() not in ("", "0", "false", "no")
+METRICS_FILE = os.getenv("TESORIN_METRICS_FILE", "metrics.prom")
+EXPORT_INTERVAL_SECONDS = float(os.getenv("TESORIN_METRICS_INTERVAL", "15"))
+
+# Bucket upper bounds in seconds: 0.1 ms doubling up to ~26 s.
+BUCKETS = tuple(0.0001 * 2 ** i for i in range(19))
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_histograms: Dict[str, "Histogram"] = {}
+_reruns: Dict[str, int] = {}
+_last_export = 0.0
+
+log = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus style)."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot = +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by interpolating inside its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * ((rank - seen) / c)
+            seen += c
+        return BUCKETS[-1]
+
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.observe(seconds)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """
+    Decorator: record how long each call takes under `name`
+    (defaults to the function name). No-op when metrics are disabled.
+    """
+
+    def decorate(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(label, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def count_rerun(trigger: str) -> None:
+    """Count one script run for the given trigger (e.g. "main/home")."""
+    if not ENABLED:
+        return
+    with _lock:
+        _reruns[trigger] = _reruns.get(trigger, 0) + 1
+
+
+def snapshot() -> dict:
+    """Return a copy of the current numbers for display."""
+    with _lock:
+        timings = {
+            name: {
+                "count": hist.count,
+                "total": hist.total,
+                **{f"p{int(q * 100)}": hist.quantile(q) for q in QUANTILES},
+            }
+            for name, hist in _histograms.items()
+        }
+        reruns = dict(_reruns)
+    return {"timings": timings, "reruns": reruns}
+
+
+def to_prometheus() -> str:
+    lines = [
+        "# HELP tesorin_duration_seconds Time spent in instrumented renders and compute calls.",
+        "# TYPE tesorin_duration_seconds histogram",
+    ]
+    with _lock:
+        for name in sorted(_histograms):
+            hist = _histograms[name]
+            cumulative = 0
+            for bound, c in zip(BUCKETS, hist.counts):
+                cumulative += c
+                lines.append(
+                    f'tesorin_duration_seconds_bucket{{fn="{name}",le="{bound:g}"}} {cumulative}'
+                )
+            lines.append(f'tesorin_duration_seconds_bucket{{fn="{name}",le="+Inf"}} {hist.count}')
+            lines.append(f'tesorin_duration_seconds_sum{{fn="{name}"}} {hist.total:.6f}')
+            lines.append(f'tesorin_duration_seconds_count{{fn="{name}"}} {hist.count}')
+
+        lines.append("# HELP tesorin_duration_quantile_seconds Estimated latency quantiles.")
+        lines.append("# TYPE tesorin_duration_quantile_seconds gauge")
+        for name in sorted(_histograms):
+            hist = _histograms[name]
+            for q in QUANTILES:
+                lines.append(
+                    f'tesorin_duration_quantile_seconds{{fn="{name}",quantile="{q}"}} '
+                    f"{hist.quantile(q):.6f}"
+                )
+
+        lines.append("# HELP tesorin_reruns_total Script reruns per trigger.")
+        lines.append("# TYPE tesorin_reruns_total counter")
+        for trigger in sorted(_reruns):
+            lines.append(f'tesorin_reruns_total{{trigger="{trigger}"}} {_reruns[trigger]}')
+    return "\n".join(lines) + "\n"
+
+
+def maybe_export(force: bool = False) -> None:
+    """
+    Write the Prometheus file, at most once per EXPORT_INTERVAL_SECONDS.
+    Runs from every session's thread: one of them claims the interval, and
+    each write goes to its own temp file. A failed write is logged, never
+    raised into the page.
+    """
+    global _last_export
+    if not ENABLED:
+        return
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _last_export < EXPORT_INTERVAL_SECONDS:
+            return
+        _last_export = now
+
+    text = to_prometheus()
+    directory = os.path.dirname(os.path.abspath(METRICS_FILE))
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, METRICS_FILE)
+    except OSError:
+        log.exception("could not export metrics to %s", METRICS_FILE)
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def render_metrics_panel() -> None:
+    """Hidden admin panel with the same numbers as the Prometheus file."""
+    import streamlit as st
+
+    data = snapshot()
+    with st.expander("Diagnostics · render timings", expanded=True):
+        rows = [
+            {
+                "Function": name,
+                "Calls": t["count"],
+                "p50 (ms)": round(t["p50"] * 1000, 2),
+                "p95 (ms)": round(t["p95"] * 1000, 2),
+                "p99 (ms)": round(t["p99"] * 1000, 2),
+            }
+            for name, t in sorted(data["timings"].items())
+        ]
+        if rows:
+            st.table(rows)
+        else:
+            st.caption("Nothing recorded yet.")
+
+        if data["reruns"]:
+            st.markdown("##### Reruns per trigger")
+            st.table(
+                [{"Trigger": k, "Reruns": v} for k, v in sorted(data["reruns"].items())]
+            )
+
+        st.caption(f"Exported to `{METRICS_FILE}` every {EXPORT_INTERVAL_SECONDS:g}s.")
@@ -1,6 +1,7 @@
 # navigation.py
 import streamlit as st
 from supabase_client import sign_out
+from session_store import detach
 
 
 def render_top_navbar() -> None:
@@ -21,6 +22,7 @@ def render_top_navbar() -> None:
             # ---- Log out button ----
             if st.button("Log out", key="nav_logout", use_container_width=True):
                 sign_out()
+                detach(ss)
                 ss.user = None
                 ss.screen = "landing"
                 ss.main_tab = "home"
@@ -0,0 +1,171 @@
+# networth.py
+#
+# Net-worth history.
+#
+# A snapshot is taken when the home tab renders: profile savings - debt,
+# plus every wallet's balance (from the forecast models, O(1)) and what
+# is saved in tracked goals. At most one point per day is kept; later
+# snapshots on the same day replace it.
+#
+# Points live in three tiers so a long history stays small and cheap to
+# chart:
+# - daily   – the last DAILY_DAYS days, one point per day,
+# - weekly  – the last WEEKLY_WEEKS weeks (Monday start),
+# - monthly – every month, kept forever (12 points a year).
+# When a day ages out of the daily tier it is folded into its week and
+# its month (last value, plus count / sum / min / max of the net worth),
+# and weeks are dropped once they age out (their months already have
+# them). `series()` reads the finest tier available for each stretch of
+# time, newest points from the daily tier, older ones from weeks, then
+# months.
+#
+# One history per user, cached in session_state (ss.networth_history) so
+# a render does not read the disk. Only a verified user's history is
+# stored (storage.put under NAMESPACE, written back only when a point
+# changed); without one it lives in session_state alone, like everything
+# else an unverified session has (see supabase_client.verified_user_id).
+
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import streamlit as st
+
+import storage
+from forecast import wallet_model
+from recurring import recurring_totals
+from supabase_client import verified_user_id
+
+NAMESPACE = "networth"
+DAILY_DAYS = 92
+WEEKLY_WEEKS = 104
+RANGES = {"3 months": 92, "1 year": 365, "All time": None}  # label -> days
+
+
+class Snapshot(NamedTuple):
+    net: float
+    savings: float
+    debt: float
+    wallets: float
+    goals: float
+
+
+def _week(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _month_key(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+class NetWorthHistory:
+    """Daily / weekly / monthly net-worth points for one user."""
+
+    def __init__(self) -> None:
+        self.daily: Dict[date, Snapshot] = {}
+        # bucket -> [last day, last snapshot, count, sum, min, max] (of net)
+        self.weekly: Dict[date, list] = {}
+        self.monthly: Dict[int, list] = {}
+
+    def record(self, day: date, snapshot: Snapshot) -> bool:
+        """Set the point for `day`. Returns True if anything changed."""
+        if self.daily.get(day) == snapshot:
+            return False
+        self.daily[day] = snapshot
+        self._expire(day)
+        return True
+
+    def _expire(self, today: date) -> None:
+        cutoff = today - timedelta(days=DAILY_DAYS)
+        for day in [d for d in self.daily if d < cutoff]:
+            snapshot = self.daily.pop(day)
+            _fold(self.weekly, _week(day), day, snapshot)
+            _fold(self.monthly, _month_key(day), day, snapshot)
+        week_cutoff = _week(today) - timedelta(weeks=WEEKLY_WEEKS)
+        for week in [w for w in self.weekly if w < week_cutoff]:
+            del self.weekly[week]
+
+    def latest(self) -> Optional[Snapshot]:
+        return self.daily[max(self.daily)] if self.daily else None
+
+    def series(self, since: Optional[date] = None) -> List[Tuple[date, float]]:
+        """(day, net worth) from `since` on, oldest first, finest tier available."""
+        points = sorted((d, s.net) for d, s in self.daily.items())
+        covered_from = points[0][0] if points else date.max
+        for buckets in (self.weekly, self.monthly):
+            older = sorted(
+                (bucket[0], bucket[1].net) for bucket in buckets.values() if bucket[0] < covered_from
+            )
+            points = older + points
+            if older:
+                covered_from = older[0][0]
+        if since is not None:
+            points = [p for p in points if p[0] >= since]
+        return points
+
+    def __len__(self) -> int:
+        return len(self.daily) + len(self.weekly) + len(self.monthly)
+
+
+def _fold(buckets: dict, key, day: date, snapshot: Snapshot) -> None:
+    bucket = buckets.get(key)
+    if bucket is None:
+        buckets[key] = [day, snapshot, 1, snapshot.net, snapshot.net, snapshot.net]
+        return
+    if day >= bucket[0]:
+        bucket[0], bucket[1] = day, snapshot
+    bucket[2] += 1
+    bucket[3] += snapshot.net
+    bucket[4] = min(bucket[4], snapshot.net)
+    bucket[5] = max(bucket[5], snapshot.net)
+
+
+# ---------- SESSION ----------
+
+def current_snapshot(ss, savings: float, debt: float, goals) -> Snapshot:
+    today = date.today()
+    wallets = 0.0
+    for wallet in ss.get("wallets", []):
+        wallets += wallet_model(ss, wallet).total
+        if wallet.get("recurring"):
+            wallets += recurring_totals(wallet["recurring"], date.min, today)[0]
+    saved = sum((float(g.get("saved", 0.0) or 0.0) for g in goals), 0.0)
+    net = savings - debt + wallets + saved
+    return Snapshot(round(net, 2), round(savings, 2), round(debt, 2), round(wallets, 2), round(saved, 2))
+
+
+def networth_history(ss) -> NetWorthHistory:
+    owner = verified_user_id(ss.get("user"))
+    cached = ss.get("networth_history")
+    if cached is None or cached[0] != owner:
+        stored = storage.get(NAMESPACE, owner, default=None) if owner is not None else None
+        cached = ss.networth_history = (owner, stored or NetWorthHistory())
+    return cached[1]
+
+
+def record_snapshot(ss, snapshot: Snapshot, day: Optional[date] = None) -> NetWorthHistory:
+    """Today's point for this user; stored (verified users only) if it changed."""
+    history = networth_history(ss)
+    owner = ss.networth_history[0]
+    if history.record(day or date.today(), snapshot) and owner is not None:
+        storage.put(NAMESPACE, owner, history)
+    return history
+
+
+# ---------- UI ----------
+
+def render_networth_chart(history: NetWorthHistory, currency: str) -> None:
+    st.markdown("##### Net worth over time")
+    label = st.radio("Range", tuple(RANGES), horizontal=True, key="networth_range", label_visibility="collapsed")
+    days = RANGES[label]
+    since = date.today() - timedelta(days=days) if days else None
+    points = history.series(since)
+    if len(points) < 2:
+        st.caption("Your net worth is saved once a day – come back tomorrow to see the trend.")
+        return
+    st.line_chart(
+        {"Date": [d for d, _ in points], f"Net worth ({currency})": [v for _, v in points]},
+        x="Date",
+        height=220,
+    )
+    first, last = points[0][1], points[-1][1]
+    st.caption(f"{currency}{last - first:+,.0f} since {points[0][0]:%b %d, %Y}.")
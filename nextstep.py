@@ -1,8 +1,16 @@
 import streamlit as st
+
+import jobs
 from logic import (
     calculate_cashflow,
-    emergency_fund_target,
 )
+from metrics import timed
+from plan_engine import build_plan, plan_inputs
+from emergency import emergency_target
+from profile import profile_metrics
+from session_store import mark_dirty
+from goals import goal_progress, goal_registry
+from projections import projection_inputs, simulate_goals
 
 
 def get_currency(country_code: str) -> str:
@@ -11,6 +19,7 @@ def get_currency(country_code: str) -> str:
     return "$"
 
 
+@timed()
 def render_next_step_tab() -> None:
     ss = st.session_state
     profile = ss.profile
@@ -21,11 +30,10 @@ def render_next_step_tab() -> None:
 
     ns = ss.get("next_step", {})
     ss.next_step = ns
+    goals = goal_registry(ss)
 
     income = float(profile["income"])
     expenses = float(profile["expenses"])
-    savings = float(profile["savings"])
-    debt = float(profile["debt"])
 
     cashflow = calculate_cashflow(income, expenses)
 
@@ -44,7 +52,8 @@ def render_next_step_tab() -> None:
             "You’re roughly breaking even. These questions will help you see what to focus on first."
         )
 
-    e_target_for_default = emergency_fund_target(expenses, debt)
+    # from real spending when the profile asks for it (same number as the home card)
+    e_target_for_default, e_from_spending = emergency_target(ss, profile_metrics(ss))
 
     primary_goal_options = [
         "Build or top up my emergency fund",
@@ -162,141 +171,58 @@ def render_next_step_tab() -> None:
     if ns.get("primary_goal"):
         st.markdown("### Your simple next-step plan")
 
+        plan = build_plan(
+            plan_inputs(profile, ns, currency, e_target_for_default if e_from_spending else None)
+        )
         goal = ns["primary_goal"]
-        monthly = ns.get("monthly_amount", 0.0)
-        if monthly <= 0 and cashflow > 0:
-            monthly = max(cashflow * 0.3, 0)
-
-        target = ns.get("target_amount", 0.0)
-        if target == 0 and "emergency fund" in goal.lower():
-            target = float(e_target_for_default)
-
-        e_target = emergency_fund_target(expenses, debt=debt)
-        gap = max(e_target - savings, 0)
-        months_to_buffer = gap / monthly if monthly > 0 else None
-
-        if "emergency fund" in goal.lower():
-            st.write(
-                f"**Focus:** build a simple emergency fund of about "
-                f"**{currency}{e_target:,.0f}**."
-            )
-            lines = [
-                f"- Aim to send **{currency}{monthly:,.0f} per month** into a separate high-safety account.",
-            ]
-            if months_to_buffer:
-                lines.append(
-                    f"- At that pace, you’d reach this buffer in roughly **{months_to_buffer:.1f} months**."
-                )
-            lines.extend(
-                [
-                    "- Keep investments very low-risk until this buffer is in place.",
-                    "- Revisit this tab once the buffer is at least 50–75% funded.",
-                ]
-            )
-            st.markdown("\n".join(lines))
-
-        elif "debt" in goal.lower():
-            st.write(
-                "**Focus:** clean up high-interest debt while keeping a small safety cushion."
-            )
-            st.markdown(
-                f"- Choose a fixed payment of **{currency}{monthly:,.0f} per month** toward your highest-interest debt.\n"
-                "- Keep a mini-buffer of ~1 month of expenses in cash before making extra payments.\n"
-                "- Each month, log payments in Wealthflow so you can see your balance trend down.\n"
-                "- When high-interest debt is gone, redirect this same amount into investing."
-            )
-
-        elif "investing" in goal.lower():
-            st.write("**Focus:** start a calm, automatic investing habit.")
-            st.markdown(
-                f"- Pick a realistic starting amount, e.g. **{currency}{monthly:,.0f} per month**.\n"
-                "- Use a simple diversified fund rather than chasing single stocks.\n"
-                "- Set a rule: you only review this plan once per quarter, not every market headline.\n"
-                "- Track your overall invested balance in Tesorin, not day-to-day price moves."
-            )
 
-        elif "specific purchase" in goal.lower():
-            st.write("**Focus:** save for a specific purchase without breaking your basics.")
-            st.markdown(
-                f"- Target amount for this goal: **{currency}{target:,.0f}**.\n"
-                f"- With **{currency}{monthly:,.0f} per month**, estimate how many months it would take and compare to your timeframe.\n"
-                "- Keep this pot separate from your emergency fund.\n"
-                "- If the timeline feels too long, either lower the target or raise the monthly amount once cashflow improves."
-            )
-
-        else:
-            st.write("**Focus:** get the basics solid before picking a specific goal.")
-            st.markdown(
-                "- First, make sure your monthly cashflow is positive (Wealthflow tab).\n"
-                "- Build at least 1 month of essential expenses as a starter buffer.\n"
-                "- Then come back here and pick either emergency fund, debt, or long-term investing as your first focus."
-            )
+        st.write(plan.headline)
+        st.markdown("\n".join(plan.lines))
 
         st.markdown("#### Next 7 days")
-        st.markdown(
-            "- Write down your current balances: cash, debt, and any investments.\n"
-            "- Decide where your emergency buffer or goal savings will live (which account).\n"
-            "- If you’re comfortable, set up an automatic monthly transfer for the amount you chose."
-        )
+        st.markdown("\n".join(plan.next_7_days))
 
         st.markdown("#### Next 30–90 days")
-        st.markdown(
-            "- Track at least one month of real spending in the Wealthflow tab.\n"
-            "- Adjust your monthly goal amount if it feels too tight or too easy.\n"
-            "- Revisit this tab in a month to see if your focus still feels right."
-        )
+        st.markdown("\n".join(plan.next_90_days))
 
         create_clicked = st.button("Add this as a tracked goal")
 
         if create_clicked:
             name = ns.get("nickname") or goal
-            target = ns.get("target_amount", 0.0)
-            if target == 0 and "emergency fund" in goal.lower():
-                target = float(e_target)
-
-            monthly_target = monthly
-            existing = next(
-                (g for g in ss.goal_plans if g["name"] == name), None
-            )
+            target = plan.target
+            monthly_target = plan.monthly
+            existing = goals.by_name(name)
             if existing:
-                existing.update(
-                    {
-                        "target": target,
-                        "monthly_target": monthly_target,
-                        "timeframe": ns["timeframe"],
-                        "why": ns["why"],
-                        "kind": goal,
-                    }
+                goals.update(
+                    existing["id"],
+                    target=target,
+                    monthly_target=monthly_target,
+                    timeframe=ns["timeframe"],
+                    why=ns["why"],
+                    kind=goal,
                 )
+                mark_dirty(ss, "goal_plans")
                 st.success(f"Updated tracked goal: {name}")
             else:
-                new_goal = {
-                    "id": f"g{len(ss.goal_plans)+1}",
-                    "name": name,
-                    "kind": goal,
-                    "target": target,
-                    "saved": 0.0,
-                    "monthly_target": monthly_target,
-                    "timeframe": ns["timeframe"],
-                    "why": ns["why"],
-                }
-                ss.goal_plans.append(new_goal)
-                if name not in ss.profile["goals"]:
-                    ss.profile["goals"].append(name)
+                goals.add(
+                    name=name,
+                    kind=goal,
+                    target=target,
+                    saved=0.0,
+                    monthly_target=monthly_target,
+                    timeframe=ns["timeframe"],
+                    why=ns["why"],
+                )
+                mark_dirty(ss, "goal_plans")
+                # by_name() above found no goal with this name, and names only
+                # enter profile["goals"] here, so it is not listed yet
+                ss.profile["goals"].append(name)
                 st.success(f"Added new tracked goal: {name}")
 
-    if ss.goal_plans:
+    if goals:
         st.markdown("### Track progress on your goals")
 
-        emergency_goal = next(
-            (
-                g
-                for g in ss.goal_plans
-                if "emergency" in g.get("name", "").lower()
-                or "emergency" in g.get("kind", "").lower()
-            ),
-            None,
-        )
+        emergency_goal = goals.emergency()
 
         if emergency_goal:
             st.markdown("#### Emergency fund")
@@ -311,52 +237,158 @@ def render_next_step_tab() -> None:
                 )
             else:
                 pct = 0
-            caption_text = f"{currency}{saved:,.0f} saved so far"
+                caption_text = f"{currency}{saved:,.0f} saved so far"
 
             st.caption(caption_text)
             st.progress(pct)
 
-            add_em = st.number_input(
-                f"Add amount to Emergency fund ({currency})",
-                min_value=0.0,
-                step=100.0,
-                key="goal_add_emergency",
+            em_ledger = goals.ledger(emergency_goal["id"])
+            st.caption(
+                f"Status: {em_ledger.status(float(emergency_goal.get('monthly_target', 0.0) or 0.0))}"
             )
-            if st.button("Add to Emergency fund", key="goal_btn_emergency"):
-                emergency_goal["saved"] += float(add_em)
-                st.success("Emergency fund updated.")
+            history = em_ledger.history()
+            if len(history) > 1:
+                st.line_chart(
+                    {"Saved": [balance for _, balance in history]},
+                    x_label="Month",
+                    y_label=f"Saved ({currency})",
+                )
 
             st.markdown("---")
 
-        st.markdown("#### Other goals")
-
-        for idx, goal in enumerate(ss.goal_plans):
-            if emergency_goal is not None and goal is emergency_goal:
-                continue
+        render_goal_progress_form(goals, currency)
+        render_goal_projections(goals, currency, int(ns.get("risk", 3)))
 
-            target = goal.get("target", 0.0) or 0.0
-            saved = goal.get("saved", 0.0) or 0.0
-            if target > 0:
-                pct = int(min(100, max(0, saved / target * 100)))
-            else:
-                pct = 0
 
-            st.caption(
-                f"**{goal['name']}** — {currency}{saved:,.0f}"
-                + (
-                    f" / {currency}{target:,.0f} ({pct}% complete)"
-                    if target > 0
-                    else ""
-                )
-            )
-            st.progress(pct)
+def goal_progress_rows(goals) -> list:
+    """One editable grid row per goal (the "Add now" column starts at 0)."""
+    rows = []
+    for goal in goals:
+        target = float(goal.get("target", 0.0) or 0.0)
+        rows.append(
+            {
+                "Goal": goal["name"],
+                "Saved": float(goal.get("saved", 0.0) or 0.0),
+                "Target": target,
+                "Progress": int(goal_progress(goal) * 100),
+                "Status": goals.ledger(goal["id"]).status(
+                    float(goal.get("monthly_target", 0.0) or 0.0)
+                ),
+                "Add now": 0.0,
+            }
+        )
+    return rows
+
+
+def batch_amounts(goal_ids: list, edited_rows: dict) -> dict:
+    """
+    Turn data_editor's {"edited_rows": {row: {column: value}}} into
+    {goal_id: amount}, ignoring empty / zero / negative entries.
+    """
+    amounts = {}
+    for row, changes in edited_rows.items():
+        amount = changes.get("Add now")
+        if amount and float(amount) > 0 and int(row) < len(goal_ids):
+            amounts[goal_ids[int(row)]] = float(amount)
+    return amounts
+
+
+def render_goal_progress_form(goals, currency: str) -> None:
+    """
+    All goals in one editable grid. Contributions are entered for any
+    number of goals and applied together on submit: one batch mutation,
+    one rerun, one write to the session store.
+    """
+    ss = st.session_state
+    goal_ids = [g["id"] for g in goals]
+    # a new key after each submit resets the "Add now" column to zeros
+    editor_key = f"goal_batch_{ss.get('goal_batch_round', 0)}"
+
+    with st.form("goal_progress_form", clear_on_submit=False):
+        st.data_editor(
+            goal_progress_rows(goals),
+            key=editor_key,
+            hide_index=True,
+            use_container_width=True,
+            disabled=["Goal", "Saved", "Target", "Progress", "Status"],
+            column_config={
+                "Saved": st.column_config.NumberColumn(f"Saved ({currency})", format="%.0f"),
+                "Target": st.column_config.NumberColumn(f"Target ({currency})", format="%.0f"),
+                "Progress": st.column_config.ProgressColumn(
+                    "Progress", min_value=0, max_value=100, format="%d%%"
+                ),
+                "Add now": st.column_config.NumberColumn(
+                    f"Add now ({currency})", min_value=0.0, step=100.0, format="%.0f"
+                ),
+            },
+        )
+        submitted = st.form_submit_button("Save contributions")
 
-            add_amount = st.number_input(
-                f"Add amount to '{goal['name']}' ({currency})",
-                min_value=0.0,
-                step=100.0,
-                key=f"goal_add_{idx}",
-            )
-            if st.button("Add", key=f"goal_btn_{idx}"):
-                goal["saved"] += float(add_amount)
-                st.success("Goal updated.")
+    if submitted:
+        edits = ss.get(editor_key, {}).get("edited_rows", {})
+        changed = goals.contribute_many(batch_amounts(goal_ids, edits))
+        if changed:
+            mark_dirty(ss, "goal_plans")
+            ss.goal_batch_round = ss.get("goal_batch_round", 0) + 1
+            st.rerun()
+        st.info("Enter an amount in “Add now” for at least one goal.")
+
+    if goals.can_undo() and st.button("Undo last contribution", key="goal_undo"):
+        undone = goals.undo_last()
+        if undone:
+            mark_dirty(ss, "goal_plans")
+            st.rerun()
+
+
+def render_goal_projections(goals, currency: str, risk: int) -> None:
+    """
+    When each goal is likely to be reached. The simulation runs as a
+    background job; until it is done a small fragment polls its progress
+    instead of blocking the tab.
+    """
+    inputs = projection_inputs(goals)
+    if not inputs:
+        return
+
+    st.markdown("#### Projections")
+    key = jobs.submit(simulate_goals, inputs, risk, tag="next")
+    state = jobs.status(key)
+    if state["state"] in ("queued", "running"):
+        st.fragment(_projection_progress, run_every=1.0)(key)
+        return
+    _render_projection_result(state)
+
+
+def _projection_progress(key: str) -> None:
+    state = jobs.status(key)
+    if state["state"] in ("queued", "running"):
+        label = "Waiting for a free worker…" if state["state"] == "queued" else "Projecting your goals…"
+        st.progress(state["progress"], text=label)
+        return
+    # finished: one full rerun renders the result and stops the polling
+    st.rerun()
+
+
+def _render_projection_result(state: dict) -> None:
+    if state["state"] != "done":
+        st.caption(f"Projections are not available right now ({state.get('error', state['state'])}).")
+        return
+
+    rows = []
+    for row in state["result"]:
+        good, typical, slow = row["finish"]
+        rows.append(
+            {
+                "Goal": row["name"],
+                "Likely done": typical or "30+ years",
+                "Range": f"{good or '30+ years'} – {slow or '30+ years'}",
+                "Chance within timeframe": (
+                    f"{row['chance']:.0%}" if row["chance"] is not None else "–"
+                ),
+            }
+        )
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    st.caption(
+        "Based on your monthly amounts and how comfortable you are with ups and downs. "
+        "Range = good to slow markets."
+    )
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from session_memory import render_memory_panel
+
 
 def main():
     st.title("Settings")
@@ -9,6 +11,8 @@ def main():
     if "profile" in st.session_state:
         st.json(st.session_state.profile, expanded=False)
 
+    render_memory_panel(st.session_state)
+
     if st.button("Reset local data"):
         for key in ["profile"]:
             if key in st.session_state:
@@ -0,0 +1,284 @@
+# plan_engine.py
+#
+# Next-step plan engine, without Streamlit.
+#
+# The "simple next-step plan" used to be worked out inside
+# render_next_step_tab, between st.write calls. It is now a pure function
+# of the chosen goal and a few numbers, returning a NextStepPlan that the
+# tab renders (and that scripts / worker processes can build too).
+#
+# - build_plan() is cached on its inputs (PlanInputs is hashable), so a
+#   rerun of the tab with unchanged answers is one dict lookup.
+# - pregenerate_plans() builds the plan of every user in the session store
+#   in a process pool and saves it (storage namespace "plans");
+#   warm_cache() loads a user's saved plan at login, so the first render of
+#   the tab is a cache hit.
+#
+# Usage:
+#   python plan_engine.py               # pre-generate plans for all stored users
+#   python plan_engine.py --workers 4
+
+import argparse
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import session_store
+import storage
+from emergency import build_monthly_spend, spending_target
+from logic import calculate_cashflow, emergency_fund_target
+
+NAMESPACE = "plans"
+CACHE_SIZE = 512
+
+NEXT_7_DAYS = (
+    "- Write down your current balances: cash, debt, and any investments.",
+    "- Decide where your emergency buffer or goal savings will live (which account).",
+    "- If you’re comfortable, set up an automatic monthly transfer for the amount you chose.",
+)
+
+NEXT_90_DAYS = (
+    "- Track at least one month of real spending in the Wealthflow tab.",
+    "- Adjust your monthly goal amount if it feels too tight or too easy.",
+    "- Revisit this tab in a month to see if your focus still feels right.",
+)
+
+
+def get_currency(country_code: str) -> str:
+    if country_code == "IN":
+        return "₹"
+    return "$"
+
+
+class PlanInputs(NamedTuple):
+    """Everything a plan depends on (hashable, so it is the cache key)."""
+
+    goal: str
+    monthly_amount: float
+    target_amount: float
+    income: float
+    expenses: float
+    savings: float
+    debt: float
+    currency: str
+    emergency_target: Optional[float] = None  # from real spending (emergency.py)
+
+
+@dataclass(frozen=True)
+class NextStepPlan:
+    focus: str  # "emergency", "debt", "investing", "purchase" or "basics"
+    headline: str  # markdown, one line
+    lines: Tuple[str, ...]  # markdown bullets
+    monthly: float
+    target: float
+    emergency_target: float
+    months_to_buffer: Optional[float]
+    next_7_days: Tuple[str, ...] = NEXT_7_DAYS
+    next_90_days: Tuple[str, ...] = NEXT_90_DAYS
+
+
+def plan_inputs(
+    profile: dict, next_step: dict, currency: str, emergency_target: Optional[float] = None
+) -> PlanInputs:
+    return PlanInputs(
+        goal=next_step.get("primary_goal") or "",
+        monthly_amount=float(next_step.get("monthly_amount", 0.0)),
+        target_amount=float(next_step.get("target_amount", 0.0)),
+        income=float(profile["income"]),
+        expenses=float(profile["expenses"]),
+        savings=float(profile["savings"]),
+        debt=float(profile["debt"]),
+        currency=currency,
+        emergency_target=None if emergency_target is None else round(emergency_target, 2),
+    )
+
+
+# ---------- PLAN ----------
+
+def _build(inputs: PlanInputs) -> NextStepPlan:
+    goal = inputs.goal.lower()
+    currency = inputs.currency
+
+    cashflow = calculate_cashflow(inputs.income, inputs.expenses)
+    monthly = inputs.monthly_amount
+    if monthly <= 0 and cashflow > 0:
+        monthly = max(cashflow * 0.3, 0)
+
+    e_target = inputs.emergency_target
+    if e_target is None:
+        e_target = emergency_fund_target(inputs.expenses, debt=inputs.debt)
+    target = inputs.target_amount
+    if target == 0 and "emergency fund" in goal:
+        target = float(e_target)
+
+    gap = max(e_target - inputs.savings, 0)
+    months_to_buffer = gap / monthly if monthly > 0 else None
+
+    if "emergency fund" in goal:
+        focus = "emergency"
+        headline = (
+            f"**Focus:** build a simple emergency fund of about "
+            f"**{currency}{e_target:,.0f}**."
+        )
+        lines = [
+            f"- Aim to send **{currency}{monthly:,.0f} per month** into a separate high-safety account.",
+        ]
+        if months_to_buffer:
+            lines.append(
+                f"- At that pace, you’d reach this buffer in roughly **{months_to_buffer:.1f} months**."
+            )
+        lines.extend(
+            [
+                "- Keep investments very low-risk until this buffer is in place.",
+                "- Revisit this tab once the buffer is at least 50–75% funded.",
+            ]
+        )
+
+    elif "debt" in goal:
+        focus = "debt"
+        headline = "**Focus:** clean up high-interest debt while keeping a small safety cushion."
+        lines = [
+            f"- Choose a fixed payment of **{currency}{monthly:,.0f} per month** toward your highest-interest debt.",
+            "- Keep a mini-buffer of ~1 month of expenses in cash before making extra payments.",
+            "- Each month, log payments in Wealthflow so you can see your balance trend down.",
+            "- When high-interest debt is gone, redirect this same amount into investing.",
+        ]
+
+    elif "investing" in goal:
+        focus = "investing"
+        headline = "**Focus:** start a calm, automatic investing habit."
+        lines = [
+            f"- Pick a realistic starting amount, e.g. **{currency}{monthly:,.0f} per month**.",
+            "- Use a simple diversified fund rather than chasing single stocks.",
+            "- Set a rule: you only review this plan once per quarter, not every market headline.",
+            "- Track your overall invested balance in Tesorin, not day-to-day price moves.",
+        ]
+
+    elif "specific purchase" in goal:
+        focus = "purchase"
+        headline = "**Focus:** save for a specific purchase without breaking your basics."
+        lines = [
+            f"- Target amount for this goal: **{currency}{target:,.0f}**.",
+            f"- With **{currency}{monthly:,.0f} per month**, estimate how many months it would take "
+            "and compare to your timeframe.",
+            "- Keep this pot separate from your emergency fund.",
+            "- If the timeline feels too long, either lower the target or raise the monthly amount once cashflow improves.",
+        ]
+
+    else:
+        focus = "basics"
+        headline = "**Focus:** get the basics solid before picking a specific goal."
+        lines = [
+            "- First, make sure your monthly cashflow is positive (Wealthflow tab).",
+            "- Build at least 1 month of essential expenses as a starter buffer.",
+            "- Then come back here and pick either emergency fund, debt, or long-term investing as your first focus.",
+        ]
+
+    return NextStepPlan(
+        focus=focus,
+        headline=headline,
+        lines=tuple(lines),
+        monthly=monthly,
+        target=target,
+        emergency_target=e_target,
+        months_to_buffer=months_to_buffer,
+    )
+
+
+# ---------- CACHE ----------
+
+_cache: "OrderedDict[PlanInputs, NextStepPlan]" = OrderedDict()
+_cache_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _remember(inputs: PlanInputs, plan: NextStepPlan) -> None:
+    with _cache_lock:
+        _cache[inputs] = plan
+        _cache.move_to_end(inputs)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def build_plan(inputs: PlanInputs) -> NextStepPlan:
+    """The plan for these inputs (least-recently-used cache in front)."""
+    global _hits, _misses
+    with _cache_lock:
+        plan = _cache.get(inputs)
+        if plan is not None:
+            _cache.move_to_end(inputs)
+            _hits += 1
+            return plan
+        _misses += 1
+    plan = _build(inputs)
+    _remember(inputs, plan)
+    return plan
+
+
+def cache_info() -> dict:
+    with _cache_lock:
+        return {"size": len(_cache), "hits": _hits, "misses": _misses}
+
+
+def warm_cache(owner: str) -> bool:
+    """Load the pre-generated plan of `owner`, if there is one."""
+    saved = storage.get(NAMESPACE, owner)
+    if not saved:
+        return False
+    inputs, plan = saved
+    _remember(inputs, plan)
+    return True
+
+
+# ---------- BATCH ----------
+
+def _pregenerate_one(owner: str) -> bool:
+    stored = session_store.read(owner, ["profile", "next_step", "wallets"])
+    profile = stored.get("profile", (0, None))[1]
+    next_step = stored.get("next_step", (0, None))[1]
+    wallets = stored.get("wallets", (0, None))[1] or []
+    if not profile or not next_step or not next_step.get("primary_goal"):
+        return False
+    try:
+        # same inputs as the Next step tab, adaptive emergency target included
+        # (otherwise a wallet-based profile's saved plan never matches)
+        e_target = spending_target(
+            profile, wallets, build_monthly_spend(wallets), float(profile["expenses"]), float(profile["debt"])
+        )
+        inputs = plan_inputs(profile, next_step, get_currency(profile.get("country")), e_target)
+    except (KeyError, TypeError, ValueError):
+        # profile not filled in yet
+        return False
+    storage.put(NAMESPACE, owner, (inputs, _build(inputs)))
+    return True
+
+
+def pregenerate_plans(owners: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> int:
+    """
+    Build and save the plan of every stored user (or of `owners`) in a
+    process pool. Returns how many plans were saved.
+    """
+    owners = list(session_store.owners() if owners is None else owners)
+    if not owners:
+        return 0
+    chunksize = max(1, len(owners) // ((workers or 4) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_pregenerate_one, owners, chunksize=chunksize))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-generate next-step plans for stored users")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    saved = pregenerate_plans(workers=args.workers)
+    print(f"Saved {saved} plan(s) to {storage.DATA_DIR}/{NAMESPACE}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
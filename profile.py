@@ -1,75 +1,211 @@
 # profile.py
+#
+# Profile / KYC page and the profile model behind it.
+#
+# The schema (fields, types, limits, option lists) is built once at import.
+# The form reads its defaults from a ProfileModel and, on save, produces a
+# field-level diff against the stored profile: only changed fields are
+# applied and persisted, and metrics derived from the profile are only
+# recomputed when a financial field changed.
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
 import streamlit as st
 
+from logic import (
+    calculate_cashflow,
+    calculate_net_worth,
+    calculate_savings_rate,
+    emergency_fund_target,
+    savings_rate_target,
+)
+from metrics import timed
+
+
+# ---------- SCHEMA ----------
+
+class Field(NamedTuple):
+    name: str
+    kind: type
+    default: Any
+    options: Tuple[str, ...] = ()
+    low: Optional[float] = None
+    high: Optional[float] = None
+    financial: bool = False  # feeds cashflow / targets / plans
+
+
+COUNTRY_LABELS = {"IN": "🇮🇳 India", "CA": "🇨🇦 Canada"}
+COUNTRY_BY_LABEL = {label: code for code, label in COUNTRY_LABELS.items()}
+
+JOB_OPTIONS = (
+    "Full-time employment",
+    "Part-time / contract",
+    "Business / self-employed",
+    "Student",
+    "Between jobs",
+    "Other",
+)
+
+FOCUS_OPTIONS = (
+    "Build or pad my emergency fund",
+    "Clean up high-interest debt",
+    "Get started with long-term investing",
+    "Stay on top of monthly cashflow",
+    "Save for a specific purchase",
+)
+
+FEELING_OPTIONS = (
+    "Mostly stressed",
+    "Mostly okay",
+    "Mostly confident",
+    "I avoid thinking about it",
+)
+
+EMERGENCY_BASIS_LABELS = {
+    "expenses": "The monthly spending I entered above",
+    "wallets": "My real spending in Wealthflow",
+}
+
+FIELDS = (
+    Field("country", str, "IN", options=tuple(COUNTRY_LABELS), financial=True),
+    Field("age", int, 25, low=18, high=65),
+    Field("income", float, 0.0, low=0.0, financial=True),
+    Field("expenses", float, 0.0, low=0.0, financial=True),
+    Field("savings", float, 0.0, low=0.0, financial=True),
+    Field("debt", float, 0.0, low=0.0, financial=True),
+    Field("high_interest_debt", bool, False, financial=True),
+    Field("employment_status", str, JOB_OPTIONS[0], options=JOB_OPTIONS),
+    Field("household_size", int, 1, low=1, high=10),
+    Field("dependents", int, 0, low=0, high=10),
+    Field("primary_focus", str, FOCUS_OPTIONS[0], options=FOCUS_OPTIONS),
+    Field("risk_comfort", int, 3, low=1, high=5),
+    Field("money_feeling", str, FEELING_OPTIONS[0], options=FEELING_OPTIONS),
+    Field("emergency_basis", str, "expenses", options=tuple(EMERGENCY_BASIS_LABELS), financial=True),
+    Field("emergency_percentile", int, 90, low=50, high=99, financial=True),
+)
+
+FIELD_NAMES = tuple(f.name for f in FIELDS)
+FINANCIAL_FIELDS = tuple(f.name for f in FIELDS if f.financial)
+_OPTION_INDEX = {f.name: {opt: i for i, opt in enumerate(f.options)} for f in FIELDS if f.options}
+
+METRICS_KEY = "_profile_metrics"
+
+
+def _validate(field: Field, value: Any) -> Any:
+    """Coerce `value` to the field's type. Raises ValueError if it does not fit."""
+    try:
+        value = field.kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field.name}: expected {field.kind.__name__}, got {value!r}")
+    if field.options and value not in _OPTION_INDEX[field.name]:
+        raise ValueError(f"{field.name}: {value!r} is not one of the options")
+    if field.low is not None and value < field.low:
+        raise ValueError(f"{field.name}: must be at least {field.low}")
+    if field.high is not None and value > field.high:
+        raise ValueError(f"{field.name}: must be at most {field.high}")
+    return value
+
+
+class ProfileModel:
+    """The user-editable profile fields, typed and validated."""
+
+    __slots__ = FIELD_NAMES
+
+    def __init__(self, **values) -> None:
+        for field in FIELDS:
+            setattr(self, field.name, _validate(field, values.get(field.name, field.default)))
+
+    @classmethod
+    def from_profile(cls, profile: dict) -> "ProfileModel":
+        """Model for a stored profile; missing or invalid values fall back to defaults."""
+        model = cls.__new__(cls)
+        for field in FIELDS:
+            try:
+                value = _validate(field, profile.get(field.name, field.default))
+            except ValueError:
+                value = field.default
+            setattr(model, field.name, value)
+        return model
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    def diff(self, profile: dict) -> Dict[str, Any]:
+        """Fields whose value here differs from (or is missing in) `profile`."""
+        return {
+            name: getattr(self, name)
+            for name in FIELD_NAMES
+            if name not in profile or profile[name] != getattr(self, name)
+        }
+
+    def option_index(self, name: str) -> int:
+        return _OPTION_INDEX[name][getattr(self, name)]
+
+
+# ---------- CHANGES / DERIVED METRICS ----------
+
+def apply_profile_diff(ss, diff: Dict[str, Any]) -> bool:
+    """
+    Apply a form diff to ss.profile in place. Drops the derived metrics if
+    a financial field changed (returns True in that case).
+    """
+    ss.profile.update(diff)
+    if any(name in diff for name in FINANCIAL_FIELDS):
+        ss.pop(METRICS_KEY, None)
+        return True
+    return False
+
+
+def profile_metrics(ss) -> dict:
+    """
+    Cashflow, savings rate, targets and net worth for ss.profile, computed
+    once per change of the financial fields. (The key check also catches
+    profiles replaced by the session store.)
+    """
+    profile = ss.profile
+    key = tuple(profile.get(name) for name in FINANCIAL_FIELDS)
+    cached = ss.get(METRICS_KEY)
+    if cached is not None and cached["key"] == key:
+        return cached
+
+    income = float(profile["income"])
+    expenses = float(profile["expenses"])
+    savings = float(profile["savings"])
+    debt = float(profile["debt"])
+    cashflow = calculate_cashflow(income, expenses)
+    derived = {
+        "key": key,
+        "income": income,
+        "expenses": expenses,
+        "savings": savings,
+        "debt": debt,
+        "cashflow": cashflow,
+        "savings_rate": calculate_savings_rate(income, cashflow),
+        "savings_rate_target": savings_rate_target(profile["country"], income),
+        "emergency_target": emergency_fund_target(expenses, debt),
+        "net_worth": calculate_net_worth(savings, debt),
+    }
+    ss[METRICS_KEY] = derived
+    return derived
+
 
+# ---------- PAGE ----------
+
+@timed()
 def render_profile_page(profile: dict, first_time: bool = False):
     """
     Render the profile / KYC page.
 
     Returns:
-        (updated_profile: dict, completed: bool)
+        (diff: dict, submitted: bool)
 
-    completed = True  → caller (app.py) should send user back to the main app.
+    diff      → only the fields the user changed (empty if none).
+    submitted → the user clicked save; caller (app.py) applies the diff
+                and sends them back to the main app.
     """
 
     st.markdown("### Your basic profile")
 
-    # ---- Defaults from existing profile ----
-    country_code = profile.get("country", "IN")
-    country_default = "🇮🇳 India" if country_code == "IN" else "🇨🇦 Canada"
-
-    age_default = int(profile.get("age", 25))
-    income_default = float(profile.get("income", 0.0))
-    expenses_default = float(profile.get("expenses", 0.0))
-    savings_default = float(profile.get("savings", 0.0))
-    debt_default = float(profile.get("debt", 0.0))
-    high_interest_default = bool(profile.get("high_interest_debt", False))
-
-    employment_default = profile.get("employment_status", "Full-time employment")
-    household_default = int(profile.get("household_size", 1))
-    dependents_default = int(profile.get("dependents", 0))
-
-    focus_default = profile.get(
-        "primary_focus", "Build or pad my emergency fund"
-    )
-    risk_default = int(profile.get("risk_comfort", 3))
-    feeling_default = profile.get("money_feeling", "Mostly stressed")
-
-    job_options = [
-        "Full-time employment",
-        "Part-time / contract",
-        "Business / self-employed",
-        "Student",
-        "Between jobs",
-        "Other",
-    ]
-    if employment_default in job_options:
-        job_index = job_options.index(employment_default)
-    else:
-        job_index = 0
-
-    focus_options = [
-        "Build or pad my emergency fund",
-        "Clean up high-interest debt",
-        "Get started with long-term investing",
-        "Stay on top of monthly cashflow",
-        "Save for a specific purchase",
-    ]
-    if focus_default in focus_options:
-        focus_index = focus_options.index(focus_default)
-    else:
-        focus_index = 0
-
-    feeling_options = [
-        "Mostly stressed",
-        "Mostly okay",
-        "Mostly confident",
-        "I avoid thinking about it",
-    ]
-    if feeling_default in feeling_options:
-        feeling_index = feeling_options.index(feeling_default)
-    else:
-        feeling_index = 0
+    current = ProfileModel.from_profile(profile)
 
     col1, col2 = st.columns(2)
 
@@ -78,35 +214,35 @@ def render_profile_page(profile: dict, first_time: bool = False):
         with col1:
             country_display = st.selectbox(
                 "Where do you manage your money?",
-                ["🇮🇳 India", "🇨🇦 Canada"],
-                index=0 if "India" in country_default else 1,
+                tuple(COUNTRY_BY_LABEL),
+                index=current.option_index("country"),
             )
 
             age = st.slider(
                 "Age",
                 min_value=18,
                 max_value=65,
-                value=age_default,
+                value=current.age,
             )
 
             employment_status = st.selectbox(
                 "Work situation",
-                job_options,
-                index=job_index,
+                JOB_OPTIONS,
+                index=current.option_index("employment_status"),
             )
 
             household_size = st.number_input(
                 "How many people in your household (including you)?",
                 min_value=1,
                 max_value=10,
-                value=household_default,
+                value=current.household_size,
             )
 
             dependents = st.number_input(
                 "How many people fully/mostly rely on your income?",
                 min_value=0,
                 max_value=10,
-                value=dependents_default,
+                value=current.dependents,
             )
 
         with col2:
@@ -114,55 +250,74 @@ def render_profile_page(profile: dict, first_time: bool = False):
                 "Average monthly income (after tax)",
                 min_value=0.0,
                 step=1000.0,
-                value=income_default,
+                value=current.income,
             )
 
             monthly_essentials = st.number_input(
                 "Average monthly essential spending (rent, food, basics)",
                 min_value=0.0,
                 step=500.0,
-                value=expenses_default,
+                value=current.expenses,
             )
 
             savings = st.number_input(
                 "Cash savings right now",
                 min_value=0.0,
                 step=1000.0,
-                value=savings_default,
+                value=current.savings,
             )
 
             debt = st.number_input(
                 "Total debt (loans, cards, etc.)",
                 min_value=0.0,
                 step=1000.0,
-                value=debt_default,
+                value=current.debt,
             )
 
             high_interest = st.checkbox(
                 "I have high-interest debt (credit cards, payday loans, etc.)",
-                value=high_interest_default,
+                value=current.high_interest_debt,
             )
 
         st.markdown("---")
 
         primary_focus = st.selectbox(
             "Right now, what feels most important?",
-            focus_options,
-            index=focus_index,
+            FOCUS_OPTIONS,
+            index=current.option_index("primary_focus"),
         )
 
         risk_comfort = st.slider(
             "How comfortable are you with your money moving up and down?",
             min_value=1,
             max_value=5,
-            value=risk_default,
+            value=current.risk_comfort,
             help="1 = I really dislike seeing any drops. 5 = I'm okay with ups and downs for long-term growth.",
         )
 
         money_feeling = st.selectbox(
             "When you think about money, you mostly feel…",
-            feeling_options,
-            index=feeling_index,
+            FEELING_OPTIONS,
+            index=current.option_index("money_feeling"),
+        )
+
+        st.markdown("---")
+
+        emergency_basis = st.selectbox(
+            "Size my emergency fund from…",
+            tuple(EMERGENCY_BASIS_LABELS),
+            index=current.option_index("emergency_basis"),
+            format_func=EMERGENCY_BASIS_LABELS.get,
+            help="Real spending needs a few months of transactions; until then the number above is used.",
+        )
+
+        emergency_percentile = st.slider(
+            "Plan for a month as expensive as … of my months",
+            min_value=50,
+            max_value=99,
+            value=current.emergency_percentile,
+            format="%d%%",
+            help="Only used with real spending. 90% means the buffer covers all but the 1 in 10 most expensive months.",
         )
 
         button_label = (
@@ -172,29 +327,28 @@ def render_profile_page(profile: dict, first_time: bool = False):
 
     # If nothing was clicked, stay on this page
     if not save_clicked:
-        return profile, False
-
-    # ---- Build updated profile ----
-    new_country_code = "IN" if "India" in country_display else "CA"
-
-    updated_profile = {
-        **profile,
-        "country": new_country_code,
-        "age": int(age),
-        "income": float(monthly_income),
-        "expenses": float(monthly_essentials),
-        "savings": float(savings),
-        "debt": float(debt),
-        "high_interest_debt": bool(high_interest),
-        "employment_status": employment_status,
-        "household_size": int(household_size),
-        "dependents": int(dependents),
-        "primary_focus": primary_focus,
-        "risk_comfort": int(risk_comfort),
-        "money_feeling": money_feeling,
-    }
+        return {}, False
+
+    try:
+        updated = ProfileModel(
+            country=COUNTRY_BY_LABEL[country_display],
+            age=age,
+            income=monthly_income,
+            expenses=monthly_essentials,
+            savings=savings,
+            debt=debt,
+            high_interest_debt=high_interest,
+            employment_status=employment_status,
+            household_size=household_size,
+            dependents=dependents,
+            primary_focus=primary_focus,
+            risk_comfort=risk_comfort,
+            money_feeling=money_feeling,
+            emergency_basis=emergency_basis,
+            emergency_percentile=emergency_percentile,
+        )
+    except ValueError as e:
+        st.error(f"Please check your answers ({e}).")
+        return {}, False
 
-    # IMPORTANT:
-    # Any time the user clicks "Save profile",
-    # treat it as completed so app.py sends them back to the main dashboard.
-    return updated_profile, True
+    return updated.diff(profile), True
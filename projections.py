@@ -0,0 +1,115 @@
+# projections.py
+#
+# Monte Carlo projections for tracked goals.
+#
+# Each goal grows by its monthly contribution plus a random monthly return
+# that depends on the user's risk answer (1-5) on the Next step tab. We
+# simulate many paths per goal (numpy, vectorised over paths) and report
+# when the goal is reached on a bad / typical / good path, and the chance
+# of reaching it within the goal's timeframe.
+#
+# This is CPU-heavy, so the tab runs it as a background job (jobs.py):
+# inputs are plain tuples (hashable job key) and `progress` is the job's
+# progress callback.
+
+from datetime import date
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+HORIZON_MONTHS = 360
+PATHS = 4000
+
+# risk answer -> (expected yearly return, yearly volatility)
+RETURNS = {
+    1: (0.02, 0.01),
+    2: (0.035, 0.04),
+    3: (0.05, 0.08),
+    4: (0.065, 0.13),
+    5: (0.075, 0.18),
+}
+
+TIMEFRAME_MONTHS = {
+    "Next 3 months": 3,
+    "Next 6–12 months": 12,
+    "Next 2–3 years": 36,
+}
+
+
+def projection_inputs(goals) -> Tuple[tuple, ...]:
+    """(id, name, target, saved, monthly, deadline months) per goal with a target."""
+    rows = []
+    for goal in goals:
+        target = float(goal.get("target", 0.0) or 0.0)
+        if target <= 0:
+            continue
+        rows.append(
+            (
+                goal["id"],
+                goal.get("name", ""),
+                target,
+                float(goal.get("saved", 0.0) or 0.0),
+                float(goal.get("monthly_target", 0.0) or 0.0),
+                TIMEFRAME_MONTHS.get(goal.get("timeframe", "")),
+            )
+        )
+    return tuple(rows)
+
+
+def _finish(months: Optional[int], today: date) -> Optional[str]:
+    if months is None:
+        return None
+    index = today.year * 12 + today.month - 1 + months
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def simulate_goals(
+    inputs: Tuple[tuple, ...],
+    risk: int,
+    paths: int = PATHS,
+    seed: int = 7,
+    progress: Optional[Callable[[float], None]] = None,
+) -> list:
+    """
+    One row per goal: months to target at the 10th / 50th / 90th
+    percentile path (None = not within HORIZON_MONTHS), the matching
+    finish months, and the chance of finishing within the timeframe.
+    """
+    mu, sigma = RETURNS.get(int(risk), RETURNS[3])
+    monthly_mu, monthly_sigma = mu / 12, sigma / np.sqrt(12)
+    rng = np.random.default_rng(seed)
+    today = date.today()
+
+    rows = []
+    for i, (goal_id, name, target, saved, monthly, deadline) in enumerate(inputs):
+        balance = np.full(paths, saved)
+        reached = np.full(paths, HORIZON_MONTHS + 1)
+        if saved >= target:
+            reached[:] = 0
+        else:
+            open_paths = np.ones(paths, dtype=bool)
+            for month in range(1, HORIZON_MONTHS + 1):
+                returns = rng.normal(monthly_mu, monthly_sigma, paths)
+                balance = balance * (1 + returns) + monthly
+                hit = open_paths & (balance >= target)
+                reached[hit] = month
+                open_paths &= ~hit
+                if not open_paths.any():
+                    break
+                if month % 60 == 0 and progress is not None:
+                    progress((i + month / HORIZON_MONTHS) / len(inputs))
+
+        p10, p50, p90 = (int(v) for v in np.percentile(reached, [10, 50, 90], method="higher"))
+        months = [m if m <= HORIZON_MONTHS else None for m in (p10, p50, p90)]
+        rows.append(
+            {
+                "id": goal_id,
+                "name": name,
+                "months": months,
+                "finish": [_finish(m, today) for m in months],
+                "chance": float((reached <= deadline).mean()) if deadline else None,
+            }
+        )
+        if progress is not None:
+            progress((i + 1) / len(inputs))
+    return rows
@@ -0,0 +1,152 @@
+# recurring.py
+#
+# Recurring transaction rules (salary, rent, subscriptions...).
+#
+# A rule lives on the wallet (wallet["recurring"]) and is never stored as
+# rows:
+#   {"id": "r1", "schedule": "monthly", "start": date, "end": date | None,
+#    "amount": -1200.0, "category": "Rent", "note": "Flat"}
+#
+# - `count_occurrences()` / `recurring_totals()` work out how many times a
+#   rule fires in a period with index arithmetic (no loop over dates), so
+#   period sums cost O(rules) however long the period is.
+# - `expand_rules()` is a generator that yields transaction-like dicts for
+#   one period only, for the transactions table.
+#
+# Monthly rules fire on the start date's day (clamped to short months, so
+# a rule starting Jan 31 fires Feb 28/29); yearly rules likewise.
+
+import calendar
+from datetime import date, timedelta
+from typing import Iterable, Iterator, Optional, Tuple
+
+SCHEDULES = {
+    "weekly": "Every week",
+    "biweekly": "Every 2 weeks",
+    "monthly": "Every month",
+    "yearly": "Every year",
+}
+_STEP_DAYS = {"weekly": 7, "biweekly": 14}
+
+
+def _month_day(year: int, month: int, day: int) -> date:
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def nth_occurrence(rule: dict, i: int) -> date:
+    """Date of the rule's i-th occurrence (0 = start)."""
+    start = rule["start"]
+    schedule = rule["schedule"]
+    if schedule in _STEP_DAYS:
+        return start + timedelta(days=i * _STEP_DAYS[schedule])
+    if schedule == "monthly":
+        index = start.year * 12 + start.month - 1 + i
+        return _month_day(index // 12, index % 12 + 1, start.day)
+    if schedule == "yearly":
+        return _month_day(start.year + i, start.month, start.day)
+    raise ValueError(f"unknown schedule {schedule!r}")
+
+
+def _index_near(rule: dict, day: date) -> int:
+    """Index of the occurrence in the same step (week / month / year) as `day`."""
+    start = rule["start"]
+    schedule = rule["schedule"]
+    if schedule in _STEP_DAYS:
+        return (day - start).days // _STEP_DAYS[schedule]
+    if schedule == "monthly":
+        return (day.year - start.year) * 12 + (day.month - start.month)
+    return day.year - start.year
+
+
+def _span(rule: dict, start_date: date, end_date: date) -> Tuple[int, int]:
+    """(first, last) occurrence index inside the period; last < first if none."""
+    lo = max(rule["start"], start_date)
+    hi = min(rule.get("end") or end_date, end_date)
+    if lo > hi:
+        return 0, -1
+
+    first = _index_near(rule, lo)
+    if nth_occurrence(rule, first) < lo:
+        first += 1
+    last = _index_near(rule, hi)
+    if nth_occurrence(rule, last) > hi:
+        last -= 1
+    return max(first, 0), last
+
+
+def count_occurrences(rule: dict, start_date: date, end_date: date) -> int:
+    first, last = _span(rule, start_date, end_date)
+    return max(0, last - first + 1)
+
+
+def occurrences(rule: dict, start_date: date, end_date: date) -> Iterator[date]:
+    first, last = _span(rule, start_date, end_date)
+    for i in range(first, last + 1):
+        yield nth_occurrence(rule, i)
+
+
+def expand_rules(rules: Iterable[dict], start_date: date, end_date: date) -> Iterator[dict]:
+    """
+    Transaction-like dicts for every occurrence in the period (lazy).
+    These are display rows, never stored: the note carries a ↻ marker.
+    """
+    for rule in rules:
+        note = f"↻ {rule['note']}".rstrip()
+        for day in occurrences(rule, start_date, end_date):
+            yield {
+                "date": day,
+                "category": rule["category"],
+                "note": note,
+                "amount": rule["amount"],
+                "recurring": rule["id"],
+            }
+
+
+def recurring_totals(rules: Iterable[dict], start_date: date, end_date: date) -> Tuple[float, float, float, int]:
+    """(balance, income, expenses, count) of all occurrences, closed form."""
+    balance = income = expenses = 0.0
+    count = 0
+    for rule in rules:
+        n = count_occurrences(rule, start_date, end_date)
+        if not n:
+            continue
+        total = rule["amount"] * n
+        balance += total
+        if total > 0:
+            income += total
+        else:
+            expenses -= total
+        count += n
+    return balance, income, expenses, count
+
+
+def add_rule(
+    wallet: dict,
+    schedule: str,
+    start: date,
+    amount: float,
+    category: str,
+    note: str = "",
+    end: Optional[date] = None,
+) -> dict:
+    if schedule not in SCHEDULES:
+        raise ValueError(f"unknown schedule {schedule!r}")
+    if end is not None and end < start:
+        raise ValueError("end date is before the start date")
+    rules = wallet.setdefault("recurring", [])
+    next_id = max((int(r["id"][1:]) for r in rules), default=0) + 1
+    rule = {
+        "id": f"r{next_id}",
+        "schedule": schedule,
+        "start": start,
+        "end": end,
+        "amount": float(amount),
+        "category": category or "General",
+        "note": note or "",
+    }
+    rules.append(rule)
+    return rule
+
+
+def remove_rule(wallet: dict, rule_id: str) -> None:
+    wallet["recurring"] = [r for r in wallet.get("recurring", []) if r["id"] != rule_id]
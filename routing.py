@@ -0,0 +1,114 @@
+# routing.py
+#
+# URL-addressable app state.
+#
+# The URL carries where the user is:
+#   ?screen=main&tab=wealthflow&wallet=main&view=wallet&from=2026-10-01&to=2026-10-19
+#
+# - `route_from_url()` runs first thing in every script run. It only parses
+#   when the managed params differ from what we last read and from the
+#   routes we recently wrote, so a normal rerun costs a few dict lookups.
+#   (st.rerun() replays the query string from the moment it was called,
+#   before publish_route() ran – that replay is not navigation.)
+#   On a fresh load (reload, shared link) it writes the values straight
+#   into session_state, before init_state() – no defaults computed and then
+#   thrown away, no extra rerun.
+# - `publish_route()` runs at the end of every run (also when st.rerun()
+#   cut it short) and writes back only the params that changed.
+#
+# Other params (admin, ...) are left alone. The session token is never in
+# the URL (see session_store.py), so a copied URL is safe to share.
+
+from datetime import date
+from typing import Dict, Optional
+
+import streamlit as st
+
+SCREENS = {"landing", "signup", "login", "country_profile", "main"}
+TABS = {"home", "wealthflow", "next"}
+VIEWS = {"overview", "wallet"}
+MANAGED = ("screen", "tab", "wallet", "view", "from", "to")
+
+SEEN_KEY = "_route"
+RECENT_ROUTES = 3
+
+
+def _read_url() -> Dict[str, str]:
+    params = st.query_params
+    return {k: params[k] for k in MANAGED if k in params}
+
+
+def _parse_date(raw: Optional[str]) -> Optional[date]:
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        return None
+
+
+def route_from_url(ss) -> None:
+    """Apply the URL to session_state, but only if the URL changed."""
+    url = _read_url()
+    seen = ss.get(SEEN_KEY)
+    if seen is not None and (url == seen["read"] or url in seen["published"]):
+        return
+    ss[SEEN_KEY] = {"read": url, "published": seen["published"] if seen else []}
+
+    screen = url.get("screen")
+    if screen in SCREENS:
+        ss.screen = screen
+
+    tab = url.get("tab")
+    if tab in TABS:
+        ss.main_tab = tab
+
+    view = url.get("view")
+    if view in VIEWS:
+        ss.wealthflow_view = view
+
+    wallet_id = url.get("wallet")
+    if wallet_id:
+        # an unknown id falls back to the first wallet when rendering
+        ss.selected_wallet_id = wallet_id
+
+    start, end = _parse_date(url.get("from")), _parse_date(url.get("to"))
+    if start and end and start <= end:
+        ss.wealthflow_period = (start, end)
+
+
+def encode_route(ss) -> Dict[str, str]:
+    """Managed URL params for the current state."""
+    screen = ss.get("screen", "landing")
+    route = {"screen": screen}
+    if screen != "main":
+        return route
+
+    tab = ss.get("main_tab", "home")
+    route["tab"] = tab
+    if tab == "wealthflow":
+        route["view"] = ss.get("wealthflow_view", "overview")
+        route["wallet"] = ss.get("selected_wallet_id", "main")
+        period = ss.get("wealthflow_period")
+        if period:
+            route["from"] = period[0].isoformat()
+            route["to"] = period[1].isoformat()
+    return route
+
+
+def publish_route(ss) -> None:
+    """Write changed params to the URL."""
+    route = encode_route(ss)
+    seen = ss.setdefault(SEEN_KEY, {"read": None, "published": []})
+    if not seen["published"] or seen["published"][-1] != route:
+        seen["published"] = (seen["published"] + [route])[-RECENT_ROUTES:]
+    if route == _read_url():
+        return
+
+    params = st.query_params
+    for key in MANAGED:
+        if key in route:
+            if params.get(key) != route[key]:
+                params[key] = route[key]
+        elif key in params:
+            del params[key]
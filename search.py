@@ -0,0 +1,234 @@
+# search.py
+#
+# Transaction search for the wallet view.
+#
+# Each wallet gets a TransactionIndex in session_state
+# (ss.search_indexes[wallet_id]); it is derived data and never stored.
+# A transaction is identified by its position in wallet["transactions"].
+#
+# - Inverted index: word -> positions, over note + category. Positions
+#   are appended in order, so every posting list stays sorted. Words are
+#   also kept in a sorted vocabulary, so the word being typed matches as
+#   a prefix ("gro" finds "groceries", up to PREFIX_WORDS words).
+# - Category postings: category -> positions (same idea, exact match).
+# - Columns: date (ordinal) and amount per position, in compact arrays
+#   numpy reads without copying.
+# - Sorted amount index: positions ordered by amount. New transactions
+#   wait in a small pending list and are merged in (one np.insert) the
+#   next time an amount filter runs.
+#
+# `add()` is O(words) per transaction (plus a rare vocabulary insert).
+# The index is rebuilt only when it no longer matches the wallet's list
+# (history spilled / restored, wallets replaced by the session store).
+#
+# A query starts from the most selective filter it has (text postings,
+# category postings or the amount range) and checks the others on that
+# candidate set with numpy; results come back newest first, one page at
+# a time (argpartition, so a page never sorts the whole result).
+
+import re
+from array import array
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+PAGE_SIZE = 50
+# A prefix matching more words than this ("1" in a wallet of reference
+# numbers) is taken as a whole word until more of it is typed.
+PREFIX_WORDS = 512
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class TransactionIndex:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+        self.count = 0
+        self.postings: Dict[str, array] = {}
+        self.vocab: List[str] = []
+        self.category_ids: Dict[str, int] = {}
+        self.category_names: List[str] = []
+        self.category_postings: List[array] = []
+        self.dates = array("i")
+        self.amounts = array("d")
+        self._amount_sorted = np.empty(0)
+        self._amount_order = np.empty(0, dtype=np.int64)
+        self._pending: List[int] = []
+        for txn in rows:
+            self._add(txn)
+        self._merge_pending()
+
+    # ----- updates -----
+
+    def matches(self, rows: list) -> bool:
+        return rows is self.rows and self.count == len(rows)
+
+    def add(self, txn: dict) -> None:
+        """Index a transaction just appended to the wallet."""
+        self._add(txn)
+
+    def _add(self, txn: dict) -> None:
+        pos = self.count
+        self.count += 1
+
+        category = (txn.get("category") or "General").strip()
+        key = category.lower()
+        cat_id = self.category_ids.get(key)
+        if cat_id is None:
+            cat_id = self.category_ids[key] = len(self.category_names)
+            self.category_names.append(category)
+            self.category_postings.append(array("I"))
+        self.category_postings[cat_id].append(pos)
+
+        self.dates.append(txn["date"].toordinal())
+        self.amounts.append(float(txn["amount"]))
+        self._pending.append(pos)
+
+        for word in set(tokenize(f"{txn.get('note', '')} {category}")):
+            postings = self.postings.get(word)
+            if postings is None:
+                postings = self.postings[word] = array("I")
+                insort(self.vocab, word)
+            postings.append(pos)
+
+    def _merge_pending(self) -> None:
+        if not self._pending:
+            return
+        pending = np.array(self._pending, dtype=np.int64)
+        values = np.frombuffer(self.amounts, dtype=np.float64)[pending]
+        if len(self._amount_order) == 0:
+            order = np.argsort(values, kind="stable")
+            self._amount_sorted, self._amount_order = values[order], pending[order]
+        else:
+            at = np.searchsorted(self._amount_sorted, values, side="right")
+            self._amount_sorted = np.insert(self._amount_sorted, at, values)
+            self._amount_order = np.insert(self._amount_order, at, pending)
+        self._pending = []
+
+    # ----- lookups -----
+
+    def categories(self) -> List[str]:
+        return sorted(self.category_names, key=str.lower)
+
+    def _word_positions(self, word: str, prefix: bool) -> np.ndarray:
+        if not prefix:
+            postings = self.postings.get(word)
+            return np.frombuffer(postings, dtype=np.uint32) if postings else np.empty(0, dtype=np.uint32)
+        lo = bisect_left(self.vocab, word)
+        hi = bisect_left(self.vocab, word + "\U0010ffff")
+        if hi - lo > PREFIX_WORDS:
+            return self._word_positions(word, prefix=False)
+        lists = [np.frombuffer(self.postings[w], dtype=np.uint32) for w in self.vocab[lo:hi]]
+        if not lists:
+            return np.empty(0, dtype=np.uint32)
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+    def search(
+        self,
+        text: str = "",
+        category: Optional[str] = None,
+        amount_range: Tuple[Optional[float], Optional[float]] = (None, None),
+        period: Optional[Tuple[date, date]] = None,
+        page: int = 0,
+        page_size: int = PAGE_SIZE,
+    ) -> Tuple[int, List[dict]]:
+        """(number of matches, one page of transactions, newest first)."""
+        n = self.count
+        dates = np.frombuffer(self.dates, dtype=np.int32)[:n]
+        amounts = np.frombuffer(self.amounts, dtype=np.float64)[:n]
+        low, high = amount_range
+
+        # ---- candidate sets from the indexes ----
+        candidates = []
+        words = tokenize(text)
+        for i, word in enumerate(words):
+            # the last word may still be being typed
+            candidates.append(self._word_positions(word, prefix=(i == len(words) - 1)))
+
+        if category:
+            cat_id = self.category_ids.get(category.strip().lower())
+            if cat_id is None:
+                return 0, []
+            candidates.append(np.frombuffer(self.category_postings[cat_id], dtype=np.uint32))
+
+        if low is not None or high is not None:
+            self._merge_pending()
+            lo = 0 if low is None else np.searchsorted(self._amount_sorted, low, side="left")
+            hi = len(self._amount_sorted) if high is None else np.searchsorted(self._amount_sorted, high, side="right")
+            by_amount = self._amount_order[lo:hi]
+            # only worth sorting when it is the smallest set
+            if not candidates or len(by_amount) < min(len(c) for c in candidates):
+                candidates.append(np.sort(by_amount))
+
+        # ---- intersect, smallest first ----
+        if candidates:
+            candidates.sort(key=len)
+            positions = candidates[0].astype(np.int64)
+            for other in candidates[1:]:
+                if len(positions) == 0:
+                    break
+                # both sorted: binary-search the small set in the big one
+                at = np.searchsorted(other, positions)
+                found = at < len(other)
+                found[found] = other[at[found]] == positions[found]
+                positions = positions[found]
+        else:
+            positions = None
+
+        # ---- remaining filters on the columns ----
+        mask = None
+        if period is not None:
+            start, end = period[0].toordinal(), period[1].toordinal()
+            d = dates if positions is None else dates[positions]
+            mask = (d >= start) & (d <= end)
+        if low is not None or high is not None:
+            a = amounts if positions is None else amounts[positions]
+            amount_mask = np.ones(len(a), dtype=bool)
+            if low is not None:
+                amount_mask &= a >= low
+            if high is not None:
+                amount_mask &= a <= high
+            mask = amount_mask if mask is None else mask & amount_mask
+        if positions is None:
+            positions = np.flatnonzero(mask) if mask is not None else np.arange(n)
+        elif mask is not None:
+            positions = positions[mask]
+
+        total = len(positions)
+        start = page * page_size
+        if start >= total:
+            return total, []
+
+        # ---- newest first, one page ----
+        keys = -(dates[positions].astype(np.int64) << 32 | positions)
+        stop = min(start + page_size, total)
+        if stop < total:
+            top = np.argpartition(keys, stop - 1)[:stop]
+        else:
+            top = np.arange(total)
+        ordered = top[np.argsort(keys[top], kind="stable")][start:stop]
+        return total, [self.rows[int(p)] for p in positions[ordered]]
+
+
+def wallet_index(ss, wallet: dict) -> TransactionIndex:
+    """The wallet's index, rebuilt only if it no longer matches the wallet."""
+    indexes = ss.setdefault("search_indexes", {})
+    index = indexes.get(wallet["id"])
+    if index is None or not index.matches(wallet["transactions"]):
+        index = indexes[wallet["id"]] = TransactionIndex(wallet["transactions"])
+    return index
+
+
+def index_transaction(ss, wallet: dict, txn: dict) -> None:
+    """Call after appending `txn` to the wallet."""
+    index = ss.get("search_indexes", {}).get(wallet["id"])
+    if index is not None and index.rows is wallet["transactions"] and index.count == len(wallet["transactions"]) - 1:
+        index.add(txn)
+    # otherwise wallet_index() rebuilds it on next use
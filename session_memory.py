@@ -0,0 +1,237 @@
+# session_memory.py
+#
+# Memory accounting for st.session_state.
+#
+# - `deep_sizeof()` walks a value (dicts, lists, transactions...) and adds
+#   up sys.getsizeof for everything reachable, counting shared objects once.
+# - `track_session()` measures the current session per top-level key
+#   (throttled), records it in a process-wide registry of live sessions and
+#   enforces the per-session budget.
+# - Over budget, cold wallet history (transactions before the selected
+#   Wealthflow period) is spilled to the storage backend and loaded back
+#   by `restore_wallet_history()` when a period needs it again. Both mark
+#   the wallets dirty; a replaced archive blob is only deleted once the
+#   wallets that no longer point at it are in the session store, so the
+#   stored wallets never refer to a missing blob.
+#
+# Settings (env):
+#   TESORIN_SESSION_BUDGET_MB   per-session budget, 0 = unlimited (default 64)
+#   TESORIN_MEMORY_INTERVAL     seconds between measurements (default 30)
+#   TESORIN_SESSION_TTL         seconds before a silent session is dropped
+#                               from the live totals (default 3600)
+
+import os
+import sys
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+import storage
+from session_store import after_save, mark_dirty
+from supabase_client import verified_user_id
+
+SESSION_BUDGET_BYTES = int(float(os.getenv("TESORIN_SESSION_BUDGET_MB", "64")) * 1024 * 1024)
+MEASURE_INTERVAL_SECONDS = float(os.getenv("TESORIN_MEMORY_INTERVAL", "30"))
+SESSION_TTL_SECONDS = float(os.getenv("TESORIN_SESSION_TTL", "3600"))
+
+HISTORY_NAMESPACE = "wallet_history"
+
+_lock = threading.Lock()
+_live: Dict[str, dict] = {}
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate deep size in bytes. Shared objects are counted once."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif isinstance(o, (str, bytes, int, float, bool, date)) or o is None:
+            continue
+        else:
+            if hasattr(o, "__dict__"):
+                stack.append(vars(o))
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+
+def current_session_id() -> str:
+    """Streamlit session id, or "local" outside a Streamlit run."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+    except Exception:
+        ctx = None
+    return ctx.session_id if ctx else "local"
+
+
+def data_owner(ss) -> str:
+    """Whose stored blobs these are: the verified user, else this session."""
+    return verified_user_id(ss.get("user")) or current_session_id()
+
+
+def measure_session(ss) -> Dict[str, int]:
+    """Deep size per top-level session_state key, largest first."""
+    sizes = {str(key): deep_sizeof(ss[key]) for key in list(ss.keys())}
+    return dict(sorted(sizes.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def track_session(ss, force: bool = False) -> Optional[Dict[str, int]]:
+    """
+    Measure this session (at most every MEASURE_INTERVAL_SECONDS), record it
+    in the live registry and enforce the budget. Returns the per-key sizes
+    when a measurement was taken.
+    """
+    now = time.time()
+    session_id = current_session_id()
+    with _lock:
+        entry = _live.get(session_id)
+        if entry is not None:
+            entry["seen"] = now
+        if not force and entry is not None and now - entry["measured"] < MEASURE_INTERVAL_SECONDS:
+            return None
+
+    sizes = measure_session(ss)
+    total = sum(sizes.values())
+
+    if SESSION_BUDGET_BYTES and total > SESSION_BUDGET_BYTES:
+        if spill_cold_history(ss):
+            sizes = measure_session(ss)
+            total = sum(sizes.values())
+
+    user = ss.get("user") or {}
+    with _lock:
+        _live[session_id] = {
+            "user": user.get("email", ""),
+            "total": total,
+            "keys": sizes,
+            "measured": now,
+            "seen": now,
+        }
+        for sid in [s for s, e in _live.items() if now - e["seen"] > SESSION_TTL_SECONDS]:
+            del _live[sid]
+    return sizes
+
+
+def live_totals() -> dict:
+    """Totals across all sessions this process has seen recently."""
+    with _lock:
+        entries = list(_live.values())
+    per_key: Dict[str, int] = {}
+    for e in entries:
+        for key, size in e["keys"].items():
+            per_key[key] = per_key.get(key, 0) + size
+    return {
+        "sessions": len(entries),
+        "total": sum(e["total"] for e in entries),
+        "largest": max((e["total"] for e in entries), default=0),
+        "per_key": dict(sorted(per_key.items(), key=lambda kv: kv[1], reverse=True)),
+    }
+
+
+# ---------- SPILLING COLD WALLET HISTORY ----------
+
+def _archive_key(ss, wallet: dict) -> str:
+    # a new blob per spill: the old one stays readable until the wallets are saved
+    return f"{data_owner(ss)}:{wallet['id']}:{time.time_ns()}"
+
+
+def _delete_later(ss, key: str) -> None:
+    after_save(ss, "wallets", lambda: storage.delete(HISTORY_NAMESPACE, key))
+
+
+def spill_cold_history(ss) -> int:
+    """
+    Move transactions dated before the selected Wealthflow period out of
+    session_state into storage. Returns how many transactions were moved.
+    """
+    cutoff = ss.wealthflow_period[0]
+    moved = 0
+    for wallet in ss.get("wallets", []):
+        cold = [t for t in wallet["transactions"] if t["date"] < cutoff]
+        if not cold:
+            continue
+
+        old_key = wallet.get("archive_key")
+        archived = storage.get(HISTORY_NAMESPACE, old_key, default=[]) if old_key else []
+        archived.extend(cold)
+        key = _archive_key(ss, wallet)
+        storage.put(HISTORY_NAMESPACE, key, archived)
+        if old_key:
+            _delete_later(ss, old_key)
+
+        wallet["transactions"] = [t for t in wallet["transactions"] if t["date"] >= cutoff]
+        wallet["archive_key"] = key
+        wallet["archived_count"] = len(archived)
+        previous = wallet.get("archived_before")
+        wallet["archived_before"] = max(previous, cutoff) if previous else cutoff
+        moved += len(cold)
+    if moved:
+        mark_dirty(ss, "wallets")
+    return moved
+
+
+def restore_wallet_history(ss, wallet: dict, start_date: date) -> bool:
+    """Load spilled history back if the requested period reaches into it."""
+    archived_before = wallet.get("archived_before")
+    if not archived_before or start_date >= archived_before:
+        return False
+
+    key = wallet["archive_key"]
+    archived = storage.get(HISTORY_NAMESPACE, key, default=[])
+    wallet["transactions"] = archived + wallet["transactions"]
+    for k in ("archive_key", "archived_count", "archived_before"):
+        wallet.pop(k, None)
+    mark_dirty(ss, "wallets")
+    _delete_later(ss, key)
+    return True
+
+
+# ---------- UI ----------
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):,.2f} MB"
+
+
+def render_memory_panel(ss) -> None:
+    """Per-key sizes for this session plus totals across live sessions."""
+    import streamlit as st
+
+    sizes = track_session(ss, force=True) or {}
+    total = sum(sizes.values())
+
+    st.markdown("#### Session memory")
+    budget = _mb(SESSION_BUDGET_BYTES) if SESSION_BUDGET_BYTES else "unlimited"
+    st.caption(f"This session: {_mb(total)} (budget {budget})")
+    st.table([{"Key": k, "Size": _mb(v)} for k, v in sizes.items()])
+
+    spilled = [w for w in ss.get("wallets", []) if w.get("archived_count")]
+    for w in spilled:
+        st.caption(
+            f"{w['name']}: {w['archived_count']:,} older transactions kept in storage "
+            f"(before {w['archived_before']:%b %d, %Y})."
+        )
+
+    totals = live_totals()
+    st.markdown("#### All live sessions (this process)")
+    st.caption(
+        f"{totals['sessions']} sessions · {_mb(totals['total'])} total · "
+        f"largest {_mb(totals['largest'])}"
+    )
+    if totals["per_key"]:
+        st.table([{"Key": k, "Size": _mb(v)} for k, v in totals["per_key"].items()])
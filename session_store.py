@@ -0,0 +1,383 @@
+# session_store.py
+#
+# Externalized session store.
+#
+# Everything used to live only in the in-process st.session_state, so a
+# restart logged everyone out and we could not run more than one worker.
+# This keeps each user's screen, user, profile, wallets, goal plans and
+# next-step answers in a shared SQLite file (local stand-in for a real
+# database), one row per (user, key) with a version number:
+#
+# - At the start of a run we read only the version numbers and fetch the
+#   keys another worker has changed since we last saw them.
+# - At the end of a run we write back only the keys this run touched:
+#   small keys are compared by hash, wallets / goal_plans are written when
+#   code calls `mark_dirty()` (hashing a big wallet every rerun would cost
+#   more than it saves).
+# - Writes are optimistic: UPDATE ... WHERE version = <what we read>. If
+#   another worker got there first, its value wins and is loaded here.
+#
+# Only users verified by the auth provider are stored, keyed by their user
+# id (supabase_client.verified_user_id). While sign-in is a placeholder that
+# accepts any email, nothing is stored and the app keeps data in
+# session_state only, as before.
+#
+# A random session token in a cookie (TOKEN_COOKIE) lets a reload or a
+# restarted server pick the user back up without logging in again. It is
+# never put in the URL: URLs are shared (routing.py) and the token is also
+# accepted by api.py. Streamlit cannot set cookies from Python, so a tiny
+# zero-height component sets it from the browser.
+#
+# Settings (env):
+#   TESORIN_SESSION_DB   path of the SQLite file (default <data dir>/sessions.sqlite3)
+
+import hashlib
+import os
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import storage
+from supabase_client import verified_user_id
+
+DB_PATH = os.getenv("TESORIN_SESSION_DB", os.path.join(storage.DATA_DIR, "sessions.sqlite3"))
+
+# Compared by hash at the end of every run.
+AUTO_KEYS = ("screen", "user", "profile", "next_step")
+# Saved only when marked dirty.
+TRACKED_KEYS = ("wallets", "goal_plans", "category_overrides")
+STORED_KEYS = AUTO_KEYS + TRACKED_KEYS
+# Never stored, but built from the user's data: dropped on logout.
+DERIVED_KEYS = (
+    "_profile_metrics",
+    "forecast_models",
+    "search_indexes",
+    "dedupe_indexes",
+    "spend_totals",
+    "monthly_spend",
+    "anomaly_detectors",
+    "networth_history",
+    "pending_duplicate",
+    "pending_import",
+)
+
+META_KEY = "_session_store"
+TOKEN_COOKIE = "tesorin_sid"
+TOKEN_MAX_AGE = 30 * 24 * 3600  # seconds
+LEGACY_TOKEN_PARAM = "sid"  # old links carried the token; it is dropped, never read
+
+_local = threading.local()
+
+
+# ---------- DATABASE ----------
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS session_keys (
+                owner   TEXT NOT NULL,
+                key     TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                value   BLOB NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (owner, key)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS session_tokens (
+                token   TEXT PRIMARY KEY,
+                owner   TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+            """
+        )
+        _local.conn = conn
+    return conn
+
+
+def _dumps(value: Any) -> bytes:
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+
+def _loads(blob: bytes) -> Any:
+    return pickle.loads(zlib.decompress(blob))
+
+
+def _digest(value: Any) -> str:
+    return hashlib.blake2b(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+
+
+def versions(owner: str) -> Dict[str, int]:
+    rows = _conn().execute("SELECT key, version FROM session_keys WHERE owner = ?", (owner,))
+    return dict(rows.fetchall())
+
+
+def read(owner: str, keys: List[str]) -> Dict[str, tuple]:
+    """{key: (version, value)} for the requested keys."""
+    if not keys:
+        return {}
+    marks = ",".join("?" * len(keys))
+    rows = _conn().execute(
+        f"SELECT key, version, value FROM session_keys WHERE owner = ? AND key IN ({marks})",
+        (owner, *keys),
+    )
+    return {key: (version, _loads(blob)) for key, version, blob in rows.fetchall()}
+
+
+def write(owner: str, key: str, value: Any, expected_version: int) -> Optional[int]:
+    """
+    Optimistic write. Returns the new version, or None if someone else
+    wrote this key since `expected_version`.
+    """
+    blob = _dumps(value)
+    conn = _conn()
+    if expected_version == 0:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO session_keys (owner, key, version, value, updated) VALUES (?, ?, 1, ?, ?)",
+            (owner, key, blob, time.time()),
+        )
+        return 1 if cur.rowcount == 1 else None
+    cur = conn.execute(
+        "UPDATE session_keys SET value = ?, version = version + 1, updated = ? "
+        "WHERE owner = ? AND key = ? AND version = ?",
+        (blob, time.time(), owner, key, expected_version),
+    )
+    return expected_version + 1 if cur.rowcount == 1 else None
+
+
+def owners() -> List[str]:
+    rows = _conn().execute("SELECT DISTINCT owner FROM session_keys ORDER BY owner")
+    return [r[0] for r in rows.fetchall()]
+
+
+# Tokens expire on the server after TOKEN_MAX_AGE, like the cookie, and
+# expired rows are cleared whenever a token is created or dropped.
+
+def _drop_expired_tokens(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM session_tokens WHERE created < ?", (time.time() - TOKEN_MAX_AGE,))
+
+
+def new_token(owner: str) -> str:
+    token = secrets.token_urlsafe(18)
+    conn = _conn()
+    conn.execute(
+        "INSERT INTO session_tokens (token, owner, created) VALUES (?, ?, ?)",
+        (token, owner, time.time()),
+    )
+    _drop_expired_tokens(conn)
+    return token
+
+
+def owner_for_token(token: str) -> Optional[str]:
+    row = _conn().execute(
+        "SELECT owner FROM session_tokens WHERE token = ? AND created >= ?",
+        (token, time.time() - TOKEN_MAX_AGE),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def drop_token(token: str) -> None:
+    conn = _conn()
+    conn.execute("DELETE FROM session_tokens WHERE token = ?", (token,))
+    _drop_expired_tokens(conn)
+
+
+# ---------- SESSION SYNC ----------
+
+def _apply(ss, meta: dict, key: str, version: int, value: Any) -> None:
+    ss[key] = value
+    meta["versions"][key] = version
+    if key in AUTO_KEYS:
+        meta["digests"][key] = _digest(value)
+
+
+def _attach(ss, owner: str, token: Optional[str], keep_local: tuple) -> dict:
+    """Start syncing this session with the stored state for `owner`."""
+    meta = {"owner": owner, "token": token, "versions": {}, "digests": {}, "dirty": set()}
+    ss[META_KEY] = meta
+
+    stored = read(owner, [k for k in STORED_KEYS if k not in keep_local])
+    for key, (version, value) in stored.items():
+        _apply(ss, meta, key, version, value)
+
+    # first time we see this user: everything local is new
+    for key in TRACKED_KEYS:
+        if key not in stored:
+            meta["dirty"].add(key)
+
+    if token is None:
+        meta["token"] = new_token(owner)
+    meta["attached"] = True
+    return meta
+
+
+def _token_cookie(token: str, max_age: int) -> None:
+    """Set (or with max_age 0, clear) the session cookie from the browser."""
+    import streamlit.components.v1 as components
+
+    components.html(
+        "<script>"
+        "const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';"
+        f"window.parent.document.cookie = '{TOKEN_COOKIE}={token}; path=/; max-age={max_age}"
+        "; SameSite=Strict' + secure;"
+        "</script>",
+        height=0,
+    )
+
+
+def _cookie_token() -> Optional[str]:
+    import streamlit as st
+
+    try:
+        token = st.context.cookies.get(TOKEN_COOKIE)
+    except Exception:
+        token = None
+    # no browser request behind the session (bare mode, AppTest) gives no str
+    return token if isinstance(token, str) else None
+
+
+def load_session(ss) -> None:
+    """Attach to / refresh from the store at the start of a run."""
+    import streamlit as st
+
+    if LEGACY_TOKEN_PARAM in st.query_params:
+        del st.query_params[LEGACY_TOKEN_PARAM]
+
+    meta = ss.get(META_KEY)
+    if meta is None:
+        owner = verified_user_id(ss.get("user"))
+        if owner is not None:
+            # just logged in / signed up: the local screen + user win
+            meta = _attach(ss, owner, None, keep_local=("screen", "user"))
+        else:
+            token = _cookie_token()
+            owner = owner_for_token(token) if token else None
+            if owner is None:
+                if token:
+                    _token_cookie("", 0)  # logged out or expired
+                return
+            # reload or server restart: restore everything (a screen in the
+            # URL was already applied by routing and wins)
+            keep_local = ("screen",) if "screen" in st.query_params else ()
+            meta = _attach(ss, owner, token, keep_local=keep_local)
+
+    if meta.get("conflicts"):
+        st.toast("Your data was changed in another window, so we loaded the latest version.")
+        meta["conflicts"] = []
+
+    if _cookie_token() != meta["token"]:
+        # the browser sends cookies when the session connects, so until the
+        # next reload this keeps (re)rendering the same, deduplicated element
+        _token_cookie(meta["token"], TOKEN_MAX_AGE)
+
+    if meta.pop("attached", False):
+        return
+
+    # already attached: pick up what other workers changed
+    _refresh(ss, meta)
+
+
+def _refresh(ss, meta: dict) -> List[str]:
+    """Fetch only the keys stored with a newer version than we hold."""
+    local = meta["versions"]
+    changed = [k for k, v in versions(meta["owner"]).items() if v > local.get(k, 0) and k in STORED_KEYS]
+    for key, (version, value) in read(meta["owner"], changed).items():
+        _apply(ss, meta, key, version, value)
+    return changed
+
+
+def save_session(ss) -> List[str]:
+    """Write back the keys this run touched. Returns keys lost to a conflict."""
+    meta = ss.get(META_KEY)
+    if meta is None:
+        return []
+
+    owner = meta["owner"]
+    conflicts = []
+    for key in STORED_KEYS:
+        if key not in ss:
+            continue
+        value = ss[key]
+        if key in AUTO_KEYS:
+            digest = _digest(value)
+            if digest == meta["digests"].get(key):
+                continue
+        elif key not in meta["dirty"]:
+            continue
+
+        new_version = write(owner, key, value, meta["versions"].get(key, 0))
+        if new_version is None:
+            conflicts.append(key)
+            # the other worker's value may still need what the actions would clean up
+            meta.get("after_save", {}).pop(key, None)
+            continue
+        meta["versions"][key] = new_version
+        if key in AUTO_KEYS:
+            meta["digests"][key] = digest
+        meta["dirty"].discard(key)
+        for action in meta.get("after_save", {}).pop(key, ()):
+            action()
+
+    if conflicts:
+        # another worker wrote first: take its values
+        for key, (version, value) in read(owner, conflicts).items():
+            _apply(ss, meta, key, version, value)
+            meta["dirty"].discard(key)
+        meta["conflicts"] = conflicts
+    return conflicts
+
+
+def mark_dirty(ss, key: str) -> None:
+    """Tell the store that a TRACKED_KEYS value changed in this run."""
+    meta = ss.get(META_KEY)
+    if meta is not None:
+        meta["dirty"].add(key)
+
+
+def after_save(ss, key: str, action: Callable[[], None]) -> None:
+    """
+    Run `action()` once this run's `key` is stored (right away if the
+    session is not stored). Dropped if another worker's write wins.
+    """
+    meta = ss.get(META_KEY)
+    if meta is None:
+        action()
+    else:
+        meta.setdefault("after_save", {}).setdefault(key, []).append(action)
+
+
+def detach(ss) -> None:
+    """
+    Log out: stop syncing and drop the user's data from this session so
+    the next user in this tab starts clean.
+    """
+    meta = ss.pop(META_KEY, None)
+    if meta is not None and meta.get("token"):
+        # a cookie left behind no longer maps to anyone
+        drop_token(meta["token"])
+    for key in STORED_KEYS + DERIVED_KEYS:
+        if key != "screen" and key in ss:
+            del ss[key]
+
+
+@contextmanager
+def synced_session(ss) -> Iterator[None]:
+    """Wrap one script run: load changes first, save touched keys after."""
+    load_session(ss)
+    try:
+        yield
+    finally:
+        save_session(ss)
@@ -0,0 +1,52 @@
+# storage.py
+#
+# Local stand-in for the storage backend.
+#
+# Supabase (see supabase_client.py) is still a placeholder, so anything we
+# need to move out of server RAM goes here: compressed pickled blobs on
+# local disk, grouped by namespace. Swap this for real storage later –
+# callers only use put / get / delete.
+#
+# Data directory: TESORIN_DATA_DIR (default ".tesorin_data").
+
+import hashlib
+import os
+import pickle
+import zlib
+from typing import Any, Optional
+
+DATA_DIR = os.getenv("TESORIN_DATA_DIR", ".tesorin_data")
+
+
+def _path(namespace: str, key: str) -> str:
+    # keys can be emails etc. – hash them into safe file names
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(DATA_DIR, namespace, f"{digest}.bin")
+
+
+def put(namespace: str, key: str, value: Any) -> int:
+    """Store a value. Returns the compressed size in bytes."""
+    path = _path(namespace, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def get(namespace: str, key: str, default: Optional[Any] = None) -> Any:
+    path = _path(namespace, key)
+    try:
+        with open(path, "rb") as f:
+            return pickle.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return default
+
+
+def delete(namespace: str, key: str) -> None:
+    try:
+        os.remove(_path(namespace, key))
+    except FileNotFoundError:
+        pass
@@ -11,6 +11,8 @@ from typing import Optional, Dict, Tuple
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# verified user ids (comma-separated) allowed to open the diagnostics panels
+ADMIN_IDS = frozenset(i.strip() for i in os.getenv("TESORIN_ADMINS", "").split(",") if i.strip())
 
 
 def is_configured() -> bool:
@@ -20,9 +22,9 @@ def is_configured() -> bool:
 
 # ---------- PROFILE STORAGE PLACEHOLDER ----------
 
-def save_profile(profile: Dict) -> None:
+def save_profile(changes: Dict) -> None:
     """
-    Later: send data to Supabase.
+    Later: send the changed profile fields to Supabase (partial update).
     For now this does nothing – the app just keeps data in session_state.
     """
     return
@@ -58,6 +60,23 @@ def sign_in(email: str, password: str):
     return True, user
 
 
+def verified_user_id(user: Optional[Dict]) -> Optional[str]:
+    """
+    Stable id of a user whose sign-in the auth provider checked, else None.
+    The placeholder sign-in checks nothing and never sets "verified", so
+    data kept on the server (session store, saved history) stays off until
+    real auth is wired in.
+    """
+    if user and user.get("verified") and user.get("id"):
+        return str(user["id"])
+    return None
+
+
+def is_admin(user: Optional[Dict]) -> bool:
+    """True for a verified user listed in TESORIN_ADMINS (never for the placeholder sign-in)."""
+    return verified_user_id(user) in ADMIN_IDS
+
+
 def sign_out() -> bool:
     """
     Placeholder sign-out.
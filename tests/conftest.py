@@ -0,0 +1,16 @@
+# Tests import the app modules from the repository root and keep every
+# file they write (storage blobs, SQLite stores) in a temporary directory.
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TESORIN_DATA_DIR", tempfile.mkdtemp(prefix="tesorin-tests-"))
+
+
+class State(dict):
+    """Just enough of st.session_state: keys are also attributes."""
+
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
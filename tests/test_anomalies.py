@@ -0,0 +1,91 @@
+from datetime import date
+
+import pytest
+
+from anomalies import MIN_HISTORY, MIN_MONTHS, MIN_SPREAD, THRESHOLD, SpendingAnomalies
+
+
+def _charge(amount, category="Groceries", day=date(2026, 1, 10)):
+    return {"date": day, "amount": -amount, "category": category, "note": ""}
+
+
+def _detector(charges):
+    detector = SpendingAnomalies()
+    for txn in charges:
+        detector.observe(txn)
+    return detector
+
+
+def test_no_score_while_warming_up():
+    detector = _detector([_charge(50.0 + i) for i in range(MIN_HISTORY - 1)])
+    big = _charge(5000.0)
+    assert detector.score(big) is None
+    assert detector.flag(big) == ""
+    detector.observe(_charge(50.0))
+    assert detector.score(big) > THRESHOLD
+    assert detector.flag(big).startswith("⚠")
+    # other categories and income have no score
+    assert detector.score(_charge(5000.0, "Travel")) is None
+    assert detector.score({**big, "amount": 5000.0}) is None
+
+
+def test_a_fixed_amount_uses_the_spread_floor():
+    detector = _detector([_charge(20.0, "Netflix") for _ in range(12)])
+    assert detector.stats["netflix"][2] == 0.0
+    assert detector.score(_charge(20.0, "Netflix")) == 0.0
+    # no spread at all: a standard deviation of MIN_SPREAD * typical
+    assert detector.score(_charge(30.0, "Netflix")) == pytest.approx(10.0 / (MIN_SPREAD * 20.0))
+    assert detector.flag(_charge(26.0, "Netflix")) == ""
+    assert detector.flag(_charge(40.0, "netflix ")) == "⚠ 2.0× usual"
+
+
+def test_one_huge_charge_barely_moves_the_baseline():
+    detector = _detector([_charge(50.0 + i % 5) for i in range(30)])
+    typical = detector.typical("Groceries")
+    detector.observe(_charge(10000.0))
+    assert detector.typical("Groceries") < typical * 1.1
+    assert detector.flag(_charge(400.0)).startswith("⚠")
+
+
+def _months(totals, category="Groceries"):
+    """Four equal charges a month adding up to each total, from January 2026."""
+    charges = []
+    for i, total in enumerate(totals):
+        day = date(2026 + i // 12, i % 12 + 1, 5)
+        charges += [_charge(total / 4, category, day.replace(day=d)) for d in (5, 12, 19, 26)]
+    return charges
+
+
+def test_month_spike_is_flagged_once_when_it_crosses():
+    detector = _detector(_months([400.0, 420.0, 380.0, 410.0]))
+    may = date(2026, 5, 1)
+    flags = []
+    for d in range(1, 21):
+        txn = _charge(100.0, day=may.replace(day=d))
+        flags.append(detector.flag(txn))
+        detector.observe(txn)
+    # every charge is ordinary, so only the month total is unusual
+    assert detector.score(_charge(100.0, day=may)) < THRESHOLD
+    flagged = [i for i, note in enumerate(flags) if note]
+    assert len(flagged) == 1
+    assert flags[flagged[0]].startswith("⚠ month")
+    assert 4 <= flagged[0] < 10
+
+
+def test_no_month_spike_without_enough_months():
+    detector = _detector(_months([400.0] * (MIN_MONTHS - 1)))
+    later = date(2026, MIN_MONTHS, 3)
+    assert detector.month_score(5000.0, "Groceries") is None
+    assert detector.flag(_charge(100.0, day=later)) == ""
+    detector.observe(_charge(100.0, day=later))
+    detector.observe(_charge(100.0, day=date(2026, MIN_MONTHS + 1, 3)))  # closes month MIN_MONTHS
+    assert detector.month_score(5000.0, "Groceries") > THRESHOLD
+
+
+def test_closed_months_are_not_rescored():
+    detector = _detector(_months([400.0, 400.0, 400.0, 400.0]))
+    backdated = _charge(1000.0 / 8, day=date(2026, 2, 14))
+    assert detector.month_total(backdated) is None
+    assert detector.flag(backdated) == ""
+    assert detector.month_total(_charge(10.0, day=date(2026, 4, 30))) == 400.0
+    assert detector.month_total(_charge(10.0, day=date(2026, 6, 1))) == 0.0
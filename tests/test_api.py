@@ -0,0 +1,207 @@
+import asyncio
+import subprocess
+import sys
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import api
+import session_store
+from emergency import build_monthly_spend, spending_target
+
+OWNER = "api-user@example.com"
+PROFILE = {"country": "CA", "income": 6000.0, "expenses": 3000.0, "savings": 2000.0, "debt": 0.0}
+
+
+def call(path, body, token=None):
+    return asyncio.run(api._call(path, body, token))
+
+
+def test_cashflow():
+    status, payload = call("/v1/cashflow", {"income": 5000, "expenses": 3000})
+    assert status == 200
+    assert payload["cashflow"] == 2000
+
+
+def test_unknown_paths_and_wrong_methods():
+    assert asyncio.run(api._call("/v1/health", {}, method="GET")) == (200, {"ok": True})
+    assert asyncio.run(api._call("/v1/nope", {}, method="GET"))[0] == 404
+    assert call("/v1/nope", {})[0] == 404
+    assert asyncio.run(api._call("/v1/cashflow", {}, method="GET"))[0] == 405
+    assert call("/v1/health", {})[0] == 405
+
+
+def test_non_finite_numbers_are_rejected():
+    for value in ("nan", "inf", "-Infinity", "1e999"):
+        status, payload = call("/v1/cashflow", {"income": value, "expenses": 3000})
+        assert status == 400, value
+        assert "finite" in payload["error"]
+
+
+def test_nan_literal_is_not_json():
+    # json.dumps writes float("nan") as a bare NaN literal
+    status, payload = call("/v1/cashflow", {"income": float("nan"), "expenses": 3000})
+    assert status == 400
+    assert payload["error"] == "body is not valid JSON"
+
+
+def test_inline_wallet_rejects_non_finite_amounts():
+    wallet = {"id": "w1", "transactions": [{"date": "2026-01-05", "amount": "nan", "note": "x"}]}
+    status, _ = call("/v1/wallet/stats", {"from": "2026-01-01", "to": "2026-01-31", "wallet": wallet})
+    assert status == 400
+
+
+def test_handlers_run_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def probe(body, owner):
+        threads.append(threading.current_thread())
+        return {}
+
+    monkeypatch.setitem(api.ROUTES, "/v1/probe", probe)
+    status, _ = call("/v1/probe", {})
+    assert status == 200
+    assert threads and threads[0] is not threading.main_thread()
+
+
+@pytest.fixture
+def stored_user():
+    def store(**values):
+        versions = session_store.versions(OWNER)
+        for key, value in values.items():
+            session_store.write(OWNER, key, value, versions.get(key, 0))
+
+    yield session_store.new_token(OWNER), store
+    session_store._conn().execute("DELETE FROM session_keys WHERE owner = ?", (OWNER,))
+    api._stored_cache.clear()  # versions start again at 1 for the next test
+
+
+def test_next_step_from_stored_answers(stored_user):
+    token, store = stored_user
+    store(profile=PROFILE, next_step={"primary_goal": "Build an emergency fund", "monthly_amount": 500.0})
+    status, payload = call("/v1/plan/next-step", {}, token)
+    assert status == 200
+    assert payload["focus"] == "emergency"
+    assert payload["monthly"] == 500.0
+    assert payload["months_to_buffer"] is not None
+
+
+def test_expired_token_is_unauthorized(stored_user):
+    token, store = stored_user
+    store(profile=PROFILE, next_step={"primary_goal": "Build an emergency fund", "monthly_amount": 500.0})
+    session_store._conn().execute(
+        "UPDATE session_tokens SET created = created - ? WHERE token = ?", (session_store.TOKEN_MAX_AGE + 1, token)
+    )
+    status, payload = call("/v1/plan/next-step", {}, token)
+    assert (status, payload["error"]) == (401, "unknown or expired token")
+
+
+def test_next_step_without_an_answer_yet(stored_user):
+    token, store = stored_user
+    store(profile=PROFILE, next_step={"primary_goal": None})  # the app's default
+    status, payload = call("/v1/plan/next-step", {}, token)
+    assert status == 200
+    assert payload["focus"] == "basics"
+
+
+@pytest.mark.parametrize(
+    "next_step",
+    [{"primary_goal": 5}, {"primary_goal": "Pay off debt", "monthly_amount": "abc"}, {"monthly_amount": "nan"}],
+)
+def test_next_step_rejects_bad_answers(next_step):
+    status, payload = call("/v1/plan/next-step", {"profile": PROFILE, "next_step": next_step})
+    assert status == 400, payload
+
+
+def test_next_step_needs_a_token_for_stored_answers():
+    assert call("/v1/plan/next-step", {})[0] == 401
+
+
+def test_goal_projections():
+    goals = [{"name": "Trip", "target": 1200, "saved": 200, "monthly_target": 100}, {"name": "Done", "target": 5}]
+    status, payload = call("/v1/goals/projections", {"goals": goals, "monthly": {"g1": 250}})
+    assert status == 200
+    trip, done = payload["goals"]
+    assert (trip["id"], trip["months"], trip["monthly"]) == ("g1", 4, 250.0)
+    assert done["months"] is None
+
+
+@pytest.mark.parametrize(
+    "goal",
+    [{"id": 5}, {"name": ["x"]}, {"kind": 1}, {"target": "abc"}, {"saved": None, "target": "inf"}, {"saved": {}}],
+)
+def test_goal_projections_reject_bad_goals(goal):
+    status, payload = call("/v1/goals/projections", {"goals": [goal]})
+    assert status == 400, payload
+
+
+def test_goal_projections_with_extreme_numbers():
+    goals = [{"id": "g1", "target": 1e308, "saved": -1e308}]
+    status, payload = call("/v1/goals/projections", {"goals": goals, "monthly": {"g1": 1e-300}})
+    assert status == 400, payload
+    goals = [{"id": "g1", "target": 1e10, "saved": 0}]
+    status, payload = call("/v1/goals/projections", {"goals": goals, "monthly": {"g1": 1e-300}})
+    assert status == 200
+    assert (payload["goals"][0]["months"], payload["goals"][0]["finish"]) == (None, None)
+
+
+def test_stored_wallet_stats(stored_user):
+    token, store = stored_user
+    transactions = [
+        {"date": date(2026, 3, day), "amount": amount, "category": "General", "note": ""}
+        for day, amount in ((2, 3000.0), (5, -40.0), (20, -60.0))
+    ]
+    store(wallets=[{"id": "w1", "name": "Main", "transactions": transactions}])
+    body = {"from": "2026-03-01", "to": "2026-03-10"}
+    status, payload = call("/v1/wallet/stats", body, token)
+    assert status == 200
+    assert (payload["wallet_id"], payload["income"], payload["expenses"], payload["count"]) == ("w1", 3000.0, 40.0, 2)
+    assert call("/v1/wallet/stats", {**body, "wallet_id": "nope"}, token)[0] == 404
+
+
+def test_stored_wallet_stats_without_wallets(stored_user):
+    token, store = stored_user
+    store(wallets=[])
+    status, payload = call("/v1/wallet/stats", {"from": "2026-03-01", "to": "2026-03-10"}, token)
+    assert status == 404
+
+
+def test_batch():
+    status, payload = call(
+        "/v1/batch",
+        {
+            "requests": [
+                {"path": "/v1/cashflow", "body": {"income": 100, "expenses": 40}},
+                {"path": "/v1/goals/projections", "body": {"goals": [{"id": 5}]}},
+                {"path": "/v1/batch", "body": {"requests": []}},
+                {"path": "/v1/nope"},
+            ]
+        },
+    )
+    assert status == 200
+    assert [r["status"] for r in payload["responses"]] == [200, 400, 400, 404]
+    assert payload["responses"][0]["body"]["cashflow"] == 60
+
+
+def test_next_step_uses_the_adaptive_emergency_target(stored_user):
+    token, store = stored_user
+    today = date.today()
+    transactions = [
+        {"date": today - timedelta(days=days), "amount": -(50.0 + days % 5 * 20), "category": "General", "note": ""}
+        for days in range(1, 200, 2)
+    ]
+    profile = {**PROFILE, "emergency_basis": "wallets", "emergency_percentile": 90}
+    wallets = [{"id": "w1", "name": "Main", "transactions": transactions}]
+    store(profile=profile, next_step={"primary_goal": "Build an emergency fund"}, wallets=wallets)
+
+    expected = spending_target(profile, wallets, build_monthly_spend(wallets), 3000.0, 0.0)
+    assert expected is not None
+    status, payload = call("/v1/plan/next-step", {}, token)
+    assert status == 200
+    assert payload["emergency_target"] == round(expected, 2)
+
+
+def test_import_does_not_load_streamlit():
+    code = "import sys, api; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=api.os.path.dirname(api.__file__)).returncode == 0
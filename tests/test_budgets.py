@@ -0,0 +1,84 @@
+from datetime import date
+
+import pytest
+
+import storage
+from budgets import budget_progress, observe_spend, wallet_spend
+from session_memory import HISTORY_NAMESPACE
+
+from conftest import State
+
+MARCH = date(2026, 3, 1)
+
+
+def _txn(day, amount, category="Groceries"):
+    return {"date": date(2026, 3, day), "amount": amount, "category": category, "note": ""}
+
+
+@pytest.fixture
+def ss():
+    transactions = [_txn(2, -120.0), _txn(5, -80.0, " groceries "), _txn(9, -40.0, "Fun"), _txn(12, 3000.0, "Salary")]
+    return State(
+        profile={"budgets": {"Groceries": 250.0, "Fun": 100.0}},
+        wallets=[{"id": "w1", "name": "Main", "transactions": transactions}],
+    )
+
+
+def _spent(ss, today=date(2026, 3, 31)):
+    return {row["category"]: row["spent"] for row in budget_progress(ss, MARCH, today=today)}
+
+
+def test_progress_is_sorted_by_share_and_flags_overspending(ss):
+    wallet = ss.wallets[0]
+    for txn in (_txn(20, -70.0), _txn(21, -5.0, "Fun")):
+        wallet["transactions"].append(txn)
+        observe_spend(ss, wallet, txn)
+    rows = budget_progress(ss, MARCH, today=date(2026, 3, 31))
+    assert [(r["category"], r["spent"], r["over"]) for r in rows] == [("Groceries", 270.0, True), ("Fun", 45.0, False)]
+    assert rows[0]["share"] == pytest.approx(270.0 / 250.0)
+    assert budget_progress(ss, date(2026, 4, 15), today=date(2026, 4, 30))[0]["spent"] == 0.0
+
+
+def test_appended_transactions_update_the_totals_in_place(ss):
+    wallet = ss.wallets[0]
+    totals = wallet_spend(ss, wallet)
+    txn = _txn(15, -30.0)
+    wallet["transactions"].append(txn)
+    observe_spend(ss, wallet, txn)
+    assert wallet_spend(ss, wallet) is totals
+    assert totals.month(MARCH, "Groceries") == 230.0
+
+
+def test_refunds_lower_the_spend(ss):
+    wallet = ss.wallets[0]
+    wallet_spend(ss, wallet)
+    for txn in (_txn(16, 50.0), _txn(17, 60.0, "Fun")):
+        wallet["transactions"].append(txn)
+        observe_spend(ss, wallet, txn)
+    assert _spent(ss) == {"Groceries": 150.0, "Fun": 0.0}  # never below zero
+
+
+def test_recurring_rules_count_only_days_already_past(ss):
+    ss.wallets[0]["recurring"] = [
+        {"id": "r1", "schedule": "weekly", "start": date(2026, 2, 26), "end": None, "amount": -25.0, "category": "fun"},
+        {"id": "r2", "schedule": "monthly", "start": date(2026, 1, 1), "end": None, "amount": -500.0, "category": "Rent"},
+    ]
+    # weekly from Feb 26: Mar 5, 12, 19, 26
+    assert _spent(ss, today=date(2026, 3, 13))["Fun"] == 40.0 + 2 * 25.0
+    assert _spent(ss)["Fun"] == 40.0 + 4 * 25.0
+    assert _spent(ss, today=date(2026, 2, 20))["Fun"] == 40.0  # a future month: no rules yet
+
+
+def test_totals_are_rebuilt_when_the_count_no_longer_matches(ss):
+    wallet = ss.wallets[0]
+    totals = wallet_spend(ss, wallet)
+    # appended without observe_spend (e.g. replaced by the session store)
+    wallet["transactions"].append(_txn(18, -100.0))
+    rebuilt = wallet_spend(ss, wallet)
+    assert rebuilt is not totals
+    assert rebuilt.month(MARCH, "Groceries") == 300.0
+
+    # history spilled to the archive still counts
+    storage.put(HISTORY_NAMESPACE, "budgets-archive", [_txn(1, -45.0)])
+    wallet.update(archived_count=1, archive_key="budgets-archive")
+    assert wallet_spend(ss, wallet).month(MARCH, "groceries") == 345.0
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from categorize import DEFAULT_CATEGORIZER, RULES, categorize, categorize_batch, learn_override, normalize_note
+
+
+def _reference(normalized):
+    """Longest keyword in the note (earliest on a tie), by brute force."""
+    text = " " + normalized + " "
+    found = None
+    for end in range(1, len(text) + 1):
+        for category, keywords in RULES.items():
+            for keyword in keywords:
+                pattern = " " + normalize_note(keyword) + (" " if keyword.endswith(" ") else "")
+                if text.endswith(pattern, 0, end) and (found is None or len(pattern) > found[0]):
+                    found = (len(pattern), category)
+    return found[1] if found else None
+
+
+@pytest.mark.parametrize(
+    "note, category",
+    [
+        ("UBER *TRIP 8842", "Transport"),
+        ("Uber Eats order", "Eating out"),  # longest keyword wins
+        ("Current account fee", None),  # "rent" only at the start of a word
+        ("Rent October", "Rent"),
+        ("shellfish market", None),  # "shell " must be a whole word
+        ("SHELL 0042 TORONTO", "Transport"),
+        ("Interac e-Transfer", "Transfers"),
+    ],
+)
+def test_matches(note, category):
+    assert DEFAULT_CATEGORIZER.match(normalize_note(note)) == category
+
+
+def test_automaton_matches_brute_force():
+    rng = random.Random(3)
+    words = [w for keywords in RULES.values() for k in keywords for w in normalize_note(k).split()]
+    words += ["the", "store", "ca", "on", "pos", "purchase", "ref", "xx"]
+    for _ in range(300):
+        note = " ".join(rng.choice(words)[: rng.choice((2, 3, 4, 100))] for _ in range(rng.randint(1, 5)))
+        assert DEFAULT_CATEGORIZER.match(note) == _reference(note), note
+
+
+def test_batch_fills_only_missing_categories_and_overrides_win():
+    overrides = {}
+    assert learn_override(overrides, "Costco #123", "Shopping")
+    assert not learn_override(overrides, "COSTCO 456", "Shopping")
+    txns = [
+        {"note": "COSTCO 789", "category": "General"},
+        {"note": "Netflix.com"},
+        {"note": "Netflix.com", "category": "Fun"},
+        {"note": "mystery"},
+    ]
+    assert categorize_batch(txns, overrides) == 2
+    assert [t["category"] for t in txns] == ["Shopping", "Subscriptions", "Fun", "General"]
+    assert categorize("Costco Wholesale", overrides) == "Groceries"
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+import cohorts
+
+PROFILE = {"country": "CA", "age": 30, "household_size": 1, "income": 5000.0, "expenses": 4000.0}
+
+
+@pytest.fixture
+def fresh_epoch():
+    cohorts.rebuild(owners=[])  # no users: empties every cohort
+    yield
+    cohorts.rebuild(owners=[])
+
+
+@pytest.mark.parametrize("n", [1_000, 100_000])
+def test_kll_rank_error(monkeypatch, n):
+    monkeypatch.setattr(cohorts, "_random", random.Random(n))
+    rng = random.Random(42)
+    values = [rng.gauss(15, 10) for _ in range(n)]
+    left, right = cohorts.KLLSketch(), cohorts.KLLSketch()
+    for i, value in enumerate(values):
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+    assert left.n == n
+    assert sum(len(items) for items in left.levels) < 1000
+
+    cdf = left.cdf()
+    values.sort()
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert cdf.percentile(values[int(q * n)]) == pytest.approx(100 * q, abs=2.0)
+
+
+def _size(profile):
+    return cohorts.read_cohort(cohorts.cohort_keys(profile)[0]).n
+
+
+def test_only_a_users_first_save_counts(fresh_epoch):
+    cohorts.record_profile("alice", PROFILE)
+    for expenses in (1000.0, 2000.0, 3000.0):
+        cohorts.record_profile("alice", {**PROFILE, "expenses": expenses})
+    cohorts.record_profile("bob", PROFILE)
+    assert _size(PROFILE) == 2
+
+
+def test_rebuild_starts_a_new_epoch(fresh_epoch):
+    cohorts.record_profile("alice", PROFILE)
+    epoch = cohorts.current_epoch()
+    cohorts.rebuild(owners=[])
+    assert cohorts.current_epoch() == epoch + 1
+    assert _size(PROFILE) == 0
+
+    # this process's old sketch (alice) was part of the rebuild: not counted again
+    cohorts.record_profile("bob", PROFILE)
+    assert _size(PROFILE) == 1
+    cohorts.record_profile("alice", PROFILE)
+    assert _size(PROFILE) == 2
+
+
+def test_rows_of_an_older_epoch_are_dropped(fresh_epoch):
+    key = cohorts.cohort_keys(PROFILE)[0]
+    sketch = cohorts.KLLSketch()
+    sketch.add(20.0)
+    # a process row saved while a rebuild ran, tagged with the epoch before it
+    cohorts.write_sketch(key, "other-process", sketch, cohorts.current_epoch())
+    cohorts.rebuild(owners=[])
+    assert _size(PROFILE) == 0
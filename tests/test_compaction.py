@@ -0,0 +1,46 @@
+import logging
+import time
+from datetime import date
+
+import compaction
+from emergency import monthly_spend
+
+from conftest import State
+
+
+def test_compaction_drops_derived_data_and_it_rebuilds():
+    txns = [{"date": date(2026, month, 1), "amount": -100.0 * month, "note": "rent"} for month in (6, 7, 8, 9)]
+    ss = State(
+        wallets=[{"id": "main", "name": "Main", "transactions": txns}],
+        next_step={"primary_goal": "Pay off debt"},
+        search_indexes={"main": object()},
+    )
+    before = monthly_spend(ss).stats(date(2026, 10, 19))
+    spend = ss.monthly_spend
+
+    with compaction.keep_session_warm(ss):
+        pass
+    assert compaction.sweep(now=time.time() + compaction.IDLE_TIMEOUT_SECONDS + 1) >= 1
+
+    assert ss.wallets == [] and ss.next_step == {}
+    assert ss.search_indexes == {}
+    assert ss.monthly_spend is spend and spend.count == 0 and spend.spent == {}
+
+    with compaction.keep_session_warm(ss):
+        assert len(ss.wallets[0]["transactions"]) == 4
+        assert monthly_spend(ss).stats(date(2026, 10, 19)) == before
+
+
+def test_failed_compaction_is_logged_and_keeps_the_session(monkeypatch, caplog):
+    ss = State(wallets=[{"id": "main", "name": "Main", "transactions": [{"amount": 1.0}]}])
+    with compaction.keep_session_warm(ss):
+        pass
+
+    def broken_put(namespace, key, value):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(compaction.storage, "put", broken_put)
+    with caplog.at_level(logging.ERROR, logger="compaction"):
+        compaction.sweep(now=time.time() + compaction.IDLE_TIMEOUT_SECONDS + 1)
+    assert "could not compact idle session" in caplog.text and "disk full" in caplog.text
+    assert len(ss.wallets[0]["transactions"]) == 1
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+from dedupe import DATE_WINDOW, DuplicateIndex
+
+BASE = date(2026, 3, 1)
+
+
+def _txn(day, amount=-4.5, note="STARBUCKS #123"):
+    return {"date": day, "amount": amount, "note": note}
+
+
+@pytest.mark.parametrize("start", range(DATE_WINDOW))  # every position inside a bucket
+def test_near_window_across_buckets(start):
+    existing = BASE + timedelta(days=start)
+    for offset in range(-2 * DATE_WINDOW, 2 * DATE_WINDOW + 1):
+        index = DuplicateIndex()
+        index.add(_txn(existing))
+        match = index.find(_txn(existing + timedelta(days=offset)))
+        if offset == 0:
+            assert match == ("exact", existing)
+        elif abs(offset) <= DATE_WINDOW:
+            assert match == ("near", existing), offset
+        else:
+            assert match is None, offset
+
+
+def test_amount_and_note_must_match():
+    index = DuplicateIndex()
+    index.add(_txn(BASE))
+    assert index.find(_txn(BASE, amount=-4.51)) is None
+    assert index.find(_txn(BASE, note="Tim Hortons")) is None
+    assert index.find(_txn(BASE, note="starbucks 999")) == ("exact", BASE)  # same normalized note
+
+
+def test_each_existing_row_matches_once():
+    index = DuplicateIndex()
+    statement = [_txn(BASE), _txn(BASE + timedelta(days=1), amount=-1200.0, note="Rent")]
+    for txn in statement:
+        index.add(txn)
+
+    # importing the same statement again skips everything
+    fresh, exact, near = index.split_batch(statement)
+    assert (fresh, len(exact), near) == ([], 2, [])
+
+    # two identical coffees on a day the wallet had one: the second is new
+    fresh, exact, near = index.split_batch([_txn(BASE), _txn(BASE)])
+    assert (len(fresh), len(exact), near) == (1, 1, [])
+
+    # a near match uses up the row too
+    moved = _txn(BASE + timedelta(days=2))
+    fresh, exact, near = index.split_batch([moved, moved])
+    assert (len(fresh), exact, len(near)) == (1, [], 1)
+
+
+def test_next_statement_of_daily_fares_is_not_skipped():
+    index = DuplicateIndex()
+    march = [_txn(date(2026, 3, day), amount=-3.35, note="PRESTO FARE") for day in range(1, 32)]
+    for txn in march:
+        index.add(txn)
+    april = [_txn(date(2026, 4, day), amount=-3.35, note="PRESTO FARE") for day in range(1, 31)]
+
+    fresh, exact, near = index.split_batch(april)
+    assert exact == []
+    # only the first days sit within DATE_WINDOW of March: asked about, never dropped
+    assert [txn["date"].day for txn, _ in near] == list(range(1, DATE_WINDOW + 1))
+    assert all(0 < (txn["date"] - day).days <= DATE_WINDOW for txn, day in near)
+    assert len(fresh) + len(near) == len(april)
@@ -0,0 +1,77 @@
+import random
+import statistics
+from datetime import date
+
+import pytest
+
+from emergency import MonthlySpend
+
+TODAY = date(2026, 10, 19)
+
+
+def _spend(txns, today=TODAY):
+    spend = MonthlySpend()
+    for txn in txns:
+        spend.observe(txn)
+    return spend.stats(today)
+
+
+def _txn(day, amount):
+    return {"date": day, "amount": amount}
+
+
+def test_welford_matches_statistics_in_any_order():
+    rng = random.Random(7)
+    txns = [
+        _txn(date(2025, month, rng.randint(1, 28)), -rng.uniform(5, 400))
+        for month in range(1, 13)
+        for _ in range(rng.randint(1, 6))
+    ] + [_txn(date(2025, 1, 1), 250.0)]  # an inflow on the 1st: January counts
+    totals = {}
+    for txn in txns:
+        totals[txn["date"].month] = totals.get(txn["date"].month, 0.0) + max(-txn["amount"], 0.0)
+    expected = list(totals.values())
+
+    for order in (sorted(txns, key=lambda t: t["date"]), list(reversed(txns)), rng.sample(txns, len(txns))):
+        n, mean, std = _spend(order)
+        assert n == 12
+        assert mean == pytest.approx(statistics.mean(expected))
+        assert std == pytest.approx(statistics.stdev(expected))
+
+
+def test_outflow_in_a_closed_month_swaps_its_total():
+    spend = MonthlySpend()
+    for month, amount in ((5, 100.0), (6, 200.0), (7, 300.0)):
+        spend.observe(_txn(date(2026, month, 1), -amount))
+    spend.stats(TODAY)
+    spend.observe(_txn(date(2026, 6, 15), -100.0))  # June: 200 -> 300
+    n, mean, std = spend.stats(TODAY)
+    assert n == 3
+    assert mean == pytest.approx(statistics.mean([100.0, 300.0, 300.0]))
+    assert std == pytest.approx(statistics.stdev([100.0, 300.0, 300.0]))
+
+
+def test_partial_first_month_is_left_out():
+    txns = [_txn(date(2026, 6, 25), -50.0)] + [_txn(date(2026, month, 3), -1000.0) for month in (7, 8, 9)]
+    assert _spend(txns) == (3, pytest.approx(1000.0), 0.0)
+
+
+def test_earlier_history_makes_the_old_first_month_complete():
+    spend = MonthlySpend()
+    for txn in [_txn(date(2026, 6, 25), -50.0)] + [_txn(date(2026, month, 3), -1000.0) for month in (7, 8, 9)]:
+        spend.observe(txn)
+    assert spend.stats(TODAY)[0] == 3
+    spend.observe(_txn(date(2026, 5, 20), -10.0))  # June is complete now, May is the partial one
+    n, mean, _ = spend.stats(TODAY)
+    assert n == 4
+    assert mean == pytest.approx((50.0 + 3000.0) / 4)
+
+
+def test_months_without_transactions_are_left_out():
+    txns = [_txn(date(2026, month, 1), -1000.0) for month in (3, 4, 8, 9)]  # nothing imported May-July
+    assert _spend(txns) == (4, pytest.approx(1000.0), 0.0)
+
+
+def test_current_month_stays_open():
+    txns = [_txn(date(2026, 10, 1), -500.0), _txn(date(2026, 10, 5), -500.0)]
+    assert _spend(txns)[0] == 0
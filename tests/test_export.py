@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import export
+
+ROWS = [
+    {"date": date(2026, 1, d), "category": "Groceries", "note": f"shop {d}", "amount": -100.0 * d}
+    for d in range(1, 11)
+]
+
+
+def test_csv_export_is_bytes_download_button_accepts():
+    data = export.export_file("CSV", export.TRANSACTION_COLUMNS, export.transaction_chunks(ROWS))
+    assert isinstance(data, bytes)
+    converted, _ = convert_data_to_bytes_and_infer_mime(data, RuntimeError("unsupported type"))
+    assert converted == data
+
+
+def test_csv_export_filters_period_across_chunks(monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_ROWS", 3)
+    period = (date(2026, 1, 3), date(2026, 1, 7))
+    data = export.export_file("CSV", export.TRANSACTION_COLUMNS, export.transaction_chunks(ROWS, period))
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    assert rows[0] == ["date", "category", "note", "amount"]
+    assert [r[0] for r in rows[1:]] == [f"2026-01-0{d}" for d in range(3, 8)]
+
+
+def test_parquet_export_round_trips():
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = export.export_file("Parquet", export.TRANSACTION_COLUMNS, export.transaction_chunks(ROWS))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == len(ROWS)
+    assert table.column("amount").to_pylist() == [r["amount"] for r in ROWS]
+
+
+def test_profile_export_writes_budgets_as_json():
+    profile = {"country": "CA", "income": 6000.0, "goals": ["Trip"], "budgets": {"Groceries": 600.0, "Eating out": 150.0}}
+    schema = export.profile_schema(profile)
+    assert [name for name, _ in schema] == ["country", "income", "budgets"]
+    data = export.export_file("CSV", schema, export.profile_chunks(profile, schema))
+    header, row = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    assert json.loads(row[header.index("budgets")]) == profile["budgets"]
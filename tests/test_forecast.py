@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+from forecast import MIN_HISTORY_DAYS, ForecastModel, forecast, forecast_cashflow
+
+TODAY = date(2026, 10, 19)
+RENT = {"id": "r1", "schedule": "monthly", "start": date(2026, 1, 1), "end": None,
+        "amount": -1200.0, "category": "Rent", "note": ""}
+
+
+def _model(days: int, amount: float = -10.0) -> ForecastModel:
+    model = ForecastModel()
+    for i in range(1, days + 1):
+        model.observe({"date": TODAY - timedelta(days=i), "category": "Food", "amount": amount})
+    return model
+
+
+def test_rules_alone_do_not_make_a_forecast():
+    assert forecast(ForecastModel(), [RENT], today=TODAY) is None
+
+
+def test_short_history_with_rules_has_no_forecast():
+    assert forecast(_model(MIN_HISTORY_DAYS // 2), [RENT], today=TODAY) is None
+
+
+def test_rules_adjust_a_history_forecast():
+    model = _model(90)
+    without = forecast(model, [], months=3, today=TODAY)
+    with_rent = forecast(model, [RENT], months=3, today=TODAY)
+    assert without is not None and with_rent is not None
+    assert abs(without["monthly_net"] / (-10.0 * 365.25 / 12) - 1) < 0.03
+    # three rent payments over the three months
+    assert abs(with_rent["monthly_net"] - without["monthly_net"] + 1200) < 50
+
+
+def test_cashflow_falls_back_to_profile_for_rule_only_wallets():
+    ss = {"wallets": [{"id": "main", "name": "Main", "transactions": [], "recurring": [RENT]}]}
+    assert forecast_cashflow(ss) is None
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+from goals import LEDGER_KEEP_MONTHS, UNDO_LIMIT, GoalLedger, GoalRegistry
+
+
+def test_duplicate_names_survive_removal():
+    goals = GoalRegistry()
+    first = goals.add(name="Trip", kind="purchase", target=1000.0)
+    second = goals.add(name="Trip", kind="purchase", target=2000.0)
+    assert goals.by_name("Trip") is first
+    goals.remove(first["id"])
+    assert goals.by_name("Trip") is second
+    goals.remove(second["id"])
+    assert goals.by_name("Trip") is None
+
+
+def test_rename_moves_name_index():
+    goals = GoalRegistry()
+    goal = goals.add(name="Car", kind="purchase", target=5000.0)
+    goals.update(goal["id"], name="New car")
+    assert goals.by_name("Car") is None
+    assert goals.by_name("New car") is goal
+
+
+def test_empty_kind_buckets_are_dropped():
+    goals = GoalRegistry()
+    trip = goals.add(name="Trip", kind="purchase", target=1000.0)
+    car = goals.add(name="Car", kind="purchase", target=5000.0)
+    goals.update(trip["id"], kind="travel")
+    assert goals.by_kind("purchase") == [car] and goals.by_kind("travel") == [trip]
+    goals.remove(car["id"])
+    goals.update(trip["id"], kind="holiday")
+    assert set(goals._by_kind) == {"holiday"}
+
+
+def test_ids_never_reused_and_top_ranked_by_progress():
+    goals = GoalRegistry()
+    a = goals.add(name="A", target=100.0, saved=10.0)
+    b = goals.add(name="B", target=100.0, saved=90.0)
+    goals.remove(a["id"])
+    c = goals.add(name="C", target=100.0, saved=50.0)
+    assert c["id"] not in (a["id"], b["id"])
+    assert [g["name"] for g in goals.top(2)] == ["B", "C"]
+
+
+# ----- GoalLedger -----
+
+def _months_ago(n: int) -> date:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def test_backdated_entries_are_kept_in_date_order():
+    ledger = GoalLedger()
+    ledger.append(100.0)
+    ledger.append(50.0, _months_ago(1))
+    assert [e[1] for e in ledger.entries] == sorted(e[1] for e in ledger.entries)
+    assert ledger.total == 150.0
+
+
+def test_compaction_drops_only_old_entries():
+    ledger = GoalLedger(day=_months_ago(LEDGER_KEEP_MONTHS + 2))
+    ledger.append(10.0)  # recent, appended first
+    ledger.append(20.0, _months_ago(LEDGER_KEEP_MONTHS + 1))  # old, backdated
+    ledger._compacted_for = None
+    ledger.append(5.0)  # triggers compaction
+    assert [e[2] for e in ledger.entries] == [10.0, 5.0]
+    # the month summaries still have everything
+    assert ledger.total == 35.0
+    assert sum(v[0] for v in ledger.months.values()) == 35.0
+
+
+def test_undo_reverses_latest_contribution_not_latest_day():
+    ledger = GoalLedger()
+    ledger.append(100.0)
+    ledger.append(40.0, date.today() - timedelta(days=3))  # made last, dated earlier
+    assert ledger.undo_last() == 40.0
+    assert ledger.total == 100.0
+    assert ledger.undo_last() == 100.0
+    assert ledger.undo_last() is None
+
+
+def test_undo_never_reverses_opening_balance():
+    ledger = GoalLedger(opening=500.0)
+    assert ledger.undo_last() is None
+    ledger.append(25.0)
+    assert ledger.undo_last() == 25.0
+    assert ledger.undo_last() is None
+    assert ledger.total == 500.0
+
+
+def test_registry_undo_keeps_saved_from_before_the_ledger():
+    goals = GoalRegistry()
+    goal = goals.add(name="Fund", target=1000.0, saved=300.0)
+    goals.contribute_many({goal["id"]: 50.0})
+    assert goals.undo_last() == [goal]
+    assert goal["saved"] == 300.0
+    assert goals.undo_last() == []
+    assert goal["saved"] == 300.0
+
+
+def test_undo_history_is_capped():
+    goals = GoalRegistry()
+    goal = goals.add(name="Trip", target=1e6)
+    for _ in range(UNDO_LIMIT + 5):
+        goals.contribute(goal["id"], 10.0)
+    assert len(goals._undo) == UNDO_LIMIT
+    for _ in range(UNDO_LIMIT):
+        assert goals.undo_last()
+    assert not goals.can_undo() and goal["saved"] == 50.0
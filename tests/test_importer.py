@@ -0,0 +1,48 @@
+import io
+from datetime import date
+
+import pytest
+
+from importer import parse_amount, pick_date_format, read_statement
+
+
+def _read(text: str):
+    return read_statement(io.BytesIO(text.encode("utf-8")))
+
+
+def test_one_date_format_per_file():
+    # the reviewer's case: month-first is the only format that reads 12/25
+    txns, errors = _read("Date,Description,Amount\n03/04/2026,a,-1\n12/25/2026,b,-2\n03/05/2026,c,-3\n")
+    assert [t["date"] for t in txns] == [date(2026, 3, 4), date(2026, 12, 25), date(2026, 3, 5)]
+    assert errors == []
+
+
+def test_day_first_file():
+    txns, errors = _read("Date,Description,Amount\n03/04/2026,a,-1\n25/12/2026,b,-2\n")
+    assert [t["date"] for t in txns] == [date(2026, 4, 3), date(2026, 12, 25)]
+    assert errors == []
+
+
+def test_ambiguous_dates_are_reported():
+    txns, errors = _read("Date,Description,Amount\n03/04/2026,a,-1\n05/06/2026,b,-2\n")
+    assert [t["date"] for t in txns] == [date(2026, 4, 3), date(2026, 6, 5)]
+    assert errors and "day-first" in errors[0]
+
+
+def test_row_in_another_format_is_skipped_not_switched():
+    txns, errors = _read("Date,Description,Amount\n2026-01-05,a,-1\n25/12/2026,b,-2\nnot a date,c,-3\n")
+    assert [t["date"] for t in txns] == [date(2026, 1, 5)]
+    assert [e.split(":")[0] for e in errors] == ["line 3", "line 4"]
+
+
+def test_pick_date_format_without_any_known_dates():
+    with pytest.raises(ValueError):
+        pick_date_format(["soon", "later"])
+
+
+def test_debit_credit_columns_and_amounts():
+    txns, _ = _read("Date,Narration,Withdrawal,Deposit\n2026-01-05,rent,\"1,200.50\",\n2026-01-06,pay,,500\n")
+    assert [t["amount"] for t in txns] == [-1200.5, 500.0]
+    assert parse_amount("(45.00)") == -45.0
+    with pytest.raises(ValueError):
+        parse_amount("n/a")
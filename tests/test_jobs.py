@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import Future
+from datetime import date
+
+import pytest
+
+import jobs
+from projections import simulate_goals
+
+INPUTS = (("g1", "Trip", 5000.0, 1000.0, 400.0, 24),)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    yield
+    if jobs._pool is not None:
+        jobs._pool.shutdown(cancel_futures=True)
+        jobs._manager.shutdown()
+        jobs._pool = jobs._manager = jobs._progress = jobs._cancelled = None
+
+
+def _wait(key: str) -> dict:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        state = jobs.status(key)
+        if state["state"] not in ("queued", "running"):
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"job {key} did not finish")
+
+
+def test_submitted_job_finishes_and_is_cached():
+    key = jobs.submit(simulate_goals, INPUTS, 3, 200)
+    state = _wait(key)
+    assert state["state"] == "done"
+    assert state["result"] == simulate_goals(INPUTS, 3, 200)
+    # same inputs again: answered from the cache
+    assert jobs.submit(simulate_goals, INPUTS, 3, 200) == key
+    assert jobs.stats()["running"] == 0
+
+
+def test_failed_job_reports_its_error():
+    key = jobs.submit(simulate_goals, INPUTS, "high", 200)
+    state = _wait(key)
+    assert state["state"] == "failed"
+    assert state["error"].startswith("ValueError")
+
+
+def test_results_are_keyed_by_day(monkeypatch):
+    key = jobs.job_key(simulate_goals, INPUTS, 3)
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.fromordinal(date.today().toordinal() + 1)
+
+    monkeypatch.setattr(jobs, "date", Tomorrow)
+    assert jobs.job_key(simulate_goals, INPUTS, 3) != key
+
+
+def test_failures_are_capped(monkeypatch):
+    monkeypatch.setattr(jobs, "RESULT_CACHE_SIZE", 3)
+    monkeypatch.setattr(jobs, "_errors", jobs.OrderedDict())
+    for i in range(5):
+        future = Future()
+        future.set_exception(ValueError(i))
+        jobs._finished(f"key-{i}", future)
+    assert list(jobs._errors) == ["key-2", "key-3", "key-4"]
@@ -0,0 +1,127 @@
+import os
+import threading
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import metrics
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def fresh(monkeypatch, tmp_path):
+    """Metrics on, empty, exporting to a temp directory."""
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(tmp_path / "metrics.prom"))
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_reruns", {})
+    monkeypatch.setattr(metrics, "_last_export", float("-inf"))
+    return tmp_path
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = metrics.Histogram()
+    assert hist.quantile(0.5) == 0.0
+    # bounds are inclusive upper edges: 0.0001 lands in the first bucket
+    for seconds in (0.0001, 0.00015, 0.0002, 0.0003, 100.0):
+        hist.observe(seconds)
+    assert hist.counts[:3] == [1, 2, 1]
+    assert hist.counts[-1] == 1  # above the last bound: +Inf
+    assert (hist.count, hist.total) == (5, pytest.approx(100.0008))
+
+    # rank 2.5 is 1.5 of the 2 values into (0.0001, 0.0002]
+    assert hist.quantile(0.5) == pytest.approx(0.0001 + 0.0001 * 0.75)
+    assert hist.quantile(0.2) == pytest.approx(0.0001)
+    assert hist.quantile(0.7) == pytest.approx(0.0002 + 0.0002 * 0.5)
+    assert hist.quantile(0.99) == metrics.BUCKETS[-1]  # +Inf reads as the last bound
+
+
+def test_prometheus_text_format(fresh):
+    for seconds in (0.00005, 0.003, 0.003):
+        metrics.observe("render_home", seconds)
+    metrics.count_rerun("main/home")
+    metrics.count_rerun("main/home")
+    text = metrics.to_prometheus()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert lines[:2] == [
+        "# HELP tesorin_duration_seconds Time spent in instrumented renders and compute calls.",
+        "# TYPE tesorin_duration_seconds histogram",
+    ]
+    buckets = [line for line in lines if line.startswith("tesorin_duration_seconds_bucket")]
+    assert len(buckets) == len(metrics.BUCKETS) + 1
+    assert buckets[0] == 'tesorin_duration_seconds_bucket{fn="render_home",le="0.0001"} 1'
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 3  # cumulative
+    assert buckets[-1] == 'tesorin_duration_seconds_bucket{fn="render_home",le="+Inf"} 3'
+    assert 'tesorin_duration_seconds_sum{fn="render_home"} 0.006050' in lines
+    assert 'tesorin_duration_seconds_count{fn="render_home"} 3' in lines
+    assert sum(line.startswith('tesorin_duration_quantile_seconds{fn="render_home",quantile=') for line in lines) == 3
+    assert "# TYPE tesorin_reruns_total counter" in lines
+    assert 'tesorin_reruns_total{trigger="main/home"} 2' in lines
+
+
+def test_concurrent_exports_claim_the_interval_once(fresh, monkeypatch):
+    monkeypatch.setattr(metrics, "EXPORT_INTERVAL_SECONDS", 3600.0)
+    metrics.observe("render_home", 0.01)
+    writes = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: (writes.append(src), real_replace(src, dst)))
+    threads = [threading.Thread(target=metrics.maybe_export) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(writes) == 1
+    assert os.listdir(fresh) == ["metrics.prom"]
+
+
+def test_failed_export_is_logged_not_raised(fresh, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(fresh / "missing" / "metrics.prom"))
+    metrics.maybe_export(force=True)
+    assert "could not export metrics" in caplog.text
+
+
+def test_runs_cut_short_by_rerun_still_export(monkeypatch, tmp_path):
+    path = tmp_path / "metrics.prom"
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(path))
+    monkeypatch.setattr(metrics, "EXPORT_INTERVAL_SECONDS", 0.0)
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.session_state["screen"] = "login"
+    at.run()
+    path.unlink()
+
+    # logging in ends with st.rerun(), which raises out of the page
+    exported = []
+    real_export = metrics.maybe_export
+    monkeypatch.setattr(metrics, "maybe_export", lambda force=False: (exported.append(1), real_export(force)))
+    at.text_input[0].input("someone@example.com")
+    at.text_input[1].input("pw")
+    at.button[0].click()
+    at.run()
+    assert not at.exception
+    assert len(exported) >= 2  # the run that called st.rerun() and the rerun
+    assert path.stat().st_size > 0
+
+
+def test_diagnostics_panels_need_an_admin(monkeypatch):
+    import supabase_client
+
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(supabase_client, "ADMIN_IDS", frozenset({"admin-1"}))
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.query_params["admin"] = "memory"
+    at.session_state["screen"] = "main"
+    at.session_state["user"] = {"id": "admin-1", "email": "admin@example.com"}  # placeholder: not verified
+    at.run()
+    assert not at.exception
+    assert not any("Session memory" in m.value for m in at.markdown)
+
+    at.session_state["user"] = {"id": "admin-1", "email": "admin@example.com", "verified": True}
+    at.run()
+    assert not at.exception
+    assert any("Session memory" in m.value for m in at.markdown)
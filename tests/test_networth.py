@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+import pytest
+
+import storage
+from networth import DAILY_DAYS, NAMESPACE, WEEKLY_WEEKS, NetWorthHistory, Snapshot, networth_history, record_snapshot
+
+from conftest import State
+
+START = date(2024, 1, 1)  # a Monday
+
+
+def _snapshot(net):
+    return Snapshot(float(net), float(net), 0.0, 0.0, 0.0)
+
+
+def _history(days):
+    """One point a day from START, net worth = day number."""
+    history = NetWorthHistory()
+    for i in range(days):
+        history.record(START + timedelta(days=i), _snapshot(i))
+    return history
+
+
+def test_record_keeps_one_point_per_day():
+    history = NetWorthHistory()
+    assert history.record(START, _snapshot(100))
+    assert not history.record(START, _snapshot(100))
+    assert history.record(START, _snapshot(120))
+    assert history.record(START + timedelta(days=1), _snapshot(90))
+    assert len(history) == 2
+    assert history.latest() == _snapshot(90)
+    assert NetWorthHistory().latest() is None
+
+
+def test_old_days_fold_into_weeks_and_months():
+    history = _history(DAILY_DAYS + 10)
+    today = START + timedelta(days=DAILY_DAYS + 9)
+    assert min(history.daily) == today - timedelta(days=DAILY_DAYS)
+    assert len(history.daily) == DAILY_DAYS + 1
+    # days 0..8 aged out: weeks of Jan 1 (days 0-6) and Jan 8 (days 7-8), all in January
+    assert {week: bucket[2:] for week, bucket in history.weekly.items()} == {
+        START: [7, 21.0, 0.0, 6.0],
+        START + timedelta(weeks=1): [2, 15.0, 7.0, 8.0],
+    }
+    last_day, last, count, total, low, high = history.monthly[2024 * 12]
+    assert (last_day, last, count, total, low, high) == (START + timedelta(days=8), _snapshot(8), 9, 36.0, 0.0, 8.0)
+
+
+def test_weeks_are_dropped_but_months_kept():
+    days = DAILY_DAYS + 7 * (WEEKLY_WEEKS + 4)
+    history = _history(days)
+    today = START + timedelta(days=days - 1)
+    assert min(history.weekly) >= today - timedelta(days=today.weekday(), weeks=WEEKLY_WEEKS)
+    assert len(history.weekly) <= WEEKLY_WEEKS + 1
+    assert min(history.monthly) == 2024 * 12
+    # every aged-out day is still counted once in its month
+    assert sum(bucket[2] for bucket in history.monthly.values()) == days - len(history.daily)
+
+
+def test_series_uses_the_finest_tier_oldest_first():
+    days = DAILY_DAYS + 7 * (WEEKLY_WEEKS + 4)
+    history = _history(days)
+    points = history.series()
+    assert [d for d, _ in points] == sorted(d for d, _ in points)
+    assert len({d for d, _ in points}) == len(points)
+    # each point is the last value of its bucket: day number == net worth
+    assert all(net == (day - START).days for day, net in points)
+
+    daily_from = min(history.daily)
+    weekly_from = min(bucket[0] for bucket in history.weekly.values())
+    assert points[-len(history.daily):] == sorted((d, s.net) for d, s in history.daily.items())
+    monthly = [d for d, _ in points if d < weekly_from]
+    assert monthly and set(monthly) <= {bucket[0] for bucket in history.monthly.values()}
+    assert all(d < daily_from for d, _ in points[: -len(history.daily)])
+
+    since = daily_from - timedelta(days=30)
+    assert history.series(since) == [p for p in points if p[0] >= since]
+    assert NetWorthHistory().series() == []
+
+
+@pytest.fixture
+def puts(monkeypatch):
+    calls = []
+    real_put = storage.put
+
+    def put(namespace, key, value):
+        calls.append((namespace, key))
+        return real_put(namespace, key, value)
+
+    monkeypatch.setattr(storage, "put", put)
+    return calls
+
+
+def test_only_verified_users_are_stored(puts):
+    ss = State(user={"id": "anon@example.com", "email": "anon@example.com"})
+    record_snapshot(ss, _snapshot(10), day=START)
+    record_snapshot(ss, _snapshot(20), day=START + timedelta(days=1))
+    assert puts == []
+    assert networth_history(ss).latest() == _snapshot(20)  # kept for the session
+
+    owner = "networth-user"
+    ss = State(user={"id": owner, "verified": True})
+    record_snapshot(ss, _snapshot(30), day=START)
+    record_snapshot(ss, _snapshot(30), day=START)
+    assert puts == [(NAMESPACE, owner)]
+    assert storage.get(NAMESPACE, owner).latest() == _snapshot(30)
+    # a new session starts from the stored history
+    assert networth_history(State(user={"id": owner, "verified": True})).latest() == _snapshot(30)
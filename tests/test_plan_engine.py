@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import pytest
+
+import plan_engine
+import session_store
+import storage
+from emergency import emergency_target
+from profile import profile_metrics
+
+from conftest import State
+
+OWNER = "planner@example.com"
+
+
+@pytest.fixture
+def stored_planner():
+    today = date.today()
+    transactions = [
+        {"date": today - timedelta(days=days), "amount": -(40.0 + days % 7 * 15), "note": "groceries"}
+        for days in range(1, 200, 3)
+    ]
+    state = State(
+        profile={
+            "country": "CA",
+            "income": 6000.0,
+            "expenses": 3000.0,
+            "savings": 5000.0,
+            "debt": 0.0,
+            "emergency_basis": "wallets",
+            "emergency_percentile": 90,
+        },
+        next_step={"primary_goal": "Build an emergency fund", "monthly_amount": 500.0, "target_amount": 0.0},
+        wallets=[{"id": "main", "name": "Main", "transactions": transactions}],
+    )
+    for key in ("profile", "next_step", "wallets"):
+        session_store.write(OWNER, key, state[key], 0)
+    yield state
+    session_store._conn().execute("DELETE FROM session_keys WHERE owner = ?", (OWNER,))
+    storage.delete(plan_engine.NAMESPACE, OWNER)
+
+
+def test_pregenerated_plan_matches_the_tab_for_wallet_based_profiles(stored_planner):
+    state = stored_planner
+    target, from_spending = emergency_target(state, profile_metrics(state))
+    assert from_spending
+
+    assert plan_engine._pregenerate_one(OWNER)
+    inputs, _ = storage.get(plan_engine.NAMESPACE, OWNER)
+    # the key the Next step tab builds (nextstep.py)
+    expected = plan_engine.plan_inputs(
+        state.profile, state.next_step, plan_engine.get_currency("CA"), target
+    )
+    assert inputs == expected
+    assert inputs.emergency_target is not None
@@ -0,0 +1,74 @@
+import pytest
+
+from profile import FIELDS, METRICS_KEY, ProfileModel, apply_profile_diff, profile_metrics
+
+from conftest import State
+
+
+@pytest.fixture
+def ss():
+    profile = ProfileModel(country="CA", income=6000.0, expenses=3500.0, savings=8000.0, debt=2000.0).to_dict()
+    profile["has_completed_profile"] = True
+    return State(profile=profile)
+
+
+def test_unchanged_profile_has_an_empty_diff(ss):
+    before = dict(ss.profile)
+    metrics = profile_metrics(ss)
+    diff = ProfileModel.from_profile(ss.profile).diff(ss.profile)
+    assert diff == {}
+    assert apply_profile_diff(ss, diff) is False
+    assert ss.profile == before
+    assert ss[METRICS_KEY] is metrics
+
+
+def test_diff_lists_only_changed_and_missing_fields(ss):
+    model = ProfileModel.from_profile(ss.profile)
+    model.age = 40
+    model.income = 6500.0
+    profile = dict(ss.profile)
+    del profile["risk_comfort"]
+    assert model.diff(profile) == {"age": 40, "income": 6500.0, "risk_comfort": 3}
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"age": 17},
+        {"age": 66},
+        {"income": -1.0},
+        {"income": "lots"},
+        {"country": "US"},
+        {"employment_status": "Astronaut"},
+        {"risk_comfort": 6},
+        {"emergency_percentile": 10},
+    ],
+)
+def test_validation_rejects_bad_values(values):
+    with pytest.raises(ValueError):
+        ProfileModel(**values)
+
+
+def test_stored_profile_falls_back_to_defaults():
+    model = ProfileModel.from_profile({"age": 200, "income": "12000", "country": "US"})
+    defaults = {f.name: f.default for f in FIELDS}
+    assert (model.age, model.income, model.country) == (defaults["age"], 12000.0, defaults["country"])
+
+
+def test_only_financial_changes_drop_the_metrics(ss):
+    metrics = profile_metrics(ss)
+    assert apply_profile_diff(ss, {"age": 40, "money_feeling": "Mostly okay"}) is False
+    assert profile_metrics(ss) is metrics
+
+    assert apply_profile_diff(ss, {"expenses": 4000.0}) is True
+    assert METRICS_KEY not in ss
+    updated = profile_metrics(ss)
+    assert updated is not metrics
+    assert (updated["expenses"], updated["cashflow"]) == (4000.0, 2000.0)
+
+
+def test_replaced_profile_recomputes_the_metrics(ss):
+    metrics = profile_metrics(ss)
+    ss.profile = dict(ss.profile, income=9000.0)
+    assert profile_metrics(ss)["income"] == 9000.0
+    assert profile_metrics(ss) is not metrics
@@ -0,0 +1,62 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from recurring import SCHEDULES, count_occurrences, expand_rules, nth_occurrence, occurrences, recurring_totals
+
+
+def _walk(rule, start_date, end_date):
+    """Occurrences in the period, one step at a time from the rule's start."""
+    days, i = [], 0
+    while True:
+        day = nth_occurrence(rule, i)
+        if day > end_date or (rule.get("end") and day > rule["end"]):
+            return days
+        if day >= start_date:
+            days.append(day)
+        i += 1
+
+
+def test_closed_form_counts_match_a_walk():
+    rng = random.Random(11)
+    for _ in range(500):
+        start = date(2024, 1, 1) + timedelta(days=rng.randint(0, 700))
+        end = start + timedelta(days=rng.randint(0, 900)) if rng.random() < 0.3 else None
+        rule = {"id": "r", "schedule": rng.choice(list(SCHEDULES)), "start": start, "end": end, "amount": -10.0}
+        lo = date(2024, 1, 1) + timedelta(days=rng.randint(0, 1000))
+        hi = lo + timedelta(days=rng.randint(0, 500))
+        expected = _walk(rule, lo, hi)
+        assert count_occurrences(rule, lo, hi) == len(expected), (rule, lo, hi)
+        assert list(occurrences(rule, lo, hi)) == expected
+
+
+@pytest.mark.parametrize(
+    "schedule, start, i, expected",
+    [
+        ("monthly", date(2026, 1, 31), 1, date(2026, 2, 28)),
+        ("monthly", date(2026, 1, 31), 2, date(2026, 3, 31)),
+        ("monthly", date(2026, 11, 30), 3, date(2027, 2, 28)),
+        ("yearly", date(2024, 2, 29), 1, date(2025, 2, 28)),
+        ("biweekly", date(2026, 1, 2), 2, date(2026, 1, 30)),
+    ],
+)
+def test_nth_occurrence_clamps_short_months(schedule, start, i, expected):
+    assert nth_occurrence({"schedule": schedule, "start": start}, i) == expected
+
+
+def test_totals_match_expanded_rows():
+    rules = [
+        {"id": "rent", "schedule": "monthly", "start": date(2026, 1, 1), "end": None,
+         "amount": -1200.0, "category": "Rent", "note": "Flat"},
+        {"id": "pay", "schedule": "biweekly", "start": date(2026, 1, 9), "end": date(2026, 6, 30),
+         "amount": 2100.0, "category": "Salary", "note": ""},
+    ]
+    lo, hi = date(2026, 3, 1), date(2026, 8, 31)
+    rows = list(expand_rules(rules, lo, hi))
+    balance, income, expenses, count = recurring_totals(rules, lo, hi)
+    assert count == len(rows) == 6 + 9
+    assert balance == pytest.approx(sum(r["amount"] for r in rows))
+    assert income == pytest.approx(9 * 2100.0)
+    assert expenses == pytest.approx(6 * 1200.0)
+    assert rows[0]["note"] == "↻ Flat" and rows[-1]["recurring"] in ("rent", "pay")
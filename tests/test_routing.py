@@ -0,0 +1,83 @@
+import os
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import routing
+
+from conftest import State
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def url(monkeypatch):
+    """st.query_params as a plain dict."""
+    params = {}
+    monkeypatch.setattr(routing, "st", SimpleNamespace(query_params=params))
+    return params
+
+
+def test_deep_link_restores_the_tab():
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.query_params.update(
+        {"screen": "main", "tab": "wealthflow", "view": "wallet", "wallet": "main", "from": "2026-03-01", "to": "2026-03-31"}
+    )
+    at.session_state["user"] = {"email": "link@example.com", "name": "link"}
+    at.run()
+    assert not at.exception
+    assert (at.session_state["screen"], at.session_state["main_tab"]) == ("main", "wealthflow")
+    assert at.session_state["wealthflow_view"] == "wallet"
+    assert at.session_state["wealthflow_period"] == (date(2026, 3, 1), date(2026, 3, 31))
+
+
+def test_bad_values_in_the_url_are_ignored(url):
+    url.update({"screen": "admin", "tab": "secret", "from": "2026-04-01", "to": "2026-03-01"})
+    ss = State(screen="landing")
+    routing.route_from_url(ss)
+    assert ss == State(screen="landing", _route=ss[routing.SEEN_KEY])
+
+
+def test_a_published_route_is_not_read_back(url):
+    ss = State(screen="main", main_tab="next")
+    routing.publish_route(ss)
+    assert url == {"screen": "main", "tab": "next"}
+
+    # st.rerun() replays an older query string: not navigation
+    ss.main_tab = "home"
+    routing.publish_route(ss)
+    url.clear()
+    url.update({"screen": "main", "tab": "next"})
+    routing.route_from_url(ss)
+    assert ss.main_tab == "home"
+
+    # a URL we never wrote is
+    url["tab"] = "wealthflow"
+    routing.route_from_url(ss)
+    assert ss.main_tab == "wealthflow"
+    # and reading it again costs nothing
+    ss.main_tab = "home"
+    routing.route_from_url(ss)
+    assert ss.main_tab == "home"
+
+
+def test_only_recent_routes_are_remembered(url):
+    ss = State(screen="main", main_tab="home")
+    routing.publish_route(ss)
+    routing.publish_route(ss)
+    assert ss[routing.SEEN_KEY]["published"] == [{"screen": "main", "tab": "home"}]
+
+    screens = ["landing", "login", "signup", "country_profile"]
+    for screen in screens:
+        ss.screen = screen
+        routing.publish_route(ss)
+    published = ss[routing.SEEN_KEY]["published"]
+    assert published == [{"screen": s} for s in screens[-routing.RECENT_ROUTES:]]
+
+    # the oldest route has dropped out, so going back to it is navigation again
+    url.clear()
+    url.update({"screen": "main", "tab": "home"})
+    routing.route_from_url(ss)
+    assert (ss.screen, ss.main_tab) == ("main", "home")
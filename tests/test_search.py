@@ -0,0 +1,111 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from search import TransactionIndex, tokenize
+
+START = date(2026, 1, 1)
+NOTES = ["groceries", "grocery store", "gas station", "gym", "rent", "netflix", "coffee shop", "salary", "refund 42"]
+CATEGORIES = ["Groceries", "Transport", "Fun", "Rent", "General", " eating out "]
+
+
+def _txn(rng):
+    return {
+        "date": START + timedelta(days=rng.randrange(120)),
+        "amount": rng.choice((-1, 1)) * rng.randrange(1, 300) / rng.choice((1, 4)),
+        "category": rng.choice(CATEGORIES),
+        "note": " ".join(rng.sample(NOTES, rng.randint(0, 2))),
+    }
+
+
+def _reference(rows, text="", category=None, amount_range=(None, None), period=None):
+    """Every matching transaction, newest first (later rows first on a tie), by brute force."""
+    words = tokenize(text)
+    low, high = amount_range
+    found = []
+    for pos, txn in enumerate(rows):
+        cat = (txn.get("category") or "General").strip()
+        tokens = tokenize(f"{txn.get('note', '')} {cat}")
+        if any(word not in tokens for word in words[:-1]):
+            continue
+        if words and not any(token.startswith(words[-1]) for token in tokens):
+            continue
+        if category and cat.lower() != category.strip().lower():
+            continue
+        if low is not None and txn["amount"] < low or high is not None and txn["amount"] > high:
+            continue
+        if period is not None and not period[0] <= txn["date"] <= period[1]:
+            continue
+        found.append(pos)
+    found.sort(key=lambda pos: (rows[pos]["date"], pos), reverse=True)
+    return [rows[pos] for pos in found]
+
+
+def _everything(index, page_size, **query):
+    total, first = index.search(page_size=page_size, **query)
+    results, page = list(first), 1
+    while len(results) < total:
+        _, more = index.search(page=page, page_size=page_size, **query)
+        assert more
+        results += more
+        page += 1
+    assert index.search(page=page, page_size=page_size, **query) == (total, [])
+    return total, results
+
+
+QUERIES = [
+    {},
+    {"text": "gro"},
+    {"text": "GROCERY st"},
+    {"text": "gas station"},
+    {"text": "refund 4"},
+    {"text": "eating"},
+    {"text": "nothing"},
+    {"category": "Groceries"},
+    {"category": "eating out"},
+    {"category": "Unknown"},
+    {"amount_range": (-50.0, 0.0)},
+    {"amount_range": (None, -100.0)},
+    {"amount_range": (100.0, None)},
+    {"text": "g", "amount_range": (-75.5, 75.5)},
+    {"text": "coffee", "category": "Fun", "amount_range": (-200.0, None)},
+    {"period": (START + timedelta(days=30), START + timedelta(days=59))},
+    {"text": "rent", "period": (START, START + timedelta(days=10)), "amount_range": (None, 0.0)},
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_brute_force(query):
+    rng = random.Random(7)
+    rows = [_txn(rng) for _ in range(400)]
+    index = TransactionIndex(rows)
+    expected = _reference(rows, **query)
+    for page_size in (7, 50, 1000):
+        total, results = _everything(index, page_size, **query)
+        assert total == len(expected)
+        assert results == expected
+
+
+def test_added_rows_are_merged_into_the_amount_index():
+    rng = random.Random(11)
+    rows = [_txn(rng) for _ in range(100)]
+    index = TransactionIndex(rows)
+    query = {"amount_range": (-40.0, 40.0)}
+    for _ in range(3):
+        for _ in range(25):
+            txn = _txn(rng)
+            rows.append(txn)
+            index.add(txn)
+        assert index.matches(rows)
+        assert _everything(index, 10, **query)[1] == _reference(rows, **query)
+        assert _everything(index, 10, text="s", **query)[1] == _reference(rows, text="s", **query)
+
+
+def test_pages_are_stable_for_equal_dates():
+    rows = [{"date": START, "amount": -1.0, "category": "General", "note": f"same day {i}"} for i in range(23)]
+    index = TransactionIndex(rows)
+    total, results = _everything(index, 5, text="same")
+    assert total == 23
+    assert results == rows[::-1]
+    assert index.search(text="same", page=2, page_size=5) == index.search(text="same", page=2, page_size=5)
@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import pytest
+
+import session_store
+import storage
+from session_memory import HISTORY_NAMESPACE, restore_wallet_history, spill_cold_history
+
+from conftest import State
+
+OWNER = "memory-user"
+START = date(2026, 1, 1)
+CUTOFF = date(2026, 3, 1)
+
+
+@pytest.fixture
+def ss():
+    transactions = [
+        {"date": START + timedelta(days=days), "amount": -10.0, "category": "General", "note": ""}
+        for days in range(0, 90, 3)
+    ]
+    state = State(
+        user={"id": OWNER, "verified": True, "email": "m@example.com"},
+        wealthflow_period=(CUTOFF, CUTOFF + timedelta(days=30)),
+        wallets=[{"id": "w1", "name": "Main", "transactions": transactions}],
+    )
+    session_store._attach(state, OWNER, None, keep_local=("wallets",))
+    session_store.save_session(state)
+    yield state
+    session_store._conn().execute("DELETE FROM session_keys WHERE owner = ?", (OWNER,))
+
+
+def _stored_wallet():
+    return session_store.read(OWNER, ["wallets"])["wallets"][1][0]
+
+
+def _blob(key):
+    return storage.get(HISTORY_NAMESPACE, key)
+
+
+def test_spill_is_saved_with_the_wallets(ss):
+    moved = spill_cold_history(ss)
+    assert moved == 20
+    session_store.save_session(ss)
+
+    stored = _stored_wallet()
+    assert stored["archive_key"] == ss.wallets[0]["archive_key"]
+    assert len(stored["transactions"]) == 10 and stored["archived_count"] == 20
+    assert len(_blob(stored["archive_key"])) == 20
+
+
+def test_restore_deletes_the_blob_only_after_saving(ss):
+    spill_cold_history(ss)
+    session_store.save_session(ss)
+    key = ss.wallets[0]["archive_key"]
+
+    assert restore_wallet_history(ss, ss.wallets[0], START)
+    assert _blob(key) is not None  # the stored wallets still point at it
+    session_store.save_session(ss)
+
+    stored = _stored_wallet()
+    assert "archive_key" not in stored and len(stored["transactions"]) == 30
+    assert _blob(key) is None
+
+
+def test_a_second_spill_replaces_the_blob_after_saving(ss):
+    spill_cold_history(ss)
+    session_store.save_session(ss)
+    first = ss.wallets[0]["archive_key"]
+
+    ss.wealthflow_period = (CUTOFF + timedelta(days=15), CUTOFF + timedelta(days=30))
+    spill_cold_history(ss)
+    second = ss.wallets[0]["archive_key"]
+    assert second != first and _blob(first) is not None
+    session_store.save_session(ss)
+
+    assert _stored_wallet()["archive_key"] == second
+    assert _blob(first) is None and len(_blob(second)) == 25
+
+
+def test_restore_keeps_the_blob_when_another_worker_wins(ss):
+    spill_cold_history(ss)
+    session_store.save_session(ss)
+    key = ss.wallets[0]["archive_key"]
+    # another worker saves the (still spilled) wallets first
+    version = session_store.versions(OWNER)["wallets"]
+    session_store.write(OWNER, "wallets", [_stored_wallet()], version)
+
+    restore_wallet_history(ss, ss.wallets[0], START)
+    assert session_store.save_session(ss) == ["wallets"]
+    assert ss.wallets[0]["archive_key"] == key
+    assert len(_blob(key)) == 20
+
+
+def test_restore_without_a_store_deletes_right_away():
+    key = "local:w1"
+    storage.put(HISTORY_NAMESPACE, key, [{"date": START, "amount": -1.0, "category": "General", "note": ""}])
+    wallet = {"id": "w1", "transactions": [], "archive_key": key, "archived_count": 1, "archived_before": CUTOFF}
+    assert restore_wallet_history(State(), wallet, START)
+    assert len(wallet["transactions"]) == 1 and _blob(key) is None
@@ -0,0 +1,154 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import session_store
+import supabase_client
+from goals import GoalRegistry, goal_registry
+
+from conftest import State
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+VICTIM = "victim@example.com"
+OWNER = "store-user"
+
+
+@pytest.fixture
+def stored_victim():
+    wallets = [{"id": "main", "name": "Victim's wallet", "transactions": []}]
+    session_store.write(VICTIM, "wallets", wallets, 0)
+    yield
+    session_store._conn().execute("DELETE FROM session_keys WHERE owner = ?", (VICTIM,))
+
+
+@pytest.fixture
+def first():
+    """A stored session for OWNER, as if it had just logged in."""
+    state = State(
+        profile={"name": "Ana"},
+        wallets=[{"id": "main", "name": "Main", "transactions": []}],
+        goal_plans=[],
+    )
+    session_store._attach(state, OWNER, None, keep_local=session_store.STORED_KEYS)
+    session_store.save_session(state)
+    yield state
+    session_store._conn().execute("DELETE FROM session_keys WHERE owner = ?", (OWNER,))
+
+
+def _second_window() -> State:
+    state = State()
+    session_store._attach(state, OWNER, None, keep_local=())
+    return state
+
+
+def _log_in(email: str) -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.session_state["screen"] = "login"
+    at.run()
+    at.text_input[0].input(email)
+    at.text_input[1].input("anything")
+    at.button[0].click()
+    at.run()
+    return at
+
+
+def test_placeholder_sign_in_does_not_load_stored_data(stored_victim):
+    at = _log_in(VICTIM)
+    assert not at.exception
+    assert [w["name"] for w in at.session_state["wallets"]] != ["Victim's wallet"]
+    assert session_store.META_KEY not in at.session_state
+    assert session_store.LEGACY_TOKEN_PARAM not in at.query_params
+
+
+def test_verified_user_is_stored_under_user_id(monkeypatch, stored_victim):
+    def sign_in(email, password):
+        return True, {"email": email, "name": "v", "id": "user-123", "verified": True}
+
+    monkeypatch.setattr(supabase_client, "sign_in", sign_in)
+    at = _log_in(VICTIM)
+    assert not at.exception
+    meta = at.session_state[session_store.META_KEY]
+    assert meta["owner"] == "user-123"
+    # keyed by id, so the email's data is not picked up and the token stays out of the URL
+    assert [w["name"] for w in at.session_state["wallets"]] != ["Victim's wallet"]
+    assert session_store.LEGACY_TOKEN_PARAM not in at.query_params
+    assert session_store.owner_for_token(meta["token"]) == "user-123"
+
+
+def test_legacy_token_in_url_is_ignored(stored_victim):
+    token = session_store.new_token(VICTIM)
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.query_params[session_store.LEGACY_TOKEN_PARAM] = token
+    at.run()
+    assert not at.exception
+    assert session_store.META_KEY not in at.session_state
+    assert session_store.LEGACY_TOKEN_PARAM not in at.query_params
+
+
+def _age_token(token, seconds):
+    session_store._conn().execute("UPDATE session_tokens SET created = created - ? WHERE token = ?", (seconds, token))
+
+
+def test_tokens_expire_on_the_server():
+    token = session_store.new_token(OWNER)
+    _age_token(token, session_store.TOKEN_MAX_AGE - 60)
+    assert session_store.owner_for_token(token) == OWNER
+    _age_token(token, 120)
+    assert session_store.owner_for_token(token) is None
+
+    # expired rows are cleared on the next login / logout
+    fresh = session_store.new_token(OWNER)
+    count = "SELECT COUNT(*) FROM session_tokens WHERE token IN (?, ?)"
+    assert session_store._conn().execute(count, (token, fresh)).fetchone()[0] == 1
+    session_store.drop_token(fresh)
+    assert session_store.owner_for_token(fresh) is None
+
+
+def test_second_writer_loses_and_takes_the_first_value(first):
+    second = _second_window()
+    first.profile = {"name": "Ana B."}
+    second.profile = {"name": "Ana C."}
+
+    assert session_store.save_session(first) == []
+    assert session_store.save_session(second) == ["profile"]
+    assert second.profile == {"name": "Ana B."}
+    assert second[session_store.META_KEY]["conflicts"] == ["profile"]
+    # the loser is now on the winning version and can write again
+    second.profile = {"name": "Ana D."}
+    assert session_store.save_session(second) == []
+    assert session_store.read(OWNER, ["profile"])["profile"] == (3, {"name": "Ana D."})
+
+
+def test_refresh_reads_only_the_keys_that_changed(first, monkeypatch):
+    second = _second_window()
+    first.profile = {"name": "Ana B."}
+    session_store.save_session(first)
+
+    fetched = []
+    read = session_store.read
+    monkeypatch.setattr(session_store, "read", lambda owner, keys: fetched.append(keys) or read(owner, keys))
+    assert session_store._refresh(second, second[session_store.META_KEY]) == ["profile"]
+    assert fetched == [["profile"]]
+    assert second.profile == {"name": "Ana B."}
+    assert session_store._refresh(second, second[session_store.META_KEY]) == []
+
+
+def test_wallets_are_saved_only_when_marked_dirty(first):
+    versions = session_store.versions(OWNER)
+    first.wallets[0]["name"] = "Everyday"
+    session_store.save_session(first)
+    assert session_store.versions(OWNER) == versions
+
+    session_store.mark_dirty(first, "wallets")
+    session_store.save_session(first)
+    version, wallets = session_store.read(OWNER, ["wallets"])["wallets"]
+    assert version == versions["wallets"] + 1 and wallets[0]["name"] == "Everyday"
+    assert "wallets" not in first[session_store.META_KEY]["dirty"]
+
+
+def test_converted_goal_list_is_saved(first):
+    goal_registry(first)
+    session_store.save_session(first)
+    assert isinstance(session_store.read(OWNER, ["goal_plans"])["goal_plans"][1], GoalRegistry)
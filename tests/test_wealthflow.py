@@ -0,0 +1,83 @@
+import os
+from datetime import date
+
+from streamlit.testing.v1 import AppTest
+
+from anomalies import wallet_anomalies
+from wealthflow import add_transaction, add_transactions, format_transaction_rows
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _open_wallet() -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.session_state["screen"] = "login"
+    at.run()
+    at.text_input[0].input("wallet@example.com")
+    at.text_input[1].input("anything")
+    at.button[0].click()
+    at.run()
+    at.session_state["main_tab"] = "wealthflow"
+    at.session_state["wealthflow_view"] = "wallet"
+    at.run()
+    assert not at.exception
+    return at
+
+
+def _fare(day: int) -> dict:
+    return {"date": date(2026, 4, day), "amount": -3.35, "note": "PRESTO FARE", "category": "General"}
+
+
+def test_near_duplicates_of_an_import_are_asked_about():
+    at = _open_wallet()
+    wallet = at.session_state["wallets"][0]
+    before = len(wallet["transactions"])
+    at.session_state["pending_import"] = {
+        "wallet": wallet["id"],
+        "near": [(_fare(1), date(2026, 3, 31)), (_fare(2), date(2026, 3, 30))],
+    }
+    at.run()
+    assert any("2 imported transactions look like" in w.value for w in at.warning)
+
+    at.checkbox(key="pending_import_1").check()
+    at.button(key="FormSubmitter:pending_import_form-Add ticked").click()
+    at.run()
+    assert not at.exception
+    assert "pending_import" not in at.session_state
+    added = at.session_state["wallets"][0]["transactions"][before:]
+    assert [t["date"] for t in added] == [date(2026, 4, 2)]
+
+
+def test_unusual_charge_keeps_the_flag_it_was_added_with():
+    ss = {}
+    wallet = {"id": "w1", "transactions": []}
+
+    def charge(amount):
+        return {"date": date(2026, 5, 1), "amount": amount, "note": "", "category": "Groceries"}
+
+    add_transactions(ss, wallet, [charge(-50.0) for _ in range(10)])
+    big = charge(-400.0)
+    add_transaction(ss, wallet, big)
+    assert big["flag"] == "⚠ 8.0× usual"
+
+    # a run of big charges moves the baseline, but the first one stays flagged
+    add_transactions(ss, wallet, [charge(-400.0) for _ in range(60)])
+    assert wallet_anomalies(ss, wallet).flag(big) == ""
+    rows = format_transaction_rows(wallet["transactions"], "$")
+    assert rows[10]["Check"] == "⚠ 8.0× usual" and rows[0]["Check"] == ""
+
+
+def test_unverified_profile_saves_stay_out_of_the_cohorts(monkeypatch):
+    import cohorts
+
+    recorded = []
+    monkeypatch.setattr(cohorts, "record_profile", lambda owner, profile: recorded.append(owner))
+    at = _open_wallet()  # placeholder sign-in: not verified
+    at.session_state["screen"] = "country_profile"
+    at.run()
+    next(b for b in at.button if b.label.startswith("Save")).click()
+    at.run()
+    assert not at.exception
+    assert at.session_state["screen"] == "main"
+    assert recorded == []
@@ -1,6 +1,23 @@
 import streamlit as st
 from datetime import date
 
+from metrics import timed
+from session_memory import restore_wallet_history
+from session_store import mark_dirty
+from forecast import HORIZONS, forecast, observe_transaction, wallet_model
+from logic import compute_wallet_stats
+from recurring import SCHEDULES, add_rule, expand_rules, remove_rule
+from search import PAGE_SIZE, index_transaction, wallet_index
+from categorize import categorize, categorize_batch, learn_override
+from importer import read_statement
+from dedupe import DATE_WINDOW, record_transaction, wallet_duplicates
+from export import render_wallet_export
+from budgets import observe_spend, render_budgets
+from emergency import observe_spending
+from anomalies import observe_anomaly, wallet_anomalies
+
+ALL_CATEGORIES = "All categories"
+
 
 def get_currency(country_code: str) -> str:
     if country_code == "IN":
@@ -15,25 +32,59 @@ def get_wallet_by_id(wallets, wallet_id):
     return None
 
 
-def compute_wallet_stats(wallet, start_date, end_date):
-    txns = [
-        t
-        for t in wallet["transactions"]
-        if start_date <= t["date"] <= end_date
+def format_transaction_rows(transactions, currency):
+    """
+    Rows for the transactions table (display strings only). A "Check"
+    column is added if any row was flagged as unusual when it was added.
+    """
+    rows = [
+        {
+            "Date": t["date"].strftime("%b %d, %Y"),
+            "Category": t["category"],
+            "Note": t["note"],
+            "Amount": f"{currency}{t['amount']:,.2f}",
+        }
+        for t in transactions
     ]
-    balance = sum(t["amount"] for t in txns)
-    income = sum(t["amount"] for t in txns if t["amount"] > 0)
-    expenses = sum(-t["amount"] for t in txns if t["amount"] < 0)
-    change = balance
-    return {
-        "balance": balance,
-        "income": income,
-        "expenses": expenses,
-        "change": change,
-        "transactions": txns,
-    }
+    notes = [t.get("flag", "") for t in transactions]
+    if any(notes):
+        for row, note in zip(rows, notes):
+            row["Check"] = note
+    return rows
+
+
+def add_transactions(ss, wallet, txns):
+    """
+    Append to the wallet and keep its derived indexes in step. A charge
+    that is unusual against the history before it keeps that note in
+    txn["flag"]; later charges do not rescore it.
+    """
+    for txn in txns:
+        unusual = wallet_anomalies(ss, wallet).flag(txn)
+        if unusual:
+            txn["flag"] = unusual
+        wallet["transactions"].append(txn)
+        observe_transaction(ss, wallet, txn)
+        index_transaction(ss, wallet, txn)
+        record_transaction(ss, wallet, txn)
+        observe_spend(ss, wallet, txn)
+        observe_spending(ss, txn)
+        observe_anomaly(ss, wallet, txn)
+    mark_dirty(ss, "wallets")
+
+
+def add_transaction(ss, wallet, txn):
+    add_transactions(ss, wallet, [txn])
+
+
+def import_transactions(ss, wallet, txns):
+    """Categorize a parsed statement in bulk and add it. Returns how many were categorized."""
+    categorized = categorize_batch(txns, ss.get("category_overrides"))
+    add_transactions(ss, wallet, txns)
+    return categorized
 
 
+@timed()
 def render_wealthflow_tab() -> None:
     ss = st.session_state
     profile = ss.profile
@@ -51,9 +102,10 @@ def render_wealthflow_tab() -> None:
 
     wallets = ss.wallets
     wallet = get_wallet_by_id(wallets, ss.selected_wallet_id) or wallets[0]
-    stats = compute_wallet_stats(wallet, start_date, end_date)
+    restore_wallet_history(ss, wallet, start_date)
 
     if ss.wealthflow_view == "overview":
+        stats = compute_wallet_stats(wallet, start_date, end_date)
         col_wallet, col_buttons = st.columns([2, 1])
         with col_wallet:
             balance_color = "#16a34a" if stats["balance"] >= 0 else "#ef4444"
@@ -85,10 +137,8 @@ def render_wealthflow_tab() -> None:
         with c4:
             st.metric("Period income", f"{currency}{stats['income']:,.2f}")
 
-        st.caption(
-            "Later this view can show charts for changes over days/weeks and category donuts. "
-            "For now it’s a simple snapshot."
-        )
+        render_budgets(ss, currency, end_date)
+        render_balance_forecast(ss, wallet, currency)
 
     else:
         if st.button("← Back to wallets", use_container_width=True):
@@ -99,7 +149,12 @@ def render_wealthflow_tab() -> None:
 
         with st.form("add_transaction_form"):
             tx_date = st.date_input("Date", value=date.today())
-            category = st.text_input("Category", value="General")
+            category = st.text_input(
+                "Category",
+                value="",
+                placeholder="Automatic",
+                help="Leave empty to pick one from the note. A category you type is remembered for this note.",
+            )
             note = st.text_input("Note", value="")
             amount = st.number_input(
                 f"Amount ({currency}) – positive for income, negative for expense",
@@ -109,28 +164,263 @@ def render_wealthflow_tab() -> None:
             submitted = st.form_submit_button("Add transaction")
 
         if submitted:
-            wallet["transactions"].append(
-                {
-                    "date": tx_date,
-                    "category": category or "General",
-                    "note": note or "",
-                    "amount": float(amount),
-                }
-            )
-            st.success("Transaction added.")
-            stats = compute_wallet_stats(wallet, start_date, end_date)
+            category = category.strip()
+            if not category:
+                category = categorize(note, ss.category_overrides)
+            elif learn_override(ss.category_overrides, note, category):
+                mark_dirty(ss, "category_overrides")
+            txn = {
+                "date": tx_date,
+                "category": category,
+                "note": note or "",
+                "amount": float(amount),
+            }
+            match = wallet_duplicates(ss, wallet).find(txn)
+            if match is None:
+                add_transaction(ss, wallet, txn)
+                st.success(f"Transaction added to {category}.")
+                if txn.get("flag"):
+                    st.warning(f"{txn['flag']} for {category} – worth a second look.")
+            else:
+                ss.pending_duplicate = {"wallet": wallet["id"], "txn": txn, "match": match}
+
+        render_pending_duplicate(ss, wallet, currency)
+        render_statement_import(ss, wallet, currency)
+
+        render_recurring_rules(wallet, currency)
 
         st.markdown("##### Transactions in this period")
-        if stats["transactions"]:
-            rows = [
-                {
-                    "Date": t["date"].strftime("%b %d, %Y"),
-                    "Category": t["category"],
-                    "Note": t["note"],
-                    "Amount": f"{currency}{t['amount']:,.2f}",
-                }
-                for t in stats["transactions"]
-            ]
-            st.table(rows)
-        else:
-            st.caption("No transactions in this period yet.")
+        render_transaction_search(ss, wallet, currency, (start_date, end_date))
+
+        rules = wallet.get("recurring")
+        upcoming = list(expand_rules(rules, start_date, end_date)) if rules else []
+        if upcoming:
+            st.markdown("##### Recurring in this period")
+            upcoming.sort(key=lambda t: t["date"], reverse=True)
+            st.table(format_transaction_rows(upcoming, currency))
+
+        render_wallet_export(wallet, (start_date, end_date))
+
+
+def render_pending_duplicate(ss, wallet, currency):
+    """Ask before adding a transaction that looks like one already in the wallet."""
+    pending = ss.get("pending_duplicate")
+    if not pending or pending["wallet"] != wallet["id"]:
+        return
+    txn = pending["txn"]
+    kind, day = pending["match"]
+    same = "on the same day" if kind == "exact" else f"on {day:%b %d, %Y}"
+    st.warning(
+        f"{wallet['name']} already has {currency}{txn['amount']:,.2f} for “{txn['note'] or txn['category']}” "
+        f"{same}. Add it again?"
+    )
+    c1, c2 = st.columns(2)
+    with c1:
+        if st.button("Add anyway", use_container_width=True):
+            add_transaction(ss, wallet, txn)
+            del ss.pending_duplicate
+            st.rerun()
+    with c2:
+        if st.button("Don't add", use_container_width=True):
+            del ss.pending_duplicate
+            st.rerun()
+
+
+def render_statement_import(ss, wallet, currency):
+    with st.expander("Import a bank statement (CSV)"):
+        with st.form("import_statement_form", clear_on_submit=True):
+            upload = st.file_uploader(
+                "Statement",
+                type=["csv"],
+                help="Needs a date column, a description and an amount (or debit / credit) column.",
+            )
+            skip_duplicates = st.checkbox(
+                "Skip transactions already in this wallet",
+                value=True,
+                help=(
+                    "Same amount and description on the same day are skipped; "
+                    f"within {DATE_WINDOW} days, you are asked first."
+                ),
+            )
+            submitted = st.form_submit_button("Import")
+
+        if submitted and upload is not None:
+            txns, errors = read_statement(upload)
+            exact, near = [], []
+            if skip_duplicates:
+                txns, exact, near = wallet_duplicates(ss, wallet).split_batch(txns)
+            if txns:
+                categorized = import_transactions(ss, wallet, txns)
+                st.success(f"Imported {len(txns):,} transactions ({categorized:,} categorized automatically).")
+            elif not errors and not exact and not near:
+                st.info("No transactions found in this file.")
+            if exact:
+                st.info(f"Skipped {len(exact):,} identical to transactions already in this wallet.")
+            if near:
+                ss.pending_import = {"wallet": wallet["id"], "near": near}
+            else:
+                ss.pop("pending_import", None)
+            for error in errors:
+                st.warning(error)
+
+    render_pending_import(ss, wallet, currency)
+
+
+def render_pending_import(ss, wallet, currency):
+    """Let the user pick which near duplicates of an import to add after all."""
+    pending = ss.get("pending_import")
+    if not pending or pending["wallet"] != wallet["id"]:
+        return
+    near = pending["near"]
+    st.warning(
+        f"{len(near):,} imported transactions look like ones already in {wallet['name']} "
+        f"(same amount and description within {DATE_WINDOW} days). Tick the ones to add."
+    )
+    with st.form("pending_import_form"):
+        chosen = [
+            txn
+            for i, (txn, day) in enumerate(near)
+            if st.checkbox(
+                f"{txn['date']:%b %d, %Y} · {currency}{txn['amount']:,.2f} · {txn['note']} "
+                f"(like {day:%b %d})",
+                key=f"pending_import_{i}",
+            )
+        ]
+        add = st.form_submit_button("Add ticked")
+    if add or st.button("Skip all"):
+        if add and chosen:
+            import_transactions(ss, wallet, chosen)
+        del ss.pending_import
+        st.rerun()
+
+
+def render_transaction_search(ss, wallet, currency, period):
+    """Search box, filters and one page of the wallet's transactions."""
+    index = wallet_index(ss, wallet)
+
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    with c1:
+        text = st.text_input("Search", key="txn_search_text", placeholder="Note or category")
+    with c2:
+        category = st.selectbox("Category", [ALL_CATEGORIES] + index.categories(), key="txn_search_category")
+    with c3:
+        low = st.number_input(f"Min ({currency})", value=None, step=100.0, key="txn_search_min")
+    with c4:
+        high = st.number_input(f"Max ({currency})", value=None, step=100.0, key="txn_search_max")
+
+    # any filter change starts again from the first page
+    filters = (wallet["id"], text, category, low, high, period)
+    if ss.get("txn_search_filters") != filters:
+        ss.txn_search_filters = filters
+        ss.txn_search_page = 0
+
+    query = (text, None if category == ALL_CATEGORIES else category, (low, high), period)
+    total, rows = index.search(*query, page=ss.txn_search_page)
+    if not total:
+        filtered = text or category != ALL_CATEGORIES or low is not None or high is not None
+        st.caption("No transactions match these filters." if filtered else "No transactions in this period yet.")
+        return
+
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    page = ss.txn_search_page
+    if page >= pages:
+        # fewer results than when the page was picked
+        page = ss.txn_search_page = pages - 1
+        total, rows = index.search(*query, page=page)
+    first = page * PAGE_SIZE + 1
+    st.caption(f"{first:,}–{first + len(rows) - 1:,} of {total:,} transactions, newest first")
+    st.table(format_transaction_rows(rows, currency))
+
+    if pages > 1:
+        prev_col, info_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("← Newer", disabled=page == 0, use_container_width=True):
+                ss.txn_search_page = page - 1
+                st.rerun()
+        with info_col:
+            st.caption(f"Page {page + 1} of {pages:,}")
+        with next_col:
+            if st.button("Older →", disabled=page >= pages - 1, use_container_width=True):
+                ss.txn_search_page = page + 1
+                st.rerun()
+
+
+def render_recurring_rules(wallet, currency):
+    """Salary, rent, subscriptions: entered once, counted in every period."""
+    ss = st.session_state
+    rules = wallet.get("recurring", [])
+
+    with st.expander(f"Recurring transactions ({len(rules)})"):
+        for rule in rules:
+            col_text, col_remove = st.columns([4, 1])
+            with col_text:
+                until = f" until {rule['end']:%b %d, %Y}" if rule["end"] else ""
+                st.write(
+                    f"**{rule['category']}** {rule['note']} · {currency}{rule['amount']:,.2f} · "
+                    f"{SCHEDULES[rule['schedule']].lower()} from {rule['start']:%b %d, %Y}{until}"
+                )
+            with col_remove:
+                if st.button("Remove", key=f"remove_rule_{wallet['id']}_{rule['id']}"):
+                    remove_rule(wallet, rule["id"])
+                    mark_dirty(ss, "wallets")
+                    st.rerun()
+
+        with st.form("add_recurring_form"):
+            schedule = st.selectbox(
+                "Repeats", list(SCHEDULES), format_func=SCHEDULES.get, index=2
+            )
+            start = st.date_input("First date", value=date.today())
+            end = st.date_input("Last date (optional)", value=None)
+            category = st.text_input("Category", value="General")
+            note = st.text_input("Note", value="")
+            amount = st.number_input(
+                f"Amount ({currency}) – positive for income, negative for expense",
+                value=0.0,
+                step=100.0,
+            )
+            submitted = st.form_submit_button("Add recurring transaction")
+
+        if submitted:
+            if not amount:
+                st.error("Enter a non-zero amount.")
+            else:
+                try:
+                    add_rule(wallet, schedule, start, amount, category, note, end=end)
+                except ValueError as e:
+                    st.error(str(e).capitalize() + ".")
+                else:
+                    mark_dirty(ss, "wallets")
+                    st.rerun()
+
+
+def render_balance_forecast(ss, wallet, currency):
+    """Projected daily balance from the wallet's history and recurring flows."""
+    st.markdown("##### Balance forecast")
+    months = st.radio(
+        "Horizon",
+        HORIZONS,
+        index=1,
+        horizontal=True,
+        format_func=lambda m: f"{m} months",
+        key="forecast_horizon",
+    )
+    result = forecast(wallet_model(ss, wallet), wallet.get("recurring"), months)
+    if result is None:
+        st.caption(
+            "Add a few weeks of transactions to see where this balance is heading "
+            "(recurring rules are added on top)."
+        )
+        return
+
+    st.line_chart(
+        {"Date": result["dates"], "Balance": result["balance"]},
+        x="Date",
+        y="Balance",
+        y_label=f"Balance ({currency})",
+    )
+    flows = f" and {len(result['flows'])} repeating payment(s)" if result["flows"] else ""
+    st.caption(
+        f"About {currency}{result['monthly_net']:,.0f} a month on average; "
+        f"lowest point {currency}{result['lowest']:,.0f}. "
+        f"Based on your recent activity, weekday patterns{flows}."
+    )